@@ -17,13 +17,44 @@ we should be able to map it.
 
 Organized by financial statement and model requirements.
 """
+import json
+import os
+import pickle
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque, namedtuple
+from dataclasses import dataclass
+from enum import IntFlag
+from functools import lru_cache
+from itertools import chain, repeat
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+
+def canonicalize_tag(concept_id: str) -> str:
+    """
+    Return the canonical (interned) copy of an element ID.
+
+    Every concept in the buckets below is interned, so a caller that passes
+    tags through here (as the taxonomy parser's element IDs should be) gets
+    identity hits on bucket lookups instead of character comparisons.
+    """
+    return sys.intern(concept_id)
+
+
+def _tag_set(concept_ids) -> frozenset:
+    """Build a bucket from interned element IDs."""
+    return frozenset(map(sys.intern, concept_ids))
+
 
 # =============================================================================
 # INCOME STATEMENT - Revenue (EXPANDED)
 # =============================================================================
 
 # Parent Tags (The Totals) - ALL common revenue synonyms - MASSIVELY EXPANDED
-REVENUE_TOTAL_IDS = {
+REVENUE_TOTAL_IDS = _tag_set({
     # US-GAAP Primary (Most Common)
     "us-gaap_Revenues",
     "us-gaap_RevenueFromContractWithCustomerExcludingAssessedTax",
@@ -75,10 +106,10 @@ REVENUE_TOTAL_IDS = {
     "ifrs-full_GrossRevenue",
     "ifrs-full_TurnoverRevenue",
     "ifrs-full_SalesRevenue",
-}
+})
 
 # Component Tags (Granular Breakdown) - EXPANDED
-REVENUE_COMPONENT_IDS = {
+REVENUE_COMPONENT_IDS = _tag_set({
     # Products/Goods
     "us-gaap_SalesRevenueGoodsNet",
     "us-gaap_SalesRevenueGoodsGross",
@@ -117,13 +148,13 @@ REVENUE_COMPONENT_IDS = {
     "ifrs-full_RevenueFromDividends",
     "ifrs-full_RevenueFromRoyalties",
     "ifrs-full_OtherRevenue",
-}
+})
 
 # =============================================================================
 # INCOME STATEMENT - Cost of Sales (EXPANDED)
 # =============================================================================
 
-COGS_TOTAL_IDS = {
+COGS_TOTAL_IDS = _tag_set({
     # Primary COGS totals
     "us-gaap_CostOfRevenue",
     "us-gaap_CostOfGoodsAndServicesSold",
@@ -137,9 +168,9 @@ COGS_TOTAL_IDS = {
     "ifrs-full_CostOfSales",
     "ifrs-full_CostOfMerchandiseSold",
     "ifrs-full_CostOfGoodsSold",
-}
+})
 
-COGS_COMPONENT_IDS = {
+COGS_COMPONENT_IDS = _tag_set({
     # Products COGS
     "us-gaap_CostOfGoodsSoldProducts",
     "us-gaap_CostOfProductsAndServicesSold",
@@ -174,14 +205,14 @@ COGS_COMPONENT_IDS = {
     "ifrs-full_RawMaterialsAndConsumablesUsed",
     "ifrs-full_DirectLabourCosts",
     "ifrs-full_ManufacturingOverhead",
-}
+})
 
 # =============================================================================
 # INCOME STATEMENT - Operating Expenses (EXPANDED)
 # =============================================================================
 
 # Total OpEx (catch-all)
-OPEX_TOTAL_IDS = {
+OPEX_TOTAL_IDS = _tag_set({
     "us-gaap_OperatingExpenses",
     "us-gaap_CostsAndExpenses",
     "us-gaap_OperatingCostsAndExpenses",
@@ -191,10 +222,10 @@ OPEX_TOTAL_IDS = {
     "ifrs-full_DistributionCosts",
     "ifrs-full_OperatingExpense",
     "ifrs-full_OtherExpenseByNature",
-}
+})
 
 # SG&A - EXPANDED
-SG_AND_A_IDS = {
+SG_AND_A_IDS = _tag_set({
     # Combined SG&A
     "us-gaap_SellingGeneralAndAdministrativeExpense",
     "us-gaap_SellingGeneralAndAdministrativeExpenseExcludingDepreciationAndAmortization",
@@ -227,10 +258,10 @@ SG_AND_A_IDS = {
     "ifrs-full_GeneralAndAdministrativeExpense",
     "ifrs-full_DistributionCosts",
     "ifrs-full_EmployeeBenefitsExpense",
-}
+})
 
 # R&D - EXPANDED
-R_AND_D_IDS = {
+R_AND_D_IDS = _tag_set({
     "us-gaap_ResearchAndDevelopmentExpense",
     "us-gaap_ResearchAndDevelopmentExpenseExcludingAcquiredInProcessCost",
     "us-gaap_ResearchAndDevelopmentExpenseSoftwareExcludingAcquiredInProcessCost",
@@ -243,20 +274,20 @@ R_AND_D_IDS = {
     "ifrs-full_ResearchAndDevelopmentExpense",
     "ifrs-full_ResearchExpense",
     "ifrs-full_DevelopmentExpense",
-}
+})
 
 # Industry-Specific OpEx - EXPANDED
-FUEL_EXPENSE_IDS = {
+FUEL_EXPENSE_IDS = _tag_set({
     "us-gaap_FuelAndOilExpense",
     "us-gaap_AircraftFuel",
     "us-gaap_FuelCosts",
     "us-gaap_FuelExpense",
     "us-gaap_NaturalGasPurchases",
     "us-gaap_ElectricityPurchases",
-}
+})
 
 # Additional OpEx Categories
-OTHER_OPEX_IDS = {
+OTHER_OPEX_IDS = _tag_set({
     "us-gaap_OtherOperatingIncomeExpenseNet",
     "us-gaap_OtherCostAndExpenseOperating",
     "us-gaap_OtherNonoperatingIncomeExpense",
@@ -267,7 +298,7 @@ OTHER_OPEX_IDS = {
     # IFRS
     "ifrs-full_OtherExpense",
     "ifrs-full_OtherOperatingExpense",
-}
+})
 
 # Union of all known OpEx components
 OPEX_COMPONENT_IDS = SG_AND_A_IDS | R_AND_D_IDS | FUEL_EXPENSE_IDS | OTHER_OPEX_IDS
@@ -276,7 +307,7 @@ OPEX_COMPONENT_IDS = SG_AND_A_IDS | R_AND_D_IDS | FUEL_EXPENSE_IDS | OTHER_OPEX_
 # INCOME STATEMENT - D&A and Non-Cash Items (EXPANDED)
 # =============================================================================
 
-D_AND_A_IDS = {
+D_AND_A_IDS = _tag_set({
     # Combined D&A
     "us-gaap_DepreciationDepletionAndAmortization",
     "us-gaap_DepreciationAndAmortization",
@@ -302,67 +333,67 @@ D_AND_A_IDS = {
     "ifrs-full_AmortisationExpense",
     "ifrs-full_DepreciationPropertyPlantAndEquipment",
     "ifrs-full_AmortisationIntangibleAssets",
-}
+})
 
 # =============================================================================
 # INCOME STATEMENT - Adjustments / One-Time Items
 # =============================================================================
 
-RESTRUCTURING_IDS = {
+RESTRUCTURING_IDS = _tag_set({
     "us-gaap_RestructuringCharges",
     "us-gaap_RestructuringCosts",
     "us-gaap_RestructuringAndRelatedCostIncurredCost",
     "us-gaap_SeveranceCosts1",
     "ifrs-full_RestructuringProvision",
-}
+})
 
-IMPAIRMENT_IDS = {
+IMPAIRMENT_IDS = _tag_set({
     "us-gaap_AssetImpairmentCharges",
     "us-gaap_GoodwillImpairmentLoss",
     "us-gaap_ImpairmentOfIntangibleAssetsExcludingGoodwill",
     "us-gaap_ImpairmentOfLongLivedAssetsHeldForUse",
     "ifrs-full_ImpairmentLossRecognisedInProfitOrLoss",
-}
+})
 
-STOCK_COMP_IDS = {
+STOCK_COMP_IDS = _tag_set({
     "us-gaap_ShareBasedCompensation",
     "us-gaap_AllocatedShareBasedCompensationExpense",
     "us-gaap_StockOptionPlanExpense",
     "ifrs-full_SharebasedPaymentArrangements",
-}
+})
 
 # =============================================================================
 # INCOME STATEMENT - Below the Line
 # =============================================================================
 
-INTEREST_EXP_IDS = {
+INTEREST_EXP_IDS = _tag_set({
     "us-gaap_InterestExpense",
     "us-gaap_InterestExpenseDebt",
     "us-gaap_InterestExpenseOther",
     "us-gaap_InterestAndDebtExpense",
     "ifrs-full_FinanceCosts",
     "ifrs-full_InterestExpense",
-}
+})
 
-INTEREST_INCOME_IDS = {
+INTEREST_INCOME_IDS = _tag_set({
     "us-gaap_InterestIncomeOperating",
     "us-gaap_InvestmentIncomeInterest",
     "us-gaap_InterestAndDividendIncomeOperating",
     "ifrs-full_InterestIncome",
-}
+})
 
-TAX_EXP_IDS = {
+TAX_EXP_IDS = _tag_set({
     "us-gaap_IncomeTaxExpenseBenefit",
     "us-gaap_CurrentIncomeTaxExpenseBenefit",
     "us-gaap_DeferredIncomeTaxExpenseBenefit",
     "ifrs-full_IncomeTaxExpenseContinuingOperations",
-}
+})
 
 # =============================================================================
 # INCOME STATEMENT - Net Income (EXPANDED)
 # =============================================================================
 
-NET_INCOME_IDS = {
+NET_INCOME_IDS = _tag_set({
     # Primary Net Income
     "us-gaap_NetIncomeLoss",
     "us-gaap_ProfitLoss",
@@ -392,10 +423,10 @@ NET_INCOME_IDS = {
     "ifrs-full_ProfitLossFromContinuingOperations",
     "ifrs-full_ComprehensiveIncome",
     "ifrs-full_ProfitLossBeforeTax",
-}
+})
 
 # Operating Income IDs (for EBIT fallback)
-OPERATING_INCOME_IDS = {
+OPERATING_INCOME_IDS = _tag_set({
     "us-gaap_OperatingIncomeLoss",
     "us-gaap_IncomeLossFromOperations",
     "us-gaap_IncomeFromOperations",
@@ -403,19 +434,19 @@ OPERATING_INCOME_IDS = {
     "us-gaap_OperatingProfitLoss",
     "ifrs-full_OperatingProfit",
     "ifrs-full_ProfitLossFromOperatingActivities",
-}
+})
 
 # =============================================================================
 # BALANCE SHEET - Current Assets (EXPANDED)
 # =============================================================================
 
-NWC_CURRENT_ASSETS_TOTAL = {
+NWC_CURRENT_ASSETS_TOTAL = _tag_set({
     "us-gaap_AssetsCurrent",
     "us-gaap_TotalCurrentAssets",
     "ifrs-full_CurrentAssets",
-}
+})
 
-NWC_CURRENT_ASSETS_COMPS = {
+NWC_CURRENT_ASSETS_COMPS = _tag_set({
     # Cash
     "us-gaap_CashAndCashEquivalentsAtCarryingValue",
     "us-gaap_CashCashEquivalentsRestrictedCashAndRestrictedCashEquivalents",
@@ -449,10 +480,10 @@ NWC_CURRENT_ASSETS_COMPS = {
     "ifrs-full_Inventories",
     "ifrs-full_PrepaidExpenses",
     "ifrs-full_OtherCurrentAssets",
-}
+})
 
 # Cash and Cash Equivalents - EXPANDED
-CASH_IDS = {
+CASH_IDS = _tag_set({
     # Primary Cash
     "us-gaap_CashAndCashEquivalentsAtCarryingValue",
     "us-gaap_Cash",
@@ -471,10 +502,10 @@ CASH_IDS = {
     "ifrs-full_Cash",
     "ifrs-full_CashOnHand",
     "ifrs-full_RestrictedCashAndCashEquivalents",
-}
+})
 
 # Inventory IDs - EXPANDED
-INVENTORY_IDS = {
+INVENTORY_IDS = _tag_set({
     "us-gaap_InventoryNet",
     "us-gaap_InventoryGross",
     "us-gaap_InventoryFinishedGoodsAndWorkInProcess",
@@ -490,10 +521,10 @@ INVENTORY_IDS = {
     "ifrs-full_RawMaterials",
     "ifrs-full_FinishedGoods",
     "ifrs-full_WorkInProgress",
-}
+})
 
 # Accounts Receivable - EXPANDED
-ACCOUNTS_RECEIVABLE_IDS = {
+ACCOUNTS_RECEIVABLE_IDS = _tag_set({
     "us-gaap_AccountsReceivableNetCurrent",
     "us-gaap_AccountsReceivableNet",
     "us-gaap_ReceivablesNetCurrent",
@@ -505,18 +536,18 @@ ACCOUNTS_RECEIVABLE_IDS = {
     "ifrs-full_TradeAndOtherCurrentReceivables",
     "ifrs-full_TradeReceivables",
     "ifrs-full_ReceivablesFromContractsWithCustomers",
-}
+})
 
 # =============================================================================
 # BALANCE SHEET - Current Liabilities
 # =============================================================================
 
-NWC_CURRENT_LIABS_TOTAL = {
+NWC_CURRENT_LIABS_TOTAL = _tag_set({
     "us-gaap_LiabilitiesCurrent",
     "ifrs-full_CurrentLiabilities",
-}
+})
 
-NWC_CURRENT_LIABS_COMPS = {
+NWC_CURRENT_LIABS_COMPS = _tag_set({
     "us-gaap_AccountsPayableCurrent",
     "us-gaap_AccruedLiabilitiesCurrent",
     "us-gaap_EmployeeRelatedLiabilitiesCurrent",
@@ -525,19 +556,19 @@ NWC_CURRENT_LIABS_COMPS = {
     "us-gaap_AccruedIncomeTaxesCurrent",
     "ifrs-full_TradeAndOtherCurrentPayables",
     "ifrs-full_CurrentTaxLiabilities",
-}
+})
 
 # =============================================================================
 # BALANCE SHEET - Non-Current Assets
 # =============================================================================
 
-FIXED_ASSETS_TOTAL = {
+FIXED_ASSETS_TOTAL = _tag_set({
     "us-gaap_AssetsNoncurrent",
     "us-gaap_PropertyPlantAndEquipmentNet",
     "ifrs-full_NoncurrentAssets",
-}
+})
 
-FIXED_ASSETS_COMPS = {
+FIXED_ASSETS_COMPS = _tag_set({
     "us-gaap_PropertyPlantAndEquipmentNet",
     "us-gaap_IntangibleAssetsNetExcludingGoodwill",
     "us-gaap_Goodwill",
@@ -546,22 +577,22 @@ FIXED_ASSETS_COMPS = {
     "ifrs-full_PropertyPlantAndEquipment",
     "ifrs-full_IntangibleAssetsOtherThanGoodwill",
     "ifrs-full_Goodwill",
-}
+})
 
 # =============================================================================
 # BALANCE SHEET - Debt (Capital Structure)
 # =============================================================================
 
-SHORT_TERM_DEBT_IDS = {
+SHORT_TERM_DEBT_IDS = _tag_set({
     "us-gaap_ShortTermBorrowings",
     "us-gaap_DebtCurrent",
     "us-gaap_LongTermDebtCurrent",
     "us-gaap_CommercialPaper",
     "us-gaap_NotesPayableCurrent",
     "ifrs-full_ShorttermBorrowings",
-}
+})
 
-LONG_TERM_DEBT_IDS = {
+LONG_TERM_DEBT_IDS = _tag_set({
     "us-gaap_LongTermDebt",
     "us-gaap_LongTermDebtNoncurrent",
     "us-gaap_DebtInstrumentCarryingAmount",
@@ -572,16 +603,16 @@ LONG_TERM_DEBT_IDS = {
     "us-gaap_UnsecuredDebt",
     "ifrs-full_NoncurrentBorrowings",
     "ifrs-full_BondsIssued",
-}
+})
 
-CAPITAL_LEASE_IDS = {
+CAPITAL_LEASE_IDS = _tag_set({
     "us-gaap_CapitalLeaseObligations",
     "us-gaap_FinanceLeaseLiability",
     "us-gaap_OperatingLeaseLiability",
     "us-gaap_FinanceLeaseLiabilityNoncurrent",
     "us-gaap_OperatingLeaseLiabilityNoncurrent",
     "ifrs-full_LeaseLiabilities",
-}
+})
 
 # Combined Debt (for backwards compatibility)
 DEBT_IDS = SHORT_TERM_DEBT_IDS | LONG_TERM_DEBT_IDS | CAPITAL_LEASE_IDS
@@ -590,49 +621,49 @@ DEBT_IDS = SHORT_TERM_DEBT_IDS | LONG_TERM_DEBT_IDS | CAPITAL_LEASE_IDS
 # BALANCE SHEET - Equity & EV Bridge Components
 # =============================================================================
 
-EQUITY_IDS = {
+EQUITY_IDS = _tag_set({
     "us-gaap_StockholdersEquity",
     "us-gaap_StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest",
     "us-gaap_RetainedEarningsAccumulatedDeficit",
     "ifrs-full_Equity",
     "ifrs-full_EquityAttributableToOwnersOfParent",
-}
+})
 
-PREFERRED_STOCK_IDS = {
+PREFERRED_STOCK_IDS = _tag_set({
     "us-gaap_PreferredStockValue",
     "us-gaap_RedeemablePreferredStockCarryingAmount",
     "us-gaap_TemporaryEquityCarryingAmountAttributableToParent",
     "ifrs-full_PreferenceShares",
-}
+})
 
-MINORITY_INTEREST_IDS = {
+MINORITY_INTEREST_IDS = _tag_set({
     "us-gaap_MinorityInterest",
     "us-gaap_RedeemableNoncontrollingInterestEquityCarryingAmount",
     "us-gaap_NoncontrollingInterestInConsolidatedEntity",
     "ifrs-full_NoncontrollingInterests",
-}
+})
 
 # =============================================================================
 # BALANCE SHEET - Total Assets/Liabilities (for validation)
 # =============================================================================
 
-TOTAL_ASSETS_IDS = {
+TOTAL_ASSETS_IDS = _tag_set({
     "us-gaap_Assets",
     "ifrs-full_Assets",
-}
+})
 
-TOTAL_LIABILITIES_IDS = {
+TOTAL_LIABILITIES_IDS = _tag_set({
     "us-gaap_Liabilities",
     "us-gaap_LiabilitiesAndStockholdersEquity",
     "ifrs-full_Liabilities",
-}
+})
 
 # =============================================================================
 # CASH FLOW STATEMENT (EXPANDED)
 # =============================================================================
 
 # Capital Expenditures - CRITICAL for DCF
-CAPEX_IDS = {
+CAPEX_IDS = _tag_set({
     # Primary CapEx
     "us-gaap_PaymentsToAcquirePropertyPlantAndEquipment",
     "us-gaap_CapitalExpenditures",
@@ -654,9 +685,9 @@ CAPEX_IDS = {
     "ifrs-full_PurchaseOfPropertyPlantAndEquipmentClassifiedAsInvestingActivities",
     "ifrs-full_PurchaseOfIntangibleAssetsClassifiedAsInvestingActivities",
     "ifrs-full_AcquisitionOfPropertyPlantAndEquipment",
-}
+})
 
-CFO_IDS = {
+CFO_IDS = _tag_set({
     "us-gaap_NetCashProvidedByUsedInOperatingActivities",
     "us-gaap_CashProvidedByUsedInOperatingActivities",
     "us-gaap_NetCashProvidedByOperatingActivities",
@@ -664,78 +695,88 @@ CFO_IDS = {
     # IFRS
     "ifrs-full_CashFlowsFromUsedInOperatingActivities",
     "ifrs-full_CashGeneratedFromOperations",
-}
+})
 
-CFI_IDS = {
+CFI_IDS = _tag_set({
     "us-gaap_NetCashProvidedByUsedInInvestingActivities",
     "us-gaap_CashProvidedByUsedInInvestingActivities",
     "us-gaap_NetCashUsedInInvestingActivities",
     # IFRS
     "ifrs-full_CashFlowsFromUsedInInvestingActivities",
-}
+})
 
-CFF_IDS = {
+CFF_IDS = _tag_set({
     "us-gaap_NetCashProvidedByUsedInFinancingActivities",
     "us-gaap_CashProvidedByUsedInFinancingActivities",
     "us-gaap_NetCashUsedInFinancingActivities",
     # IFRS
     "ifrs-full_CashFlowsFromUsedInFinancingActivities",
-}
+})
 
 # Free Cash Flow
-FREE_CASH_FLOW_IDS = {
+FREE_CASH_FLOW_IDS = _tag_set({
     "us-gaap_FreeCashFlow",
     "us-gaap_CashFlowFromOperationsLessCapitalExpenditures",
-}
+})
 
 # =============================================================================
 # SHARE DATA
 # =============================================================================
 
-BASIC_SHARES_IDS = {
+BASIC_SHARES_IDS = _tag_set({
     "us-gaap_CommonStockSharesOutstanding",
     "us-gaap_WeightedAverageNumberOfSharesOutstandingBasic",
     "us-gaap_CommonStockSharesIssued",
     "ifrs-full_NumberOfSharesOutstanding",
-}
+})
 
-DILUTED_SHARES_IDS = {
+DILUTED_SHARES_IDS = _tag_set({
     "us-gaap_WeightedAverageNumberOfDilutedSharesOutstanding",
     "us-gaap_WeightedAverageNumberOfShareOutstandingBasicAndDiluted",
     "ifrs-full_WeightedAverageShares",
-}
+})
 
 # =============================================================================
 # INDUSTRY-SPECIFIC CONCEPTS
 # =============================================================================
 
-# Tech/Software
-TECH_SPECIFIC_IDS = {
-    "us-gaap_ResearchAndDevelopmentExpense",
-    "us-gaap_CapitalizedComputerSoftwareNet",
-    "us-gaap_DevelopedTechnologyRights",
+# Industry flags (bitmask). A concept can belong to several industries, so
+# classification is a single dict probe plus a bit test instead of one
+# membership check per industry set.
+INDUSTRY_TECH = 1
+INDUSTRY_FINANCIAL_SERVICES = 2
+INDUSTRY_ENERGY_UTILITY = 4
+INDUSTRY_HEALTHCARE = 8
+
+CONCEPT_INDUSTRIES = {
+    # Tech/Software
+    "us-gaap_ResearchAndDevelopmentExpense": INDUSTRY_TECH,
+    "us-gaap_CapitalizedComputerSoftwareNet": INDUSTRY_TECH,
+    "us-gaap_DevelopedTechnologyRights": INDUSTRY_TECH,
+    # Financial Services
+    "us-gaap_InterestAndFeeIncomeLoansAndLeases": INDUSTRY_FINANCIAL_SERVICES,
+    "us-gaap_ProvisionForLoanLeaseAndOtherLosses": INDUSTRY_FINANCIAL_SERVICES,
+    "us-gaap_DepositsNegotiableOrderOfWithdrawalNOW": INDUSTRY_FINANCIAL_SERVICES,
+    # Energy/Utilities
+    "us-gaap_FuelAndPurchasedPower": INDUSTRY_ENERGY_UTILITY,
+    "us-gaap_NuclearFuelNet": INDUSTRY_ENERGY_UTILITY,
+    "us-gaap_ElectricUtilityRevenue": INDUSTRY_ENERGY_UTILITY,
+    # Healthcare/Pharma
+    "us-gaap_PatientServiceRevenue": INDUSTRY_HEALTHCARE,
+    "us-gaap_PremiumsEarnedNetLife": INDUSTRY_HEALTHCARE,
+    "us-gaap_MedicalCostsManaged": INDUSTRY_HEALTHCARE,
 }
 
-# Financial Services
-FINANCIAL_SERVICES_IDS = {
-    "us-gaap_InterestAndFeeIncomeLoansAndLeases",
-    "us-gaap_ProvisionForLoanLeaseAndOtherLosses",
-    "us-gaap_DepositsNegotiableOrderOfWithdrawalNOW",
-}
 
-# Energy/Utilities
-ENERGY_UTILITY_IDS = {
-    "us-gaap_FuelAndPurchasedPower",
-    "us-gaap_NuclearFuelNet",
-    "us-gaap_ElectricUtilityRevenue",
-}
+def industries_of(concept_id: str) -> int:
+    """Return the industry bitmask for a concept (0 if not industry-specific)."""
+    return CONCEPT_INDUSTRIES.get(concept_id, 0)
+
+
+def is_tech(concept_id: str) -> bool:
+    """True if the concept is tagged as Tech/Software specific."""
+    return bool(CONCEPT_INDUSTRIES.get(concept_id, 0) & INDUSTRY_TECH)
 
-# Healthcare/Pharma
-HEALTHCARE_IDS = {
-    "us-gaap_PatientServiceRevenue",
-    "us-gaap_PremiumsEarnedNetLife",
-    "us-gaap_MedicalCostsManaged",
-}
 
 # =============================================================================
 # KEYWORD FALLBACK MAPPINGS (for Sanity Loop Recovery) - PRODUCTION v3.0
@@ -745,11 +786,22 @@ HEALTHCARE_IDS = {
 #
 # PRODUCTION FIX: Massively expanded with common variations from real 10-K filings
 
+# Bucket unions used by several entries below and by get_all_concept_sets:
+# one shared frozenset each instead of a fresh union per entry
+_REVENUE_ALL = REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS
+_COGS_ALL = COGS_TOTAL_IDS | COGS_COMPONENT_IDS
+_CAPEX_PPE = CAPEX_IDS | FIXED_ASSETS_COMPS
+_OPEX_ALL = OPEX_TOTAL_IDS | OPEX_COMPONENT_IDS
+_CURRENT_ASSETS_ALL = NWC_CURRENT_ASSETS_TOTAL | NWC_CURRENT_ASSETS_COMPS
+_CURRENT_LIABS_ALL = NWC_CURRENT_LIABS_TOTAL | NWC_CURRENT_LIABS_COMPS
+_FIXED_ASSETS_ALL = FIXED_ASSETS_TOTAL | FIXED_ASSETS_COMPS
+_NO_CONCEPTS = frozenset()
+
 KEYWORD_FALLBACK_MAPPINGS = {
     # Revenue - Primary keywords
-    "revenue": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
-    "revenues": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
-    "sales": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
+    "revenue": _REVENUE_ALL,
+    "revenues": _REVENUE_ALL,
+    "sales": _REVENUE_ALL,
     "net sales": REVENUE_TOTAL_IDS,
     "total sales": REVENUE_TOTAL_IDS,
     "total revenue": REVENUE_TOTAL_IDS,
@@ -759,25 +811,25 @@ KEYWORD_FALLBACK_MAPPINGS = {
     "operating revenue": REVENUE_TOTAL_IDS,
     # Revenue - Industry variations
     "premiums": REVENUE_TOTAL_IDS,
-    "fees": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
-    "commissions": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
-    "subscription": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
-    "licensing": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
-    "royalt": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
+    "fees": _REVENUE_ALL,
+    "commissions": _REVENUE_ALL,
+    "subscription": _REVENUE_ALL,
+    "licensing": _REVENUE_ALL,
+    "royalt": _REVENUE_ALL,
     "turnover": REVENUE_TOTAL_IDS,
 
     # Cost of Sales - Primary keywords
-    "cost of": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
-    "cogs": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
-    "cost of goods": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
+    "cost of": _COGS_ALL,
+    "cogs": _COGS_ALL,
+    "cost of goods": _COGS_ALL,
     "cost of sales": COGS_TOTAL_IDS,
     "cost of revenue": COGS_TOTAL_IDS,
-    "cost of services": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
-    "cost of products": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
-    "direct cost": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
+    "cost of services": _COGS_ALL,
+    "cost of products": _COGS_ALL,
+    "direct cost": _COGS_ALL,
     "cost of merchandise": COGS_TOTAL_IDS,
-    "manufacturing cost": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
-    "production cost": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
+    "manufacturing cost": _COGS_ALL,
+    "production cost": _COGS_ALL,
 
     # Net Income - Primary keywords
     "net income": NET_INCOME_IDS,
@@ -801,8 +853,8 @@ KEYWORD_FALLBACK_MAPPINGS = {
     "operating earnings": OPERATING_INCOME_IDS,
 
     # EBITDA is calculated, not directly mapped - but we can look for reported EBITDA
-    "ebitda": set(),
-    "adjusted ebitda": set(),
+    "ebitda": _NO_CONCEPTS,
+    "adjusted ebitda": _NO_CONCEPTS,
 
     # Depreciation & Amortization
     "depreciation": D_AND_A_IDS,
@@ -818,10 +870,10 @@ KEYWORD_FALLBACK_MAPPINGS = {
     "capex": CAPEX_IDS,
     "capital expenditure": CAPEX_IDS,
     "capital spending": CAPEX_IDS,
-    "pp&e": CAPEX_IDS | FIXED_ASSETS_COMPS,
-    "ppe": CAPEX_IDS | FIXED_ASSETS_COMPS,
-    "property plant": CAPEX_IDS | FIXED_ASSETS_COMPS,
-    "property, plant": CAPEX_IDS | FIXED_ASSETS_COMPS,
+    "pp&e": _CAPEX_PPE,
+    "ppe": _CAPEX_PPE,
+    "property plant": _CAPEX_PPE,
+    "property, plant": _CAPEX_PPE,
     "purchases of property": CAPEX_IDS,
     "additions to property": CAPEX_IDS,
     "purchases of equipment": CAPEX_IDS,
@@ -932,7 +984,7 @@ KEYWORD_FALLBACK_MAPPINGS = {
 
 # Critical buckets that MUST NOT be zero for a valid model
 CRITICAL_DCF_BUCKETS = {
-    "Total Revenue": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
+    "Total Revenue": _REVENUE_ALL,
     "Net Income": NET_INCOME_IDS,
     "EBITDA": None,  # Calculated, validated separately
 }
@@ -943,15 +995,752 @@ CRITICAL_LBO_BUCKETS = {
 }
 
 CRITICAL_COMPS_BUCKETS = {
-    "Revenue": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
+    "Revenue": _REVENUE_ALL,
     "Net Income": NET_INCOME_IDS,
 }
 
+# =============================================================================
+# CONCEPT INDEX - Integer IDs and ordered bucket arrays
+# =============================================================================
+# Every concept referenced by a bucket gets a dense integer ID (its position in
+# the sorted ALL_CONCEPT_IDS tuple). Each bucket is also stored as a sorted
+# array('H') of those IDs: iteration is a contiguous walk in a stable order
+# (set iteration order changes between interpreter runs), and membership on
+# the integer form is a bisect. The string sets remain the source of truth.
+#
+# Storage note: the ~400 concept strings total ~33 KB of str objects and no ID
+# is a suffix of another (every ID starts with its namespace prefix), so a
+# shared-suffix blob encoding would not shrink anything while the public
+# string sets keep their own references. The integer IDs are the compact form.
+
+BUCKETS = {
+    "REVENUE_TOTAL_IDS": REVENUE_TOTAL_IDS,
+    "REVENUE_COMPONENT_IDS": REVENUE_COMPONENT_IDS,
+    "COGS_TOTAL_IDS": COGS_TOTAL_IDS,
+    "COGS_COMPONENT_IDS": COGS_COMPONENT_IDS,
+    "OPEX_TOTAL_IDS": OPEX_TOTAL_IDS,
+    "SG_AND_A_IDS": SG_AND_A_IDS,
+    "R_AND_D_IDS": R_AND_D_IDS,
+    "FUEL_EXPENSE_IDS": FUEL_EXPENSE_IDS,
+    "OTHER_OPEX_IDS": OTHER_OPEX_IDS,
+    "OPEX_COMPONENT_IDS": OPEX_COMPONENT_IDS,
+    "D_AND_A_IDS": D_AND_A_IDS,
+    "RESTRUCTURING_IDS": RESTRUCTURING_IDS,
+    "IMPAIRMENT_IDS": IMPAIRMENT_IDS,
+    "STOCK_COMP_IDS": STOCK_COMP_IDS,
+    "INTEREST_EXP_IDS": INTEREST_EXP_IDS,
+    "INTEREST_INCOME_IDS": INTEREST_INCOME_IDS,
+    "TAX_EXP_IDS": TAX_EXP_IDS,
+    "NET_INCOME_IDS": NET_INCOME_IDS,
+    "OPERATING_INCOME_IDS": OPERATING_INCOME_IDS,
+    "NWC_CURRENT_ASSETS_TOTAL": NWC_CURRENT_ASSETS_TOTAL,
+    "NWC_CURRENT_ASSETS_COMPS": NWC_CURRENT_ASSETS_COMPS,
+    "CASH_IDS": CASH_IDS,
+    "INVENTORY_IDS": INVENTORY_IDS,
+    "ACCOUNTS_RECEIVABLE_IDS": ACCOUNTS_RECEIVABLE_IDS,
+    "NWC_CURRENT_LIABS_TOTAL": NWC_CURRENT_LIABS_TOTAL,
+    "NWC_CURRENT_LIABS_COMPS": NWC_CURRENT_LIABS_COMPS,
+    "FIXED_ASSETS_TOTAL": FIXED_ASSETS_TOTAL,
+    "FIXED_ASSETS_COMPS": FIXED_ASSETS_COMPS,
+    "SHORT_TERM_DEBT_IDS": SHORT_TERM_DEBT_IDS,
+    "LONG_TERM_DEBT_IDS": LONG_TERM_DEBT_IDS,
+    "CAPITAL_LEASE_IDS": CAPITAL_LEASE_IDS,
+    "DEBT_IDS": DEBT_IDS,
+    "EQUITY_IDS": EQUITY_IDS,
+    "PREFERRED_STOCK_IDS": PREFERRED_STOCK_IDS,
+    "MINORITY_INTEREST_IDS": MINORITY_INTEREST_IDS,
+    "TOTAL_ASSETS_IDS": TOTAL_ASSETS_IDS,
+    "TOTAL_LIABILITIES_IDS": TOTAL_LIABILITIES_IDS,
+    "CAPEX_IDS": CAPEX_IDS,
+    "CFO_IDS": CFO_IDS,
+    "CFI_IDS": CFI_IDS,
+    "CFF_IDS": CFF_IDS,
+    "FREE_CASH_FLOW_IDS": FREE_CASH_FLOW_IDS,
+    "BASIC_SHARES_IDS": BASIC_SHARES_IDS,
+    "DILUTED_SHARES_IDS": DILUTED_SHARES_IDS,
+}
+
+# Each bucket owns one bit. A concept's mask is the OR of the bits of every
+# bucket containing it, so "is concept in any of these buckets" becomes a
+# single dict probe plus an AND against a precomputed mask.
+BUCKET_BITS = {name: 1 << i for i, name in enumerate(BUCKETS)}
+
+# The same bits as a flag enum, named by bucket without the _IDS suffix, for
+# decoding and logging masks: BucketFlag(bucket_mask(c)) lists its buckets.
+# IntFlag arithmetic builds enum objects (~2.5 us per `&` vs ~0.15 us on int),
+# so hot loops should test against BUCKET_BITS or a bound `.value` instead.
+BucketFlag = IntFlag(
+    "BucketFlag",
+    {(name[:-4] if name.endswith("_IDS") else name): bit for name, bit in BUCKET_BITS.items()},
+)
+
+
+def _bucket_ints(concept_set, concept_id_to_int: dict):
+    """Yield the integer IDs of a bucket in ascending order."""
+    yield from sorted(concept_id_to_int[concept] for concept in concept_set)
+
+
+def _build_concept_masks() -> dict:
+    masks = {}
+    for name, ids in BUCKETS.items():
+        bit = BUCKET_BITS[name]
+        for concept in ids:
+            masks[concept] = masks.get(concept, 0) | bit
+    return masks
+
+
+def _mask_from_sets(concept_set) -> int:
+    """
+    Bitmask for a set that is a union of buckets (e.g. TOTAL | COMPONENT).
+
+    Raises:
+        ValueError: if the set is not an exact union of known buckets
+    """
+    mask = 0
+    covered = set()
+    for name, ids in BUCKETS.items():
+        if ids <= concept_set:
+            mask |= BUCKET_BITS[name]
+            covered |= ids
+    if covered != concept_set:
+        raise ValueError("Concept set is not a union of known buckets")
+    return mask
+
+
+def _build_index() -> dict:
+    """Construct every derived lookup table from the bucket literals above."""
+    all_concept_ids = tuple(sorted(set(CONCEPT_INDUSTRIES).union(*BUCKETS.values())))
+    concept_id_to_int = {concept: i for i, concept in enumerate(all_concept_ids)}
+    return {
+        "all_concept_ids": all_concept_ids,
+        "bucket_arrays": {
+            name: array('H', _bucket_ints(ids, concept_id_to_int))
+            for name, ids in BUCKETS.items()
+        },
+        "concept_bucket_mask": _build_concept_masks(),
+        # Keyword fallback table keyed by pre-normalized keyword, valued by mask
+        "keyword_fallback_masks": {
+            keyword.lower().strip(): _mask_from_sets(concept_set)
+            for keyword, concept_set in KEYWORD_FALLBACK_MAPPINGS.items()
+        },
+    }
+
+
+# -----------------------------------------------------------------------------
+# On-disk index cache
+# -----------------------------------------------------------------------------
+# The set literals themselves are already compiled into this module's .pyc;
+# what is rebuilt on every start is the derived index above. It is pickled
+# into __pycache__ next to the bytecode, keyed by taxonomy year and stamped
+# with this file's mtime/size (the same invalidation rule .pyc files use),
+# so editing any bucket forces a rebuild.
+
+TAXONOMY_YEAR = 2025
+
+
+def _index_cache_path() -> Path:
+    return Path(__file__).parent / "__pycache__" / f"ib_rules.index-{TAXONOMY_YEAR}.pickle"
+
+
+def _source_stamp() -> tuple:
+    st = os.stat(__file__)
+    return (TAXONOMY_YEAR, st.st_mtime_ns, st.st_size)
+
+
+def _load_index() -> dict:
+    """Load the derived index from the cache, rebuilding it when stale."""
+    cache_path = _index_cache_path()
+    stamp = _source_stamp()
+    try:
+        cached_stamp, index = pickle.loads(cache_path.read_bytes())
+        if cached_stamp == stamp:
+            return index
+    except Exception:
+        pass
+
+    index = _build_index()
+    if not sys.dont_write_bytecode:
+        try:
+            cache_path.parent.mkdir(exist_ok=True)
+            cache_path.write_bytes(pickle.dumps((stamp, index), protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            pass  # Read-only install: just rebuild next time
+    return index
+
+
+_INDEX = _load_index()
+
+# Single interned string pool; every derived table refers to these objects
+ALL_CONCEPT_IDS = tuple(sys.intern(concept) for concept in _INDEX["all_concept_ids"])
+CONCEPT_ID_TO_INT = {concept: i for i, concept in enumerate(ALL_CONCEPT_IDS)}
+BUCKET_ARRAYS = _INDEX["bucket_arrays"]
+CONCEPT_BUCKET_MASK = _INDEX["concept_bucket_mask"]
+# Most concepts in a filing are in no bucket. One exact frozenset probe
+# rejects them; a Bloom filter evaluated in Python (hash split into two bit
+# indexes) measured ~8x slower than this probe and adds false positives.
+BUCKETED_CONCEPT_IDS = frozenset(CONCEPT_BUCKET_MASK)
+# Pickle does not preserve interning, so intern the keyword keys after load
+KEYWORD_FALLBACK_MASKS = {
+    sys.intern(keyword): mask for keyword, mask in _INDEX["keyword_fallback_masks"].items()
+}
+
+
+def iter_bucket(bucket_name: str):
+    """
+    Iterate the concept IDs of a bucket in a stable (sorted) order.
+
+    Use this instead of iterating the set directly wherever the first match
+    wins, so results do not depend on string hash randomization.
+
+    Example:
+        >>> next(iter_bucket("TOTAL_ASSETS_IDS"))
+        'ifrs-full_Assets'
+    """
+    for concept_int in BUCKET_ARRAYS[bucket_name]:
+        yield ALL_CONCEPT_IDS[concept_int]
+
+
+def concepts_with_prefix(prefix: str) -> tuple:
+    """
+    All indexed concepts starting with prefix, in sorted order.
+
+    ALL_CONCEPT_IDS is sorted, so the matches are one contiguous slice found
+    by two binary searches (a static trie walk without the trie).
+
+    Example:
+        >>> concepts_with_prefix("us-gaap_CostOf")[0]
+        'us-gaap_CostOfFinancialServicesRevenue'
+    """
+    if not prefix:
+        return ALL_CONCEPT_IDS
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return ALL_CONCEPT_IDS[bisect_left(ALL_CONCEPT_IDS, prefix):bisect_left(ALL_CONCEPT_IDS, upper)]
+
+
+def prefix_mask(prefix: str) -> int:
+    """OR of the bucket masks of every concept starting with prefix."""
+    mask = 0
+    for concept in concepts_with_prefix(prefix):
+        mask |= CONCEPT_BUCKET_MASK.get(concept, 0)
+    return mask
+
+
+def bucket_contains_int(bucket_name: str, concept_int: int) -> bool:
+    """Membership test on the integer form of a bucket (binary search)."""
+    arr = BUCKET_ARRAYS[bucket_name]
+    pos = bisect_left(arr, concept_int)
+    return pos < len(arr) and arr[pos] == concept_int
+
+
+def is_candidate_tag(concept_id: str) -> bool:
+    """Prefilter: False means the concept is in no bucket, so skip every bucket test."""
+    return concept_id in BUCKETED_CONCEPT_IDS
+
+
+def bucket_mask(concept_id: str) -> int:
+    """Return the bucket bitmask for a concept (0 if it is in no bucket)."""
+    return CONCEPT_BUCKET_MASK.get(concept_id, 0)
+
+
+# -----------------------------------------------------------------------------
+# Namespace + local name lookup
+# -----------------------------------------------------------------------------
+# Every bucketed concept is "<prefix>_<name>" with one of two prefixes. For
+# callers that already hold the parts (the taxonomy DB stores namespace and
+# concept_name separately), SUFFIX_MASKS is keyed by the short local name and
+# holds one mask per namespace, so no joined element ID has to be built. The
+# masks are kept per namespace because a few names (e.g. TradeReceivables)
+# fall in different buckets under US GAAP and IFRS. Callers holding a full
+# element ID should keep using bucket_mask(): one probe beats split + probe.
+
+NS_US_GAAP = 0
+NS_IFRS_FULL = 1
+
+NAMESPACE_IDS = {
+    "us-gaap": NS_US_GAAP,
+    "ifrs-full": NS_IFRS_FULL,
+}
+
+_NO_MASKS = (0, 0)
+
+
+def _build_suffix_masks():
+    """Map local name -> (us-gaap mask, ifrs-full mask)."""
+    suffix_masks = {}
+    for concept, mask in CONCEPT_BUCKET_MASK.items():
+        prefix, name = concept.split("_", 1)
+        masks = list(suffix_masks.get(name, _NO_MASKS))
+        masks[NAMESPACE_IDS[prefix]] = mask
+        suffix_masks[sys.intern(name)] = tuple(masks)
+    return suffix_masks
+
+
+SUFFIX_MASKS = _build_suffix_masks()
+
+
+def split_concept_id(concept_id: str):
+    """
+    Split an element ID into (namespace id, local name).
+
+    Returns:
+        tuple: (ns_id, name); ns_id is None for namespaces with no buckets
+    """
+    prefix, _, name = concept_id.partition("_")
+    return NAMESPACE_IDS.get(prefix), name
+
+
+def bucket_mask_by_name(ns_id: int, name: str) -> int:
+    """Return the bucket bitmask for a concept given as (namespace id, local name)."""
+    if ns_id is None:
+        return 0
+    return SUFFIX_MASKS.get(name, _NO_MASKS)[ns_id]
+
+
+# -----------------------------------------------------------------------------
+# Vectorized mask table
+# -----------------------------------------------------------------------------
+# CONCEPT_ID_TO_INT already is a minimal perfect hash over the concept pool
+# (dense and collision-free). A gperf-style hash-and-displace function
+# evaluated in Python measured ~5x slower per lookup than that dict probe, so
+# the dict is kept; the per-concept masks are laid out as one flat uint64
+# array for callers that classify whole columns at once. numpy is imported on
+# first use to keep this module cheap to import.
+
+assert len(BUCKETS) <= 64, "bucket masks must fit in uint64"
+
+
+@lru_cache(maxsize=None)
+def category_mask_table():
+    """
+    uint64 bucket masks indexed by CONCEPT_ID_TO_INT (built on first use).
+
+    One extra trailing 0 entry is appended, so a code of -1 (unknown concept,
+    as produced by pandas categorical codes) gathers mask 0.
+    """
+    import numpy as np
+    return np.fromiter(
+        chain((CONCEPT_BUCKET_MASK.get(concept, 0) for concept in ALL_CONCEPT_IDS), (0,)),
+        dtype=np.uint64,
+        count=len(ALL_CONCEPT_IDS) + 1,
+    )
+
+
+@lru_cache(maxsize=None)
+def tag_dtype():
+    """
+    pandas CategoricalDtype over the concept pool.
+
+    Categories are ALL_CONCEPT_IDS in order, so categorical codes equal
+    CONCEPT_ID_TO_INT and index category_mask_table() directly.
+    """
+    import pandas as pd
+    return pd.CategoricalDtype(categories=list(ALL_CONCEPT_IDS))
+
+
+def _series_concept_ints(concepts):
+    """Concept ints for a Series of element IDs (-1 for concepts outside the pool)."""
+    dtype = tag_dtype()
+    if concepts.dtype == dtype:
+        return concepts.cat.codes.to_numpy()
+    # Same lookup as astype(dtype).cat.codes; astype warns on concepts
+    # outside the pool, which is most of a filing
+    return dtype.categories.get_indexer(concepts)
+
+
+def series_masks(concepts):
+    """
+    Bucket masks for a pandas Series of element IDs, as a uint64 ndarray.
+
+    Series already stored with tag_dtype() reuse their codes directly.
+
+    Example:
+        >>> revenue_rows = (series_masks(df["Canonical_Concept"]) & BUCKET_BITS["REVENUE_TOTAL_IDS"]) != 0
+    """
+    return category_mask_table()[_series_concept_ints(concepts)]
+
+
+# Buckets overlap (SG&A concepts are also OpEx components, some revenue tags
+# are both total and component), so a concept's mask cannot be split into
+# exclusive section/role fields. There are few distinct masks, though, so
+# each one gets a dense uint8 class code: code 0 is "no bucket" and
+# MASK_CLASSES[code] recovers the full mask. Tables of codes are 8x smaller
+# than the uint64 mask table and still exact.
+MASK_CLASSES = (0,) + tuple(sorted(set(CONCEPT_BUCKET_MASK.values()) - {0}))
+assert len(MASK_CLASSES) <= 256, "mask classes must fit in uint8"
+MASK_CLASS_CODE = {mask: code for code, mask in enumerate(MASK_CLASSES)}
+
+
+@lru_cache(maxsize=None)
+def concept_code_table():
+    """uint8 mask-class codes indexed by CONCEPT_ID_TO_INT, plus a trailing 0 sentinel."""
+    import numpy as np
+    return np.fromiter(
+        chain((MASK_CLASS_CODE[CONCEPT_BUCKET_MASK.get(c, 0)] for c in ALL_CONCEPT_IDS), (0,)),
+        dtype=np.uint8,
+        count=len(ALL_CONCEPT_IDS) + 1,
+    )
+
+
+@lru_cache(maxsize=None)
+def bucket_code_filter(bucket_name: str):
+    """
+    Boolean array over mask-class codes: True where the class is in the bucket.
+
+    Example:
+        >>> is_revenue = bucket_code_filter("REVENUE_TOTAL_IDS")[series_codes(df["Canonical_Concept"])]
+    """
+    import numpy as np
+    bit = BUCKET_BITS[bucket_name]
+    return np.fromiter((bool(mask & bit) for mask in MASK_CLASSES), dtype=bool, count=len(MASK_CLASSES))
+
+
+def series_codes(concepts):
+    """Mask-class codes for a pandas Series of element IDs, as a uint8 ndarray."""
+    return concept_code_table()[_series_concept_ints(concepts)]
+
+
+def warm_tables():
+    """
+    Build the lazy numpy/pandas tables now.
+
+    Call once in a pre-fork parent (e.g. a gunicorn app preloaded with
+    --preload) so forked workers share the table pages copy-on-write
+    instead of each building its own copy. The array buffers are never
+    written after construction, so the pages stay shared.
+    """
+    category_mask_table()
+    concept_code_table()
+    tag_dtype()
+
+
+def concept_masks(concept_ids):
+    """
+    Vectorized bucket_mask: returns a uint64 array, 0 for unknown concepts.
+
+    This is the bulk entry point for classifying a whole filing. The per-tag
+    loop is map(dict.get) feeding np.fromiter, so it stays in C with no
+    Python frame per tag.
+
+    Example:
+        >>> concept_masks(["us-gaap_Revenues", "x"]) & BUCKET_BITS["REVENUE_TOTAL_IDS"]
+        array([1, 0], dtype=uint64)
+    """
+    import numpy as np
+    if not isinstance(concept_ids, (list, tuple)):
+        concept_ids = list(concept_ids)
+    return np.fromiter(
+        map(CONCEPT_BUCKET_MASK.get, concept_ids, repeat(0)),
+        dtype=np.uint64,
+        count=len(concept_ids),
+    )
+
+
+# -----------------------------------------------------------------------------
+# Bucket groups and the generated classifier
+# -----------------------------------------------------------------------------
+
+# Immutable view of one bucket: its name, string set, integer array and bit
+BucketGroup = namedtuple("BucketGroup", ["name", "ids", "ints", "bit"])
+
+BUCKET_GROUPS = tuple(
+    BucketGroup(name, ids, BUCKET_ARRAYS[name], BUCKET_BITS[name])
+    for name, ids in BUCKETS.items()
+)
+
+
+def _compile_classifier():
+    """
+    Generate classify_concept() specialized to the current bucket layout.
+
+    Concepts are partitioned by their full bucket mask, so the classes are
+    disjoint and the first class that contains the concept holds its
+    complete answer. The emitted function rejects unknown concepts with one
+    probe, then runs a flat chain of `if concept_id in <class>: return <mask>`
+    tests, largest class first, with each class bound as a closure cell.
+    """
+    classes = {}
+    for concept, mask in CONCEPT_BUCKET_MASK.items():
+        classes.setdefault(mask, set()).add(concept)
+    ordered = sorted(classes.items(), key=lambda item: (-len(item[1]), item[0]))
+
+    params = ", ".join(f"_c{i}" for i in range(len(ordered)))
+    lines = [
+        f"def _make(_known, {params}):",
+        "    def classify_concept(concept_id):",
+        "        if concept_id not in _known: return 0",
+    ]
+    for i, (mask, _) in enumerate(ordered):
+        lines.append(f"        if concept_id in _c{i}: return {mask}")
+    lines.append("        return 0")
+    lines.append("    return classify_concept")
+
+    namespace = {}
+    exec(compile("\n".join(lines), "<ib_rules.classify_concept>", "exec"), namespace)
+    classify = namespace["_make"](
+        BUCKETED_CONCEPT_IDS, *(frozenset(members) for _, members in ordered)
+    )
+    classify.__doc__ = "Return the bucket bitmask for a concept (generated; see bucket_mask)."
+    return classify
+
+
+classify_concept = _compile_classifier()
+
+# Frequency-ordered fast path: the most frequently mapped concepts are tested
+# with plain equality (an identity hit for canonicalized tags) before falling
+# back to the mask dict. The order comes from config/tag_freq.json, which
+# scripts/gen_tag_freq.py regenerates from aliases and normalized output.
+# Measured on CPython 3.11 a dict probe on an interned key is already close to
+# one pointer compare, so each extra equality test mostly taxes misses; keep
+# the chain short and prefer bucket_mask() unless the workload is hit-heavy.
+TAG_FREQ_PATH = Path(__file__).with_name("tag_freq.json")
+FAST_PATH_TAGS = 4
+
+
+def _load_tag_order() -> tuple:
+    """Bucketed concepts from tag_freq.json, most frequent first."""
+    try:
+        data = json.loads(TAG_FREQ_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return ()
+    return tuple(
+        sys.intern(tag) for tag, _ in data.get("tags", ()) if tag in CONCEPT_BUCKET_MASK
+    )
+
+
+def _compile_fast_classifier(tag_order: tuple, limit: int = FAST_PATH_TAGS):
+    """
+    Generate _classify_fast(): an equality chain over the `limit` most
+    frequent concepts, then a mask dict probe. Same result as bucket_mask().
+    """
+    hot = tag_order[:limit]
+    params = "".join(f", _t{i}" for i in range(len(hot)))
+    lines = [
+        f"def _make(_masks{params}):",
+        "    def _classify_fast(concept_id):",
+    ]
+    for i, tag in enumerate(hot):
+        lines.append(f"        if concept_id == _t{i}: return {CONCEPT_BUCKET_MASK[tag]}")
+    lines.append("        return _masks.get(concept_id, 0)")
+    lines.append("    return _classify_fast")
+
+    namespace = {}
+    exec(compile("\n".join(lines), "<ib_rules._classify_fast>", "exec"), namespace)
+    return namespace["_make"](CONCEPT_BUCKET_MASK, *hot)
+
+
+TAG_ORDER = _load_tag_order()
+_classify_fast = _compile_fast_classifier(TAG_ORDER)
+
+
+# -----------------------------------------------------------------------------
+# Per-fact records
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class TagRecord:
+    """
+    One reported fact keyed on a concept, with its bucket mask resolved.
+
+    Slotted and frozen: no per-instance __dict__, so a filing's worth of
+    records costs far less than the equivalent dicts.
+    """
+    tag_id: str
+    value: float
+    period: str
+    category_mask: int  # bucket_mask(tag_id); test with BUCKET_BITS
+
+    @classmethod
+    def build(cls, tag_id: str, value: float, period: str) -> "TagRecord":
+        """Create a record with the canonical tag string and its bucket mask."""
+        tag_id = sys.intern(tag_id)
+        return cls(tag_id, value, period, CONCEPT_BUCKET_MASK.get(tag_id, 0))
+
+    def in_bucket(self, bucket_name: str) -> bool:
+        """True if this record's concept belongs to the named bucket."""
+        return bool(self.category_mask & BUCKET_BITS[bucket_name])
+
+
+@lru_cache(maxsize=4096)
+def lower_label(label: str) -> str:
+    """Normalize a source label for keyword matching (cached; labels repeat)."""
+    return label.lower().strip()
+
+
+# -----------------------------------------------------------------------------
+# Keyword automaton
+# -----------------------------------------------------------------------------
+# The fallback matchers need every keyword (and, for suggest_mapping, every
+# word of every keyword) occurring anywhere in a label. Testing ~280 patterns
+# with `in` is one C scan of the label per pattern; an Aho-Corasick automaton
+# finds all of them in a single pass. It is compiled to a full DFA (one dict
+# lookup per character, no failure-link walking) and built on first use.
+
+# Keyword -> position in KEYWORD_FALLBACK_MAPPINGS (ties keep dict order)
+_KEYWORD_ORDER = {keyword: i for i, keyword in enumerate(KEYWORD_FALLBACK_MAPPINGS)}
+
+
+def build_keyword_automaton(patterns) -> tuple:
+    """
+    Build an Aho-Corasick automaton over patterns, as a DFA.
+
+    Returns:
+        tuple: (transitions, outputs) where transitions[state] maps a
+        character to the next state (missing -> state 0) and outputs[state]
+        is the frozenset of patterns ending at that state
+    """
+    goto = [{}]
+    outputs = [set()]
+    for pattern in patterns:
+        state = 0
+        for ch in pattern:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                goto.append({})
+                outputs.append(set())
+                nxt = len(goto) - 1
+                goto[state][ch] = nxt
+            state = nxt
+        outputs[state].add(pattern)
+
+    # Breadth-first: failure links, then full transition tables, shallowest first
+    fail = [0] * len(goto)
+    transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        transitions[state] = {**transitions[fail[state]], **goto[state]}
+        for ch, child in goto[state].items():
+            if state:
+                fail[child] = transitions[fail[state]].get(ch, 0)
+            outputs[child] |= outputs[fail[child]]
+            queue.append(child)
+
+    return transitions, [frozenset(out) for out in outputs]
+
+
+@lru_cache(maxsize=None)
+def _keyword_automaton() -> tuple:
+    """
+    Automaton over fallback keywords and their words (built on first use).
+
+    Returns:
+        tuple: (transitions, outputs, pattern_keywords, longest_keyword) where
+        pattern_keywords maps each pattern to the keywords it triggers in
+        suggest_mapping (the keyword itself, or any keyword containing it as
+        a word) and longest_keyword[state] is the longest full keyword
+        ending at that state, or None
+    """
+    pattern_keywords = {}
+    for keyword in KEYWORD_FALLBACK_MAPPINGS:
+        for pattern in {keyword, *keyword.split()}:
+            pattern_keywords.setdefault(pattern, []).append(keyword)
+    transitions, outputs = build_keyword_automaton(pattern_keywords)
+    longest_keyword = [
+        max((p for p in out if p in _KEYWORD_ORDER), key=len, default=None)
+        for out in outputs
+    ]
+    return (transitions, outputs, {p: tuple(ks) for p, ks in pattern_keywords.items()},
+            longest_keyword)
+
+
+def _keyword_hits(label_lower: str) -> set:
+    """All automaton patterns occurring anywhere in label_lower."""
+    transitions, outputs, _, _ = _keyword_automaton()
+    hits = set()
+    state = 0
+    for ch in label_lower:
+        state = transitions[state].get(ch, 0)
+        if outputs[state]:
+            hits |= outputs[state]
+    return hits
+
+
+def _best_keyword(label_lower: str):
+    """
+    Highest-scoring fallback keyword in label_lower, in one automaton pass.
+
+    A keyword scores its length, +10 when it starts the label and +50 more
+    when it is the whole label; ties go to the earlier keyword. The match
+    end position gives both bonuses without re-comparing strings.
+
+    Keywords ending at the same position are suffixes of the longest one,
+    which outscores them all (it is longer, and the only one that can start
+    the label), so only the longest is scored at each position.
+    """
+    transitions, _, _, longest_keyword = _keyword_automaton()
+    size = len(label_lower)
+    best_keyword = None
+    best_score = 0
+    best_order = len(_KEYWORD_ORDER)
+    state = 0
+    for end, ch in enumerate(label_lower, 1):
+        state = transitions[state].get(ch, 0)
+        keyword = longest_keyword[state]
+        if keyword is None:
+            continue
+        score = len(keyword)
+        if end == score:
+            score += 60 if end == size else 10
+        if score > best_score or (score == best_score and _KEYWORD_ORDER[keyword] < best_order):
+            best_keyword = keyword
+            best_score = score
+            best_order = _KEYWORD_ORDER[keyword]
+    return best_keyword
+
+
 # =============================================================================
 # FUZZY MATCHING HELPERS - PRODUCTION v3.0
 # =============================================================================
 # These functions help with fallback recovery when exact matching fails
 
+# Bucket name rules for fallback keywords: the first rule that prefixes or
+# occurs in a keyword names its bucket (so "cost of sales" is "Total Revenue"
+# via "sales", as it always has been)
+_FALLBACK_BUCKET_RULES = {
+    "revenue": "Total Revenue",
+    "revenues": "Total Revenue",
+    "sales": "Total Revenue",
+    "net sales": "Total Revenue",
+    "total revenue": "Total Revenue",
+    "cost of": "COGS",
+    "cogs": "COGS",
+    "cost of goods": "COGS",
+    "cost of sales": "COGS",
+    "cost of revenue": "COGS",
+    "net income": "Net Income",
+    "profit": "Net Income",
+    "earnings": "Net Income",
+    "operating income": "Operating Income",
+    "depreciation": "D&A",
+    "amortization": "D&A",
+    "capex": "CapEx",
+    "capital expenditure": "CapEx",
+    "inventory": "Inventory",
+    "cash": "Cash",
+    "receivable": "Accounts Receivable",
+    "debt": "Total Debt",
+    "tax": "Taxes",
+    "sg&a": "SG&A",
+    "r&d": "R&D",
+    "research": "R&D",
+}
+
+def _rule_bucket(keyword: str):
+    """Bucket name of the first rule that prefixes or occurs in keyword."""
+    for rule, bucket_name in _FALLBACK_BUCKET_RULES.items():
+        if keyword.startswith(rule) or rule in keyword:
+            return bucket_name
+    return None
+
+
+# Keyword -> bucket name, resolved once (keywords no rule covers are absent)
+_KEYWORD_TO_BUCKET = {
+    keyword: bucket_name
+    for keyword in KEYWORD_FALLBACK_MAPPINGS
+    if (bucket_name := _rule_bucket(keyword))
+}
+
+
 def fuzzy_match_bucket(source_label: str) -> tuple:
     """
     Fuzzy match a source label to a bucket using keyword matching.
@@ -961,107 +1750,65 @@ def fuzzy_match_bucket(source_label: str) -> tuple:
 
     Example:
         >>> fuzzy_match_bucket("Total Net Sales Revenue")
-        ("Revenue", REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS)
+        ("Revenue", _REVENUE_ALL)
     """
-    label_lower = source_label.lower().strip()
+    label_lower = lower_label(source_label)
 
-    # Score each keyword match
-    best_match = None
-    best_score = 0
+    # A label that is itself a keyword always wins (+60 beats any other
+    # keyword it contains), so skip the scan
+    if label_lower in KEYWORD_FALLBACK_MAPPINGS:
+        keyword = label_lower
+    else:
+        keyword = _best_keyword(label_lower)
 
-    for keyword, concept_set in KEYWORD_FALLBACK_MAPPINGS.items():
-        if keyword in label_lower:
-            # Score based on keyword length and position
-            score = len(keyword)
-            if label_lower.startswith(keyword):
-                score += 10  # Bonus for prefix match
-            if label_lower == keyword:
-                score += 50  # Exact match bonus
-
-            if score > best_score:
-                best_score = score
-                best_match = (keyword, concept_set)
-
-    if best_match:
-        keyword, concept_set = best_match
-        # Map keyword to bucket name
-        bucket_map = {
-            "revenue": "Total Revenue",
-            "revenues": "Total Revenue",
-            "sales": "Total Revenue",
-            "net sales": "Total Revenue",
-            "total revenue": "Total Revenue",
-            "cost of": "COGS",
-            "cogs": "COGS",
-            "cost of goods": "COGS",
-            "cost of sales": "COGS",
-            "cost of revenue": "COGS",
-            "net income": "Net Income",
-            "profit": "Net Income",
-            "earnings": "Net Income",
-            "operating income": "Operating Income",
-            "depreciation": "D&A",
-            "amortization": "D&A",
-            "capex": "CapEx",
-            "capital expenditure": "CapEx",
-            "inventory": "Inventory",
-            "cash": "Cash",
-            "receivable": "Accounts Receivable",
-            "debt": "Total Debt",
-            "tax": "Taxes",
-            "sg&a": "SG&A",
-            "r&d": "R&D",
-            "research": "R&D",
-        }
-
-        bucket_name = None
-        for k, v in bucket_map.items():
-            if keyword.startswith(k) or k in keyword:
-                bucket_name = v
-                break
-
-        if bucket_name:
-            return (bucket_name, concept_set)
+    bucket_name = _KEYWORD_TO_BUCKET.get(keyword)
+    if bucket_name:
+        return (bucket_name, KEYWORD_FALLBACK_MAPPINGS[keyword])
 
     return (None, None)
 
 
-def get_all_concept_sets() -> dict:
+# Built once; get_all_concept_sets hands out a read-only view
+_ALL_CONCEPT_SETS = MappingProxyType({
+    "Revenue": _REVENUE_ALL,
+    "COGS": _COGS_ALL,
+    "SG&A": SG_AND_A_IDS,
+    "R&D": R_AND_D_IDS,
+    "OpEx": _OPEX_ALL,
+    "D&A": D_AND_A_IDS,
+    "Net Income": NET_INCOME_IDS,
+    "Operating Income": OPERATING_INCOME_IDS,
+    "Interest Expense": INTEREST_EXP_IDS,
+    "Interest Income": INTEREST_INCOME_IDS,
+    "Taxes": TAX_EXP_IDS,
+    "Cash": CASH_IDS,
+    "Inventory": INVENTORY_IDS,
+    "Accounts Receivable": ACCOUNTS_RECEIVABLE_IDS,
+    "Current Assets": _CURRENT_ASSETS_ALL,
+    "Current Liabilities": _CURRENT_LIABS_ALL,
+    "Fixed Assets": _FIXED_ASSETS_ALL,
+    "Short-Term Debt": SHORT_TERM_DEBT_IDS,
+    "Long-Term Debt": LONG_TERM_DEBT_IDS,
+    "Total Debt": DEBT_IDS,
+    "Equity": EQUITY_IDS,
+    "Total Assets": TOTAL_ASSETS_IDS,
+    "Total Liabilities": TOTAL_LIABILITIES_IDS,
+    "CapEx": CAPEX_IDS,
+    "CFO": CFO_IDS,
+    "CFI": CFI_IDS,
+    "CFF": CFF_IDS,
+})
+
+
+def get_all_concept_sets() -> Mapping:
     """
-    Get a dictionary of all concept sets for validation purposes.
+    Get a mapping of all concept sets for validation purposes.
 
     Returns:
-        dict: {bucket_name: concept_set}
+        Mapping: {bucket_name: concept_set}, read-only and shared between
+        calls (copy with dict() to modify)
     """
-    return {
-        "Revenue": REVENUE_TOTAL_IDS | REVENUE_COMPONENT_IDS,
-        "COGS": COGS_TOTAL_IDS | COGS_COMPONENT_IDS,
-        "SG&A": SG_AND_A_IDS,
-        "R&D": R_AND_D_IDS,
-        "OpEx": OPEX_TOTAL_IDS | OPEX_COMPONENT_IDS,
-        "D&A": D_AND_A_IDS,
-        "Net Income": NET_INCOME_IDS,
-        "Operating Income": OPERATING_INCOME_IDS,
-        "Interest Expense": INTEREST_EXP_IDS,
-        "Interest Income": INTEREST_INCOME_IDS,
-        "Taxes": TAX_EXP_IDS,
-        "Cash": CASH_IDS,
-        "Inventory": INVENTORY_IDS,
-        "Accounts Receivable": ACCOUNTS_RECEIVABLE_IDS,
-        "Current Assets": NWC_CURRENT_ASSETS_TOTAL | NWC_CURRENT_ASSETS_COMPS,
-        "Current Liabilities": NWC_CURRENT_LIABS_TOTAL | NWC_CURRENT_LIABS_COMPS,
-        "Fixed Assets": FIXED_ASSETS_TOTAL | FIXED_ASSETS_COMPS,
-        "Short-Term Debt": SHORT_TERM_DEBT_IDS,
-        "Long-Term Debt": LONG_TERM_DEBT_IDS,
-        "Total Debt": DEBT_IDS,
-        "Equity": EQUITY_IDS,
-        "Total Assets": TOTAL_ASSETS_IDS,
-        "Total Liabilities": TOTAL_LIABILITIES_IDS,
-        "CapEx": CAPEX_IDS,
-        "CFO": CFO_IDS,
-        "CFI": CFI_IDS,
-        "CFF": CFF_IDS,
-    }
+    return _ALL_CONCEPT_SETS
 
 
 def suggest_mapping(source_label: str) -> list:
@@ -1071,23 +1818,36 @@ def suggest_mapping(source_label: str) -> list:
     Returns:
         list: List of (bucket_name, confidence) tuples sorted by confidence
     """
-    label_lower = source_label.lower().strip()
+    label_lower = lower_label(source_label)
     suggestions = []
 
-    for keyword, concept_set in KEYWORD_FALLBACK_MAPPINGS.items():
-        if keyword in label_lower or any(word in label_lower for word in keyword.split()):
-            # Calculate confidence
-            if label_lower == keyword:
-                confidence = 1.0
-            elif label_lower.startswith(keyword):
-                confidence = 0.9
-            elif keyword in label_lower:
-                confidence = 0.7 + (len(keyword) / len(label_lower)) * 0.2
-            else:
-                confidence = 0.5
-
-            suggestions.append((keyword, confidence, concept_set))
-
-    # Sort by confidence
-    suggestions.sort(key=lambda x: x[1], reverse=True)
+    # A keyword is a candidate if it, or any of its words, occurs in the label
+    hits = _keyword_hits(label_lower)
+
+    # Keywords found whole score 0.7-1.0
+    for keyword in hits:
+        if keyword not in _KEYWORD_ORDER:
+            continue  # A word of some keyword, not a keyword itself
+        # Calculate confidence
+        if label_lower == keyword:
+            confidence = 1.0
+        elif label_lower.startswith(keyword):
+            confidence = 0.9
+        else:
+            confidence = 0.7 + (len(keyword) / len(label_lower)) * 0.2
+
+        suggestions.append((keyword, confidence, KEYWORD_FALLBACK_MAPPINGS[keyword]))
+
+    # Sort by confidence (ties keep KEYWORD_FALLBACK_MAPPINGS order)
+    suggestions.sort(key=lambda x: (-x[1], _KEYWORD_ORDER[x[0]]))
+
+    # Keywords matched only through one of their words score 0.5, below all
+    # of the above, so they are only needed to fill the top 5
+    if len(suggestions) < 5:
+        pattern_keywords = _keyword_automaton()[2]
+        found = {keyword for keyword, _, _ in suggestions}
+        word_only = {keyword for pattern in hits for keyword in pattern_keywords[pattern]} - found
+        for keyword in sorted(word_only, key=_KEYWORD_ORDER.__getitem__)[:5 - len(suggestions)]:
+            suggestions.append((keyword, 0.5, KEYWORD_FALLBACK_MAPPINGS[keyword]))
+
     return suggestions[:5]  # Top 5 suggestions
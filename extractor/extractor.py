@@ -17,16 +17,37 @@ Standard Submission Format (preferred but not required):
 import pandas as pd
 import numpy as np
 import os
+import csv
+import io
 import sys
 import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
+from itertools import islice
 from typing import List, Dict, Tuple, Optional
 
+# Try to import the native (Rust) Excel parser. pandas reads through it
+# from 2.2 on; otherwise pandas picks its default engine (openpyxl/xlrd)
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+EXCEL_ENGINE = 'calamine' if CALAMINE_AVAILABLE else None
+
 # -------------------------------------------------
 # CONFIGURATION
 # -------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_FILE = os.path.join(BASE_DIR, "messy_input.csv")
 
+# Extracted facts: one 'Line Item', 'Amount', 'Note' per value, kept as
+# parallel (labels, amounts, notes) lists until the caller picks a shape
+OUTPUT_COLUMNS = ['Line Item', 'Amount', 'Note']
+Columns = Tuple[List[str], List[float], List[str]]
+
 # Standard tab names (case-insensitive matching)
 STANDARD_TAB_NAMES = [
     'income statement', 'income', 'p&l', 'profit and loss', 'profit & loss',
@@ -34,6 +55,11 @@ STANDARD_TAB_NAMES = [
     'cash flow', 'cash flows', 'statement of cash flows', 'cf'
 ]
 
+# Line items a complete extraction should contain (matched as substrings).
+# No item's tail begins another item, so one findall sees every one.
+EXPECTED_LINE_ITEMS = ['revenue', 'assets', 'liabilities', 'net income', 'cash']
+_EXPECTED_ITEMS_RE = re.compile('|'.join(map(re.escape, EXPECTED_LINE_ITEMS)))
+
 # Date/Period patterns
 DATE_PATTERNS = [
     r'^\d{4}$',  # 2023
@@ -46,13 +72,31 @@ DATE_PATTERNS = [
     r'^Year\s*(Ended|End)',  # Year Ended
 ]
 
+# All date patterns fused into one alternation: a single match per cell
+_DATE_RE = re.compile("|".join(f"(?:{pattern})" for pattern in DATE_PATTERNS), re.IGNORECASE)
+
+
+# Cells that mean zero
+_DASH_VALUES = frozenset(['-', '—', '–', ''])
+
+
+# Cell helpers: real sheets repeat the same period headers, dash fillers
+# and labels many times, so text cells go through an LRU cache of each
+# helper's parse. Numeric cells are rarely repeated and skip the cache.
+CELL_CACHE_SIZE = 4096
+
 
 def is_date_like(value) -> bool:
     """Check if a value looks like a date or period header."""
+    if isinstance(value, str):
+        return _is_date_like_str_cached(value)
     if pd.isna(value):
         return False
+    return _is_date_like_str(str(value))
+
 
-    val_str = str(value).strip()
+def _is_date_like_str(val_str: str) -> bool:
+    val_str = val_str.strip()
 
     # Check numeric year
     try:
@@ -63,19 +107,35 @@ def is_date_like(value) -> bool:
         pass
 
     # Check patterns
-    for pattern in DATE_PATTERNS:
-        if re.match(pattern, val_str, re.IGNORECASE):
-            return True
+    return _DATE_RE.match(val_str) is not None
+
+
+_is_date_like_str_cached = lru_cache(maxsize=CELL_CACHE_SIZE)(_is_date_like_str)
+
+
+# ASCII bytes that str.isalpha() or str.isspace() accept
+_ASCII_LETTERS_SPACES = bytes(b for b in range(128) if chr(b).isalpha() or chr(b).isspace())
+
 
-    return False
+def _letter_count(val_str: str) -> int:
+    """Number of letters and whitespace characters in val_str."""
+    if val_str.isascii():
+        # Delete them in one C pass over the bytes and count what went
+        return len(val_str) - len(val_str.encode('ascii').translate(None, _ASCII_LETTERS_SPACES))
+    return sum(c.isalpha() or c.isspace() for c in val_str)
 
 
 def is_label_like(value) -> bool:
     """Check if a value looks like a line item label."""
+    if isinstance(value, str):
+        return _is_label_like_str_cached(value)
     if pd.isna(value):
         return False
+    return _is_label_like_str(str(value))
 
-    val_str = str(value).strip()
+
+def _is_label_like_str(val_str: str) -> bool:
+    val_str = val_str.strip()
 
     # Skip if it's a number
     try:
@@ -85,8 +145,10 @@ def is_label_like(value) -> bool:
         pass
 
     # Must be mostly letters
-    letters = sum(c.isalpha() or c.isspace() for c in val_str)
-    return len(val_str) >= 3 and letters / len(val_str) > 0.5
+    return len(val_str) >= 3 and _letter_count(val_str) / len(val_str) > 0.5
+
+
+_is_label_like_str_cached = lru_cache(maxsize=CELL_CACHE_SIZE)(_is_label_like_str)
 
 
 def detect_header_row(df: pd.DataFrame) -> int:
@@ -116,8 +178,10 @@ def detect_label_column(df: pd.DataFrame) -> int:
     for col_idx in range(min(5, len(df.columns))):  # Check first 5 columns
         col = df.iloc[:, col_idx]
 
-        # Count label-like values
-        label_count = sum(is_label_like(val) for val in col if not pd.isna(val))
+        # Count label-like values, stopping at the 5th: the rest of the
+        # column cannot change the answer
+        labels = (val for val in col if not pd.isna(val) and is_label_like(val))
+        label_count = sum(1 for _ in islice(labels, 5))
 
         # If many labels found, this is likely the label column
         if label_count >= 5:
@@ -131,13 +195,20 @@ def clean_numeric_value(value) -> Optional[float]:
     Parse various number formats to float.
     Handles: commas, parentheses for negatives, currency symbols, dashes for zero.
     """
+    if isinstance(value, str):
+        return _clean_numeric_str_cached(value)
     if pd.isna(value):
         return None
+    if isinstance(value, float) or type(value) is int:
+        return float(value)  # What float(str(value)) gives, without the round trip
+    return _clean_numeric_str(str(value))
+
 
-    val_str = str(value).strip()
+def _clean_numeric_str(val_str: str) -> Optional[float]:
+    val_str = val_str.strip()
 
     # Handle dash as zero
-    if val_str in ['-', '—', '–', '']:
+    if val_str in _DASH_VALUES:
         return 0.0
 
     # Remove currency symbols and spaces
@@ -160,14 +231,20 @@ def clean_numeric_value(value) -> Optional[float]:
         return None
 
 
-def extract_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict]:
+_clean_numeric_str_cached = lru_cache(maxsize=CELL_CACHE_SIZE)(_clean_numeric_str)
+
+
+def extract_sheet_columns(df: pd.DataFrame, sheet_name: str) -> Columns:
     """
     Extract data from a single sheet with auto-detection of structure.
+
+    Returns:
+        Columns: parallel (labels, amounts, notes) lists, one entry per fact
     """
-    rows = []
+    labels, amounts, notes = columns = ([], [], [])
 
     if df.empty or len(df) < 2:
-        return rows
+        return columns
 
     # Auto-detect header row
     header_row = detect_header_row(df)
@@ -177,9 +254,10 @@ def extract_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict]:
 
     # Set header
     if header_row > 0:
-        # Use detected row as header
+        # Use detected row as header. The rows below are only read, so
+        # relabel the slice rather than copying the sheet
         new_header = df.iloc[header_row].tolist()
-        df = df.iloc[header_row + 1:].copy()
+        df = df.iloc[header_row + 1:]
         df.columns = new_header
 
     # Get the label column name
@@ -198,10 +276,20 @@ def extract_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict]:
     print(f"    Header row: {header_row}, Label column: {label_col_name}")
     print(f"    Detected periods: {date_columns[:5]}{'...' if len(date_columns) > 5 else ''}")
 
-    # Extract data
-    for _, row in df.iterrows():
-        raw_label = row.iloc[label_col] if label_col < len(row) else None
-
+    # Clean each period column in one pass. Values are looked up by label,
+    # as row[period] did: a duplicated label is ambiguous and yields nothing.
+    period_notes = []
+    amount_columns = []
+    for period in date_columns:
+        pos = df.columns.get_loc(period)
+        if isinstance(pos, (int, np.integer)):
+            period_notes.append(f"{sheet_name} | {period}")
+            amount_columns.append(list(map(clean_numeric_value, df.iloc[:, pos].tolist())))
+
+    # Emit long format row-major: every period of a line item before the next one
+    skip_labels = ['total', 'subtotal', 'operating', 'non-operating', 'discontinued']
+    raw_labels = df.iloc[:, label_col].tolist()
+    for raw_label, row_amounts in zip(raw_labels, zip(*amount_columns)):
         # Skip if no valid label
         if not is_label_like(raw_label):
             continue
@@ -209,68 +297,159 @@ def extract_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict]:
         label = str(raw_label).strip()
 
         # Skip obvious header/section rows
-        skip_labels = ['total', 'subtotal', 'operating', 'non-operating', 'discontinued']
         if label.lower() in skip_labels:
             continue
 
-        for period in date_columns:
-            try:
-                raw_value = row[period]
-                amount = clean_numeric_value(raw_value)
+        for note, amount in zip(period_notes, row_amounts):
+            if amount is not None:
+                labels.append(label)
+                amounts.append(amount)
+                notes.append(note)
 
-                if amount is not None:
-                    rows.append({
-                        "Line Item": label,
-                        "Amount": amount,
-                        "Note": f"{sheet_name} | {period}"
-                    })
-            except:
-                continue
+    return columns
 
-    return rows
 
+def columns_to_rows(columns: Columns) -> List[Dict]:
+    """Turn parallel (labels, amounts, notes) lists into row dicts."""
+    return [
+        {"Line Item": label, "Amount": amount, "Note": note}
+        for label, amount, note in zip(*columns)
+    ]
 
-def extract_standardized_excel(excel_path: str) -> List[Dict]:
+
+def extract_sheet(df: pd.DataFrame, sheet_name: str) -> List[Dict]:
+    """
+    Extract data from a single sheet with auto-detection of structure.
+    """
+    return columns_to_rows(extract_sheet_columns(df, sheet_name))
+
+
+def is_extractable_sheet(sheet_name: str, sheet_count: int) -> bool:
+    """
+    Check if a tab should be extracted: it looks like a financial statement,
+    or the workbook has so few tabs that all of them are.
+    """
+    # Check if this looks like a financial statement
+    sheet_name_lower = sheet_name.lower().strip()
+
+    is_standard_sheet = any(std in sheet_name_lower for std in STANDARD_TAB_NAMES)
+
+    # If there are many sheets and this doesn't match, skip it
+    return is_standard_sheet or sheet_count <= 3
+
+
+def _extract_sheet_worker(task: Tuple[str, str]) -> Tuple[Columns, str]:
+    """
+    Process-pool entry point: read and extract one tab of a workbook.
+    Returns the columns and the tab's log, which the parent prints in order.
+    """
+    excel_path, sheet_name = task
+    log = io.StringIO()
+    with redirect_stdout(log):
+        df = pd.read_excel(excel_path, sheet_name=sheet_name, header=None, engine=EXCEL_ENGINE)
+        columns = extract_sheet_columns(df, sheet_name)
+    return columns, log.getvalue()
+
+
+def extract_standardized_columns(excel_path: str, workers: int = 1) -> Columns:
     """
     Main extraction function with robust handling of real-world Excel files.
+
+    Args:
+        excel_path: Workbook to read
+        workers: Processes to extract tabs with. Each worker re-opens the
+            workbook, so this only pays off for several large tabs; 1 (the
+            default) extracts in this process.
+
+    Returns:
+        Columns: parallel (labels, amounts, notes) lists for the workbook
     """
     print(f"Reading Excel File: {os.path.basename(excel_path)}...")
 
     try:
-        # Read all sheets without assuming header position
-        xls = pd.read_excel(excel_path, sheet_name=None, header=None)
+        # Read the sheets without assuming header position. Sheet names come
+        # from the workbook index, so skipped tabs (left None) are never parsed.
+        with pd.ExcelFile(excel_path, engine=EXCEL_ENGINE) as xls:
+            sheets = dict.fromkeys(xls.sheet_names)
+            accepted = [name for name in sheets if is_extractable_sheet(name, len(sheets))]
+            parallel = workers > 1 and len(accepted) > 1
+            if not parallel:
+                for sheet_name in accepted:
+                    sheets[sheet_name] = xls.parse(sheet_name, header=None)
+
+        if parallel:
+            with ProcessPoolExecutor(max_workers=min(workers, len(accepted))) as executor:
+                tasks = [(excel_path, sheet_name) for sheet_name in accepted]
+                sheets.update(zip(accepted, executor.map(_extract_sheet_worker, tasks)))
     except Exception as e:
         print(f"CRITICAL ERROR: Could not read Excel file. {e}")
-        return []
+        return ([], [], [])
 
-    extracted_rows = []
+    labels, amounts, notes = extracted = ([], [], [])
     sheets_processed = 0
 
-    for sheet_name, df in xls.items():
-        # Check if this looks like a financial statement
-        sheet_name_lower = sheet_name.lower().strip()
-
-        is_standard_sheet = any(std in sheet_name_lower for std in STANDARD_TAB_NAMES)
-
-        if not is_standard_sheet and len(xls) > 3:
-            # If there are many sheets and this doesn't match, skip it
+    for sheet_name, sheet in sheets.items():
+        if sheet is None:
             print(f"  Skipping non-standard tab: '{sheet_name}'")
             continue
 
         print(f"  Processing Tab: '{sheet_name}'")
 
-        sheet_rows = extract_sheet(df, sheet_name)
-
-        if sheet_rows:
-            extracted_rows.extend(sheet_rows)
+        if isinstance(sheet, pd.DataFrame):
+            sheet_labels, sheet_amounts, sheet_notes = extract_sheet_columns(sheet, sheet_name)
+        else:
+            # Already extracted by a worker
+            (sheet_labels, sheet_amounts, sheet_notes), log = sheet
+            print(log, end="")
+
+        if sheet_labels:
+            labels.extend(sheet_labels)
+            amounts.extend(sheet_amounts)
+            notes.extend(sheet_notes)
             sheets_processed += 1
-            print(f"    Extracted {len(sheet_rows)} data points")
+            print(f"    Extracted {len(sheet_labels)} data points")
         else:
             print(f"    Warning: No data extracted from '{sheet_name}'")
 
-    print(f"\nProcessed {sheets_processed} sheets, {len(extracted_rows)} total data points")
+    print(f"\nProcessed {sheets_processed} sheets, {len(labels)} total data points")
+
+    return extracted
+
+
+def extract_standardized_excel(excel_path: str, workers: int = 1) -> List[Dict]:
+    """
+    Extract a workbook as row dicts with 'Line Item', 'Amount' and 'Note'.
+    See extract_standardized_columns for the arguments.
+    """
+    return columns_to_rows(extract_standardized_columns(excel_path, workers))
 
-    return extracted_rows
+
+def extract_standardized_frame(excel_path: str, workers: int = 1) -> pd.DataFrame:
+    """
+    Extract a workbook straight into a DataFrame with the OUTPUT_COLUMNS,
+    built column-wise rather than from row dicts.
+    See extract_standardized_columns for the arguments.
+    """
+    labels, amounts, notes = extract_standardized_columns(excel_path, workers)
+    return pd.DataFrame({
+        'Line Item': labels,
+        'Amount': np.asarray(amounts, dtype=np.float64),
+        'Note': notes,
+    })
+
+
+def write_extraction_csv(columns: Columns, path: str) -> None:
+    """
+    Write extracted columns as CSV without building a DataFrame.
+    The file is byte-for-byte what DataFrame.to_csv(index=False) writes
+    for the same data (pandas formats through the same csv writer).
+    """
+    labels, amounts, notes = columns
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(OUTPUT_COLUMNS)
+        # to_csv leaves NaN amounts empty
+        writer.writerows(zip(labels, ['' if amount != amount else amount for amount in amounts], notes))
 
 
 def validate_extraction(rows: List[Dict]) -> Dict:
@@ -280,20 +459,27 @@ def validate_extraction(rows: List[Dict]) -> Dict:
     if not rows:
         return {'valid': False, 'error': 'No data extracted'}
 
-    # Check for expected financial line items
-    labels = set(row['Line Item'].lower() for row in rows)
-
-    expected_items = ['revenue', 'assets', 'liabilities', 'net income', 'cash']
-    found_items = [item for item in expected_items if any(item in label for label in labels)]
-
-    # Check for numeric values
-    amounts = [row['Amount'] for row in rows if row['Amount'] != 0]
+    # One pass for labels, periods and numeric values
+    labels = set()
+    periods = set()
+    amounts = []
+    for row in rows:
+        labels.add(row['Line Item'])
+        periods.add(row['Note'].rpartition(' | ')[2])
+        if row['Amount'] != 0:
+            amounts.append(row['Amount'])
+
+    # Check for expected financial line items: one regex scan per label
+    found = set()
+    for label in {label.lower() for label in labels}:
+        found.update(_EXPECTED_ITEMS_RE.findall(label))
+    found_items = [item for item in EXPECTED_LINE_ITEMS if item in found]
 
     return {
         'valid': True,
         'total_rows': len(rows),
-        'unique_labels': len(set(row['Line Item'] for row in rows)),
-        'periods_detected': len(set(row['Note'].split(' | ')[-1] for row in rows)),
+        'unique_labels': len(labels),
+        'periods_detected': len(periods),
         'expected_items_found': found_items,
         'non_zero_values': len(amounts),
         'avg_value': sum(amounts) / len(amounts) if amounts else 0
@@ -314,7 +500,8 @@ def main():
         return 1
 
     # Extract data
-    data = extract_standardized_excel(input_path)
+    columns = extract_standardized_columns(input_path)
+    data = columns_to_rows(columns)
 
     if not data:
         print("\nNo data extracted. Please check:")
@@ -332,8 +519,7 @@ def main():
     print(f"  Expected items found: {validation['expected_items_found']}")
 
     # Save output
-    df_out = pd.DataFrame(data)
-    df_out.to_csv(OUTPUT_FILE, index=False)
+    write_extraction_csv(columns, OUTPUT_FILE)
 
     print(f"\nExtraction Complete!")
     print(f"Saved to: {OUTPUT_FILE}")
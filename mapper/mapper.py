@@ -33,12 +33,19 @@ It ensures 100% traceability to a specific rule or standard.
 import sqlite3
 import csv
 import os
+import pickle
 import sys
-from typing import Dict, Optional, Tuple, List, Set
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple, List, Set
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from config.ib_rules import build_keyword_automaton
+
 # Try to import Brain Manager
 try:
     from utils.brain_manager import BrainManager, get_brain_manager
@@ -63,8 +70,64 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "output", "taxonomy_2025.db")
 ALIAS_PATH = os.path.join(BASE_DIR, "config", "aliases.csv")
 
+# Rows fetched per round trip when streaming the label table
+LABEL_FETCH_SIZE = 10000
+
+# Method tags shared by every Tier 1/2 entry
+STANDARD_LABEL_METHOD = sys.intern("Standard Label")
+ALIAS_METHOD = sys.intern("Explicit Alias")
+
+# The mapper only reads the taxonomy: refuse writes, read pages through mmap
+# and keep the working set in a larger page cache. journal_mode is left
+# alone because the taxonomy is built in WAL mode and switching it writes.
+CONNECT_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Distinct normalized inputs whose Tier 1-5 result is memoized per mapper
+MAP_CACHE_SIZE = 4096
+
+# Distinct (method, mapping_source, depth) confidence scores memoized across mappers
+CONFIDENCE_CACHE_SIZE = 128
+
+# Overlap the hierarchy scan with the other loaders when a second core can run it
+PARALLEL_LOAD = (os.cpu_count() or 1) > 1
+
+# Every concept with its standard labels, one row per label (label columns
+# are NULL for a concept without one). The unary + keeps SQLite, which has no
+# statistics for this database, from probing idx_labels_role per concept.
+CONCEPT_LABEL_QUERY = """
+    SELECT c.element_id, c.concept_id, c.source, c.balance, c.period_type, c.data_type,
+           l.id, l.label_text
+    FROM concepts c
+    LEFT JOIN labels l ON l.concept_id = c.concept_id AND +l.label_role = 'standard'
+"""
+
+# Parent-child relationships for the Safe Mode hierarchy
+PRESENTATION_QUERY = """
+    SELECT
+        c_child.element_id as child_id,
+        c_parent.element_id as parent_id
+    FROM presentation_roles pr
+    JOIN concepts c_child ON pr.concept_id = c_child.concept_id
+    JOIN concepts c_parent ON pr.parent_concept_id = c_parent.concept_id
+    WHERE c_child.element_id IS NOT NULL
+      AND c_parent.element_id IS NOT NULL
+"""
+
+# Bump when the cached index layout changes so stale caches are rebuilt
+INDEX_CACHE_VERSION = 3
+
+# The in-memory indexes built by the loaders, in cache order
+_CACHED_INDEXES = ("reverse_id_map", "lookup_index", "concept_ids", "element_ids",
+                   "sources", "methods", "presentation_parents", "concept_metadata",
+                   "standard_labels")
+
 # Safe Parent Concepts - these are valid fallback targets
-SAFE_PARENT_CONCEPTS = {
+SAFE_PARENT_CONCEPTS = frozenset({
     # Revenue
     "us-gaap_Revenues", "us-gaap_SalesRevenueNet", "ifrs-full_Revenue",
     # COGS
@@ -91,11 +154,128 @@ SAFE_PARENT_CONCEPTS = {
     "us-gaap_DepreciationDepletionAndAmortization",
     # Interest/Tax
     "us-gaap_InterestExpense", "us-gaap_IncomeTaxExpenseBenefit",
+})
+
+
+# -------------------------------------------------
+# TIER 3: KEYWORD RULES
+# -------------------------------------------------
+# Revenue patterns
+REVENUE_KEYWORDS = ['revenue', 'sales', 'net sales', 'total sales', 'total revenue']
+
+# Cost patterns
+COST_KEYWORDS = ['cost of', 'cogs', 'cost of sales', 'cost of goods', 'cost of revenue']
+
+# Expense patterns
+EXPENSE_KEYWORDS = {
+    'research': 'us-gaap_ResearchAndDevelopmentExpense',
+    'r&d': 'us-gaap_ResearchAndDevelopmentExpense',
+    'selling': 'us-gaap_SellingGeneralAndAdministrativeExpense',
+    'general': 'us-gaap_SellingGeneralAndAdministrativeExpense',
+    'administrative': 'us-gaap_SellingGeneralAndAdministrativeExpense',
+    'sg&a': 'us-gaap_SellingGeneralAndAdministrativeExpense',
+    'depreciation': 'us-gaap_DepreciationDepletionAndAmortization',
+    'amortization': 'us-gaap_DepreciationDepletionAndAmortization',
+    'd&a': 'us-gaap_DepreciationDepletionAndAmortization',
+    'interest expense': 'us-gaap_InterestExpense',
+    'income tax': 'us-gaap_IncomeTaxExpenseBenefit',
+    'tax expense': 'us-gaap_IncomeTaxExpenseBenefit',
+}
+
+# Balance sheet patterns
+BALANCE_SHEET_KEYWORDS = {
+    'cash': 'us-gaap_CashAndCashEquivalentsAtCarryingValue',
+    'accounts receivable': 'us-gaap_AccountsReceivableNetCurrent',
+    'receivable': 'us-gaap_AccountsReceivableNetCurrent',
+    'inventory': 'us-gaap_InventoryNet',
+    'inventories': 'us-gaap_InventoryNet',
+    'property': 'us-gaap_PropertyPlantAndEquipmentNet',
+    'ppe': 'us-gaap_PropertyPlantAndEquipmentNet',
+    'accounts payable': 'us-gaap_AccountsPayableCurrent',
+    'payable': 'us-gaap_AccountsPayableCurrent',
+    'long-term debt': 'us-gaap_LongTermDebt',
+    'long term debt': 'us-gaap_LongTermDebt',
+    'total debt': 'us-gaap_LongTermDebt',
+    'stockholders equity': 'us-gaap_StockholdersEquity',
+    'shareholders equity': 'us-gaap_StockholdersEquity',
+    'retained earnings': 'us-gaap_RetainedEarningsAccumulatedDeficit',
+    'total assets': 'us-gaap_Assets',
+    'total liabilities': 'us-gaap_Liabilities',
+    'net income': 'us-gaap_NetIncomeLoss',
+    'net loss': 'us-gaap_NetIncomeLoss',
 }
 
+# (keyword, element_id, method) in priority order: revenue, cost, expense,
+# then balance sheet keywords, each group in declared order
+TIER3_RULES = tuple(
+    [(kw, 'us-gaap_Revenues', "Keyword Match (Revenue)") for kw in REVENUE_KEYWORDS]
+    + [(kw, 'us-gaap_CostOfRevenue', "Keyword Match (COGS)") for kw in COST_KEYWORDS]
+    + [(kw, element_id, f"Keyword Match ({kw})")
+       for table in (EXPENSE_KEYWORDS, BALANCE_SHEET_KEYWORDS)
+       for kw, element_id in table.items()]
+)
+
+# keyword -> ranks of the rules it triggers, and one automaton over all keywords
+_TIER3_RANKS: Dict[str, Tuple[int, ...]] = {
+    keyword: tuple(rank for rank, rule in enumerate(TIER3_RULES) if rule[0] == keyword)
+    for keyword, _, _ in TIER3_RULES
+}
+_TIER3_AUTOMATON = build_keyword_automaton(_TIER3_RANKS)
+
+
+class MapResult(NamedTuple):
+    """
+    The result of map_input.
+
+    A tuple with named fields that also answers the read-only dict access
+    callers already use (result["found"], result.get("concept_id")).
+    fallback_path is only set by the Safe Mode hierarchy fallback.
+    """
+    input: Optional[str]
+    found: bool
+    element_id: Optional[str]
+    source: Optional[str]
+    concept_id: Optional[str]
+    method: str
+    mapping_source: Optional['MappingSource']
+    confidence: float
+    confidence_explanation: str
+    fallback_path: Optional[str] = None
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return tuple.__getitem__(self, _MAP_RESULT_FIELDS[key])
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get over the field names."""
+        index = _MAP_RESULT_FIELDS.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def to_dict(self) -> dict:
+        """The result as a plain dict (fallback_path only when it is set)."""
+        result = self._asdict()
+        if self.fallback_path is None:
+            del result["fallback_path"]
+        return result
+
+
+_MAP_RESULT_FIELDS = {name: i for i, name in enumerate(MapResult._fields)}
+
+# A score depends only on its arguments, and few distinct ones occur
+if CONFIDENCE_ENGINE_AVAILABLE:
+    _mapping_confidence = lru_cache(maxsize=CONFIDENCE_CACHE_SIZE)(calculate_mapping_confidence)
+
+# Builds a MapResult from a ready tuple without the keyword-parsing __new__
+_new_map_result = tuple.__new__
+
 
 class FinancialMapper:
-    def __init__(self, db_path: str, alias_path: str, brain_manager: 'BrainManager' = None):
+    def __init__(self, db_path: str, alias_path: str, brain_manager: 'BrainManager' = None,
+                 cache_path: Optional[str] = None):
         """
         Initialize the Financial Mapper.
 
@@ -103,91 +283,223 @@ class FinancialMapper:
             db_path: Path to the taxonomy database
             alias_path: Path to the aliases CSV file
             brain_manager: Optional BrainManager instance for BYOB integration
+            cache_path: Optional file to persist the loaded indexes in, so later
+                runs against the same database and aliases skip the scans
         """
         self.db_path = db_path
         self.alias_path = alias_path
+        self.cache_path = cache_path
         self.conn = None
 
         # Memory Indexes
-        self.lookup_index: Dict[str, dict] = {}
+        # Tier 1 & 2 entries are stored column-wise: lookup_index maps the
+        # normalized text to a row in the parallel lists below.
+        self.lookup_index: Dict[str, int] = {}
+        self.concept_ids: List[str] = []
+        self.element_ids: List[str] = []
+        self.sources: List[str] = []
+        self.methods: List[str] = []
         self.reverse_id_map: Dict[str, str] = {}  # element_id -> concept_id
         self.presentation_parents: Dict[str, List[str]] = {}  # child -> [parents]
+        # concept_id -> (balance, period_type, data_type), and first standard label
+        self.concept_metadata: Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+        self.standard_labels: Dict[str, Optional[str]] = {}
         self.safe_mode_enabled = True
 
+        # Tier 4 concept-name index, derived from reverse_id_map at connect time
+        self._concept_order: List[str] = []  # element_ids in reverse_id_map order
+        self._concept_names: List[str] = []  # normalized name for each of those
+        self._concept_name_ranks: Dict[str, List[int]] = {}  # name -> positions
+        self._concept_name_starts: List[int] = []  # offset of each name when joined
+        self._concept_names_joined = ""
+        self._concept_name_chars: frozenset = frozenset()
+        self._longest_concept_name = 0
+        # element_id -> _find_safe_parent result, for every concept that has one
+        self.safe_parents: Dict[str, Tuple[str, int, Tuple[str, ...]]] = {}
+
+        # Memo of Tier 1-5 results; cleared whenever the indexes are (re)loaded
+        self._resolve_cached = lru_cache(maxsize=MAP_CACHE_SIZE)(self._resolve_fields)
+
         # BYOB Integration
         self.brain_manager = brain_manager
         self.brain_enabled = brain_manager is not None and BRAIN_AVAILABLE
 
     def connect(self):
-        if not os.path.exists(self.db_path):
-            raise FileNotFoundError(f"Database not found at {self.db_path}")
+        # One stat both checks the database exists and keys the index cache
+        try:
+            db_stat = os.stat(self.db_path)
+        except OSError:
+            raise FileNotFoundError(f"Database not found at {self.db_path}") from None
         self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
+        for pragma in CONNECT_PRAGMAS:
+            self.conn.execute(pragma)
 
         # Load data immediately upon connection
-        self._load_reverse_id_map()
-        self._load_db_labels()
-        self._load_aliases()
-        self._load_presentation_hierarchy()
-
-    def _normalize(self, text: str) -> str:
-        """Strict normalization: lowercase, stripped."""
-        if not text: return ""
-        return text.strip().lower()
-
-    def _load_reverse_id_map(self):
-        """Cache element_id (us-gaap_Assets) -> concept_id (UUID) for fast alias resolution."""
-        print("  Loading Concept ID map...")
-        cur = self.conn.cursor()
-        cur.execute("SELECT element_id, concept_id FROM concepts WHERE element_id IS NOT NULL")
-        count = 0
-        for row in cur.fetchall():
-            self.reverse_id_map[row['element_id']] = row['concept_id']
-            count += 1
-        print(f"    Loaded {count:,} canonical IDs.")
-
-    def _load_db_labels(self):
-        """Tier 2: Load all standard labels from the database."""
-        print("  Indexing Taxonomy Labels (Tier 2)...")
-        cur = self.conn.cursor()
+        self._resolve_cached.cache_clear()
+        signature = self._index_signature(db_stat) if self.cache_path else None
+        if not self._load_index_cache(signature):
+            if PARALLEL_LOAD:
+                # The hierarchy scan is independent of the other loaders and spends
+                # its time inside SQLite with the GIL released, so overlap it on a
+                # second connection. Its rows are indexed (and logged) in order.
+                with ThreadPoolExecutor(max_workers=1) as pool:
+                    edges = pool.submit(self._fetch_presentation_edges)
+                    self._load_concepts_and_labels()
+                    self._load_aliases()
+                    self._load_presentation_hierarchy(edges.result())
+            else:
+                self._load_concepts_and_labels()
+                self._load_aliases()
+                self._load_presentation_hierarchy()
+            self._save_index_cache(signature)
+        self._build_concept_name_index()
+        self._build_safe_parent_index()
+
+    def _index_signature(self, db_stat: os.stat_result) -> tuple:
+        """Identify the inputs the indexes were built from (files, sizes, mtimes)."""
+        signature = [INDEX_CACHE_VERSION,
+                     (os.path.abspath(self.db_path), db_stat.st_size, db_stat.st_mtime_ns)]
+        # WAL writes land in the -wal file before the database file changes
+        for path in (self.db_path + "-wal", self.alias_path):
+            try:
+                stat = os.stat(path)
+                signature.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append((os.path.abspath(path), None, None))
+        return tuple(signature)
+
+    def _load_index_cache(self, signature: Optional[tuple]) -> bool:
+        """Restore the indexes from cache_path if it matches the current inputs."""
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cached_signature, indexes = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"  Warning: Ignoring unreadable index cache {self.cache_path}: {e}")
+            return False
+        if cached_signature != signature:
+            return False
+
+        for name, value in zip(_CACHED_INDEXES, indexes):
+            setattr(self, name, value)
+        print(f"  Loaded cached indexes ({len(self.lookup_index):,} labels and aliases, "
+              f"{len(self.reverse_id_map):,} canonical IDs).")
+        return True
+
+    def _save_index_cache(self, signature: Optional[tuple]):
+        """Persist the freshly built indexes to cache_path, if one was given."""
+        if not self.cache_path:
+            return
+        indexes = tuple(getattr(self, name) for name in _CACHED_INDEXES)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((signature, indexes), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"  Warning: Could not write index cache {self.cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load_concepts_and_labels(self):
+        """
+        One pass over the concepts and their standard labels.
 
-        # Get standard labels joined with source info
-        query = """
-            SELECT l.label_text, c.concept_id, c.element_id, c.source
-            FROM labels l
-            JOIN concepts c ON l.concept_id = c.concept_id
-            WHERE l.label_role = 'standard'
+        Caches element_id (us-gaap_Assets) -> concept_id (UUID) for fast alias
+        resolution and every concept's metadata for get_concept_metadata, and
+        indexes the standard labels (Tier 2).
         """
-        cur.execute(query)
-        count = 0
-        for row in cur.fetchall():
-            norm_label = self._normalize(row['label_text'])
-            # Only add if not already present (collisions favor first entry, or explicit alias later)
-            if norm_label not in self.lookup_index:
-                self.lookup_index[norm_label] = {
-                    "concept_id": row['concept_id'],
-                    "element_id": row['element_id'],
-                    "source": row['source'],
-                    "method": "Standard Label",
-                    "match_text": row['label_text']
-                }
-                count += 1
-        print(f"    Indexed {count:,} standard labels.")
+        print("  Loading Concept ID map and Taxonomy Labels (Tier 2)...")
+        cur = self.conn.cursor()
+        cur.row_factory = None
+        cur.arraysize = LABEL_FETCH_SIZE
+        cur.execute(CONCEPT_LABEL_QUERY)
+
+        reverse_id_map = self.reverse_id_map
+        metadata = self.concept_metadata
+        standard_labels = self.standard_labels
+        index = self.lookup_index
+        before = len(index)
+        # Only a few hundred distinct metadata triples and a handful of sources
+        # occur; share one object each rather than a fresh copy per row.
+        pool: Dict[Any, Any] = {}
+        shared = pool.setdefault
+        # Rows come concept by concept, not in label order, so remember which
+        # label each entry came from: labels that normalize alike still
+        # resolve to the first in table order.
+        label_ids: Dict[str, int] = {}
+        concept = element = None
+        # Stream in batches; explicit aliases override labels later
+        while rows := cur.fetchmany():
+            for element_id, concept_id, source, balance, period_type, data_type, label_id, label_text in rows:
+                if concept_id == concept:
+                    # Another standard label of the same concept; reuse its ID strings
+                    concept_id, element_id = concept, element
+                else:
+                    concept, element = concept_id, element_id
+                    if element_id is not None:
+                        reverse_id_map[element_id] = concept_id
+                    meta = (balance, period_type, data_type)
+                    metadata[concept_id] = shared(meta, meta)
+                    # A concept's labels arrive in table order, so its first is
+                    # the label a LIMIT 1 lookup would return
+                    if label_id is not None:
+                        standard_labels[concept_id] = label_text
+                if label_id is None:
+                    continue
+
+                norm_label = label_text.strip().lower() if label_text else ""
+                if norm_label not in index:
+                    label_ids[norm_label] = label_id
+                    index[norm_label] = len(self.concept_ids)
+                    self.concept_ids.append(concept_id)
+                    self.element_ids.append(element_id)
+                    self.sources.append(shared(source, source))
+                    self.methods.append(STANDARD_LABEL_METHOD)
+                elif label_id < label_ids.get(norm_label, label_id):
+                    label_ids[norm_label] = label_id
+                    self._set_lookup(norm_label, concept_id, element_id,
+                                     shared(source, source), STANDARD_LABEL_METHOD)
+        print(f"    Loaded {len(self.reverse_id_map):,} canonical IDs.")
+        print(f"    Indexed {len(index) - before:,} standard labels.")
 
     def _load_aliases(self):
         """Tier 1: Load aliases from CSV. These OVERRIDE standard labels."""
-        if not os.path.exists(self.alias_path):
+        try:
+            f = open(self.alias_path, 'r', encoding='utf-8-sig')
+        except FileNotFoundError:
             print(f"  Warning: No alias file found at {self.alias_path}. Skipping Tier 1.")
             return
 
         print("  Indexing Aliases (Tier 1)...")
         count = 0
-        with open(self.alias_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
+        with f:
+            reader = csv.reader(f)
+            # Resolve the columns once; a repeated name keeps its last position,
+            # as it would with csv.DictReader
+            columns = {name: i for i, name in enumerate(next(reader, []))}
+            alias_col = columns.get('alias')
+            element_col = columns.get('element_id')
+            source_col = columns.get('source')
+            if alias_col is None or element_col is None:
+                print(f"    [WARNING] {self.alias_path} has no alias/element_id columns.")
+                return
+
             for row in reader:
-                alias = row.get('alias')
-                target_element_id = row.get('element_id')
-                source = row.get('source', 'MANUAL')
+                # Short rows (comments, blank lines) lack the alias or target
+                width = len(row)
+                if alias_col >= width or element_col >= width:
+                    continue
+                alias = row[alias_col]
+                target_element_id = row[element_col]
+                if source_col is None:
+                    source = 'MANUAL'
+                else:
+                    source = row[source_col] if source_col < width else None
 
                 if not alias or not target_element_id:
                     continue
@@ -198,48 +510,167 @@ class FinancialMapper:
                     continue
 
                 concept_id = self.reverse_id_map[target_element_id]
-                norm_alias = self._normalize(alias)
+                norm_alias = alias.strip().lower()
 
                 # Overwrite existing entry if any
-                self.lookup_index[norm_alias] = {
-                    "concept_id": concept_id,
-                    "element_id": target_element_id,
-                    "source": source,
-                    "method": "Explicit Alias",
-                    "match_text": alias
-                }
+                self._set_lookup(norm_alias, concept_id, target_element_id,
+                                 source, ALIAS_METHOD)
                 count += 1
         print(f"    Indexed {count} aliases.")
 
-    def _load_presentation_hierarchy(self):
+    def _set_lookup(self, norm_text: str, concept_id: str, element_id: str,
+                    source: str, method: str):
+        """Store a Tier 1/2 entry, reusing the row of any entry it replaces."""
+        row = self.lookup_index.get(norm_text)
+        if row is None:
+            self.lookup_index[norm_text] = len(self.concept_ids)
+            self.concept_ids.append(concept_id)
+            self.element_ids.append(element_id)
+            self.sources.append(source)
+            self.methods.append(method)
+        else:
+            self.concept_ids[row] = concept_id
+            self.element_ids[row] = element_id
+            self.sources[row] = source
+            self.methods[row] = method
+
+    def get_lookup_entry(self, norm_text: str) -> Optional[dict]:
+        """Return the Tier 1/2 entry for normalized text as a dict, or None."""
+        row = self.lookup_index.get(norm_text)
+        if row is None:
+            return None
+        return {
+            "concept_id": self.concept_ids[row],
+            "element_id": self.element_ids[row],
+            "source": self.sources[row],
+            "method": self.methods[row]
+        }
+
+    def _fetch_presentation_edges(self, conn: Optional[sqlite3.Connection] = None) -> Iterable[Tuple[str, str]]:
+        """
+        Run the hierarchy query and return its (child_id, parent_id) rows.
+
+        On a given connection the rows stream from the cursor. Without one
+        this opens its own read-only connection and returns them as a list,
+        so it can run on a worker thread while the other loaders use
+        self.conn.
+        """
+        if conn is not None:
+            cur = conn.cursor()
+            cur.row_factory = None
+            return cur.execute(PRESENTATION_QUERY)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for pragma in CONNECT_PRAGMAS:
+                conn.execute(pragma)
+            return conn.execute(PRESENTATION_QUERY).fetchall()
+        finally:
+            conn.close()
+
+    def _load_presentation_hierarchy(self, edges: Optional[Iterable[Tuple[str, str]]] = None):
         """Load presentation hierarchy for Safe Mode fallback."""
         print("  Loading Presentation Hierarchy (Tier 3 - Safe Mode)...")
-        cur = self.conn.cursor()
+        if edges is None:
+            edges = self._fetch_presentation_edges(self.conn)
 
-        # Get parent-child relationships
-        query = """
-            SELECT
-                c_child.element_id as child_id,
-                c_parent.element_id as parent_id
-            FROM presentation_roles pr
-            JOIN concepts c_child ON pr.concept_id = c_child.concept_id
-            JOIN concepts c_parent ON pr.parent_concept_id = c_parent.concept_id
-            WHERE c_child.element_id IS NOT NULL
-              AND c_parent.element_id IS NOT NULL
-        """
-        cur.execute(query)
         count = 0
-        for row in cur.fetchall():
-            child_id = row['child_id']
-            parent_id = row['parent_id']
-            if child_id not in self.presentation_parents:
-                self.presentation_parents[child_id] = []
-            if parent_id not in self.presentation_parents[child_id]:
-                self.presentation_parents[child_id].append(parent_id)
+        parents_of = self.presentation_parents.setdefault
+        for child_id, parent_id in edges:
+            parents = parents_of(child_id, [])
+            if parent_id not in parents:
+                parents.append(parent_id)
                 count += 1
         print(f"    Loaded {count:,} hierarchy relationships.")
 
-    def _find_safe_parent(self, element_id: str, max_depth: int = 5) -> Optional[Tuple[str, int, List[str]]]:
+    def _build_concept_name_index(self):
+        """
+        Index the normalized concept names (element_id after its prefix) that
+        Tier 4 compares inputs against.
+
+        Names found inside an input are looked up by the input's substrings;
+        names containing an input are found with str.find over all names
+        joined into one string. Both give positions in reverse_id_map order,
+        which is the order Tier 4 tries candidates in.
+        """
+        self._concept_order = list(self.reverse_id_map)
+        self._concept_names = [element_id.split('_', 1)[-1].strip().lower()
+                               for element_id in self._concept_order]
+        self._concept_name_ranks = {}
+        self._concept_name_starts = []
+        offset = 0
+        for rank, name in enumerate(self._concept_names):
+            self._concept_name_ranks.setdefault(name, []).append(rank)
+            self._concept_name_starts.append(offset)
+            offset += len(name) + 1
+        self._concept_names_joined = "\n".join(self._concept_names)
+        self._concept_name_chars = frozenset(self._concept_names_joined)
+        self._longest_concept_name = max(map(len, self._concept_names), default=0)
+
+    def _match_concept_names(self, norm_input: str) -> List[int]:
+        """
+        Positions (in reverse_id_map order) of the concepts whose normalized
+        name is contained in norm_input or contains it.
+        """
+        names = self._concept_names
+        if not norm_input:
+            return list(range(len(names)))
+        ranks = set()
+
+        # Names inside the input: every substring up to the longest name
+        ranks.update(self._concept_name_ranks.get("", ()))
+        get_ranks = self._concept_name_ranks.get
+        size = len(norm_input)
+        for start in range(size):
+            for end in range(start + 1, min(size, start + self._longest_concept_name) + 1):
+                found = get_ranks(norm_input[start:end])
+                if found:
+                    ranks.update(found)
+
+        # Names containing the input: search the joined names, keeping hits
+        # that lie within a single name. Names have no spaces, so most
+        # multi-word inputs skip the search.
+        joined = self._concept_names_joined
+        starts = self._concept_name_starts
+        pos = joined.find(norm_input) if self._concept_name_chars.issuperset(norm_input) else -1
+        while pos != -1:
+            rank = bisect_right(starts, pos) - 1
+            if pos + size <= starts[rank] + len(names[rank]):
+                ranks.add(rank)
+                if rank + 1 == len(starts):
+                    break
+                pos = joined.find(norm_input, starts[rank + 1])
+            else:
+                pos = joined.find(norm_input, pos + 1)
+
+        return sorted(ranks)
+
+    def _build_safe_parent_index(self, max_depth: int = 5):
+        """
+        Precompute _find_safe_parent for every concept it finds a parent for.
+
+        Walking down from the safe parents finds the few concepts within
+        max_depth levels of one; only those are walked up, so Tier 4 looks
+        results up instead of searching the hierarchy per candidate.
+        """
+        children_of: Dict[str, List[str]] = {}
+        for child_id, parents in self.presentation_parents.items():
+            for parent_id in parents:
+                children_of.setdefault(parent_id, []).append(child_id)
+
+        reachable: Set[str] = set()
+        level = set(SAFE_PARENT_CONCEPTS)
+        for _ in range(max_depth):
+            level = {child for node in level for child in children_of.get(node, ())} - reachable
+            reachable |= level
+
+        self.safe_parents = {}
+        for element_id in reachable:
+            safe_parent = self._find_safe_parent(element_id, max_depth)
+            if safe_parent:
+                self.safe_parents[element_id] = safe_parent
+
+    def _find_safe_parent(self, element_id: str, max_depth: int = 5) -> Optional[Tuple[str, int, Tuple[str, ...]]]:
         """
         Walk up the presentation hierarchy to find a valid safe parent.
 
@@ -250,11 +681,13 @@ class FinancialMapper:
         Returns:
             (safe_parent_id, depth, path) or None
         """
+        # A concept is never its own safe parent
+        targets = SAFE_PARENT_CONCEPTS.difference((element_id,))
         visited = set()
-        queue = [(element_id, 0, [element_id])]
+        queue = deque([(element_id, 0, (element_id,))])
 
         while queue:
-            current, depth, path = queue.pop(0)
+            current, depth, path = queue.popleft()
 
             if depth > max_depth:
                 continue
@@ -264,14 +697,14 @@ class FinancialMapper:
             visited.add(current)
 
             # Check if current concept is a safe parent
-            if current in SAFE_PARENT_CONCEPTS and current != element_id:
+            if current in targets:
                 return (current, depth, path)
 
             # Get parents
             parents = self.presentation_parents.get(current, [])
             for parent in parents:
                 if parent not in visited:
-                    queue.append((parent, depth + 1, path + [parent]))
+                    queue.append((parent, depth + 1, path + (parent,)))
 
         return None
 
@@ -279,97 +712,33 @@ class FinancialMapper:
         """
         Try to find a partial match for revenue/expense-like labels.
         This handles cases like "Product Revenue" or "Service Costs".
-        """
-        norm_input = self._normalize(raw_input)
-
-        # Revenue patterns
-        revenue_keywords = ['revenue', 'sales', 'net sales', 'total sales', 'total revenue']
-        for kw in revenue_keywords:
-            if kw in norm_input:
-                element_id = 'us-gaap_Revenues'
-                if element_id in self.reverse_id_map:
-                    return {
-                        "concept_id": self.reverse_id_map[element_id],
-                        "element_id": element_id,
-                        "source": "US_GAAP",
-                        "method": "Keyword Match (Revenue)",
-                        "match_text": raw_input
-                    }
 
-        # Cost patterns
-        cost_keywords = ['cost of', 'cogs', 'cost of sales', 'cost of goods', 'cost of revenue']
-        for kw in cost_keywords:
-            if kw in norm_input:
-                element_id = 'us-gaap_CostOfRevenue'
-                if element_id in self.reverse_id_map:
-                    return {
-                        "concept_id": self.reverse_id_map[element_id],
-                        "element_id": element_id,
-                        "source": "US_GAAP",
-                        "method": "Keyword Match (COGS)",
-                        "match_text": raw_input
-                    }
-
-        # Expense patterns
-        expense_map = {
-            'research': 'us-gaap_ResearchAndDevelopmentExpense',
-            'r&d': 'us-gaap_ResearchAndDevelopmentExpense',
-            'selling': 'us-gaap_SellingGeneralAndAdministrativeExpense',
-            'general': 'us-gaap_SellingGeneralAndAdministrativeExpense',
-            'administrative': 'us-gaap_SellingGeneralAndAdministrativeExpense',
-            'sg&a': 'us-gaap_SellingGeneralAndAdministrativeExpense',
-            'depreciation': 'us-gaap_DepreciationDepletionAndAmortization',
-            'amortization': 'us-gaap_DepreciationDepletionAndAmortization',
-            'd&a': 'us-gaap_DepreciationDepletionAndAmortization',
-            'interest expense': 'us-gaap_InterestExpense',
-            'income tax': 'us-gaap_IncomeTaxExpenseBenefit',
-            'tax expense': 'us-gaap_IncomeTaxExpenseBenefit',
-        }
-
-        for keyword, element_id in expense_map.items():
-            if keyword in norm_input:
-                if element_id in self.reverse_id_map:
-                    return {
-                        "concept_id": self.reverse_id_map[element_id],
-                        "element_id": element_id,
-                        "source": "US_GAAP",
-                        "method": f"Keyword Match ({keyword})",
-                        "match_text": raw_input
-                    }
-
-        # Balance sheet patterns
-        bs_map = {
-            'cash': 'us-gaap_CashAndCashEquivalentsAtCarryingValue',
-            'accounts receivable': 'us-gaap_AccountsReceivableNetCurrent',
-            'receivable': 'us-gaap_AccountsReceivableNetCurrent',
-            'inventory': 'us-gaap_InventoryNet',
-            'inventories': 'us-gaap_InventoryNet',
-            'property': 'us-gaap_PropertyPlantAndEquipmentNet',
-            'ppe': 'us-gaap_PropertyPlantAndEquipmentNet',
-            'accounts payable': 'us-gaap_AccountsPayableCurrent',
-            'payable': 'us-gaap_AccountsPayableCurrent',
-            'long-term debt': 'us-gaap_LongTermDebt',
-            'long term debt': 'us-gaap_LongTermDebt',
-            'total debt': 'us-gaap_LongTermDebt',
-            'stockholders equity': 'us-gaap_StockholdersEquity',
-            'shareholders equity': 'us-gaap_StockholdersEquity',
-            'retained earnings': 'us-gaap_RetainedEarningsAccumulatedDeficit',
-            'total assets': 'us-gaap_Assets',
-            'total liabilities': 'us-gaap_Liabilities',
-            'net income': 'us-gaap_NetIncomeLoss',
-            'net loss': 'us-gaap_NetIncomeLoss',
-        }
+        The first rule (in TIER3_RULES order) whose keyword occurs in the
+        input and whose target is in the taxonomy wins. One automaton pass
+        finds every keyword occurring in the input.
+        """
+        norm_input = raw_input.strip().lower() if raw_input else ""
+
+        transitions, outputs = _TIER3_AUTOMATON
+        hits = set()
+        state = 0
+        for ch in norm_input:
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                hits |= outputs[state]
+        if not hits:
+            return None
 
-        for keyword, element_id in bs_map.items():
-            if keyword in norm_input:
-                if element_id in self.reverse_id_map:
-                    return {
-                        "concept_id": self.reverse_id_map[element_id],
-                        "element_id": element_id,
-                        "source": "US_GAAP",
-                        "method": f"Keyword Match ({keyword})",
-                        "match_text": raw_input
-                    }
+        for rank in sorted(rank for keyword in hits for rank in _TIER3_RANKS[keyword]):
+            keyword, element_id, method = TIER3_RULES[rank]
+            if element_id in self.reverse_id_map:
+                return {
+                    "concept_id": self.reverse_id_map[element_id],
+                    "element_id": element_id,
+                    "source": "US_GAAP",
+                    "method": method,
+                    "match_text": raw_input
+                }
 
         return None
 
@@ -383,7 +752,7 @@ class FinancialMapper:
         self.brain_manager = brain_manager
         self.brain_enabled = brain_manager is not None and BRAIN_AVAILABLE
 
-    def map_input(self, raw_input: str) -> dict:
+    def map_input(self, raw_input: str) -> MapResult:
         """
         The Core Function. Maps a string to a concept using tiered resolution.
 
@@ -395,9 +764,12 @@ class FinancialMapper:
         4. Safe Mode Hierarchy Fallback - confidence: 0.50-0.70 (depth-dependent)
         5. Unmapped (error) - confidence: 0.00
 
-        Returns a dict with result metadata including confidence score.
+        Returns a MapResult with result metadata including confidence score;
+        it reads like the dict this used to return (result["found"]).
         """
-        norm_input = self._normalize(raw_input)
+        # Strict normalization: lowercase, stripped. Inlined here and in the
+        # loaders, which must normalize labels exactly the same way.
+        norm_input = raw_input.strip().lower() if raw_input else ""
 
         # Tier 0: Analyst Brain (BYOB) - User memory has HIGHEST priority
         if self.brain_enabled and self.brain_manager:
@@ -411,48 +783,74 @@ class FinancialMapper:
                         MappingSource.ANALYST_BRAIN if CONFIDENCE_ENGINE_AVAILABLE else None,
                         0
                     )
-                    return {
-                        "input": raw_input,
-                        "found": True,
-                        "element_id": brain_mapping,
-                        "source": "BRAIN",
-                        "concept_id": self.reverse_id_map[brain_mapping],
-                        "method": "Analyst Brain (User Memory)",
-                        "mapping_source": MappingSource.ANALYST_BRAIN if CONFIDENCE_ENGINE_AVAILABLE else None,
-                        "confidence": confidence,
-                        "confidence_explanation": confidence_explanation
-                    }
+                    return MapResult(
+                        input=raw_input,
+                        found=True,
+                        element_id=brain_mapping,
+                        source="BRAIN",
+                        concept_id=self.reverse_id_map[brain_mapping],
+                        method="Analyst Brain (User Memory)",
+                        mapping_source=MappingSource.ANALYST_BRAIN if CONFIDENCE_ENGINE_AVAILABLE else None,
+                        confidence=confidence,
+                        confidence_explanation=confidence_explanation
+                    )
 
+        # Tiers 1-5 depend only on the normalized text, so they are memoized
+        return _new_map_result(MapResult, (raw_input, *self._resolve_cached(norm_input, self.safe_mode_enabled)))
+
+    def map_inputs(self, raw_inputs: List[str]) -> List[MapResult]:
+        """
+        Map a batch of strings, e.g. every line item of an extracted CSV.
+
+        Each distinct input is resolved once through map_input; repeats
+        share that (immutable) result.
+
+        Args:
+            raw_inputs: Strings to map, in order
+
+        Returns:
+            One map_input result per input, in the same order
+        """
+        resolved = {raw: self.map_input(raw) for raw in dict.fromkeys(raw_inputs)}
+        return [resolved[raw] for raw in raw_inputs]
+
+    def _resolve_fields(self, norm_input: str, safe_mode: bool) -> tuple:
+        """Tiers 1-5 for normalized text, as the MapResult fields after input."""
+        return tuple(MapResult(None, **self._resolve_normalized(norm_input, safe_mode)))[1:]
+
+    def _resolve_normalized(self, norm_input: str, safe_mode: bool) -> dict:
+        """Resolve normalized text through Tiers 1-5 (everything but the brain)."""
         # Tier 1 & 2: Exact Match (alias or standard label)
-        if norm_input in self.lookup_index:
-            match = self.lookup_index[norm_input]
+        row = self.lookup_index.get(norm_input)
+        if row is not None:
+            source = self.sources[row]
+            method = self.methods[row]
             # Determine mapping source based on method
             mapping_source = None
             if CONFIDENCE_ENGINE_AVAILABLE:
-                if match["source"] == "ALIAS":
+                if source == "ALIAS":
                     mapping_source = MappingSource.ALIAS
                 else:
                     mapping_source = MappingSource.EXACT_LABEL
 
             confidence, confidence_explanation = self._calculate_confidence(
-                match["method"],
+                method,
                 mapping_source,
                 0
             )
             return {
-                "input": raw_input,
                 "found": True,
-                "element_id": match["element_id"],
-                "source": match["source"],
-                "concept_id": match["concept_id"],
-                "method": match["method"],
+                "element_id": self.element_ids[row],
+                "source": source,
+                "concept_id": self.concept_ids[row],
+                "method": method,
                 "mapping_source": mapping_source,
                 "confidence": confidence,
                 "confidence_explanation": confidence_explanation
             }
 
         # Tier 3: Keyword/Partial Match
-        partial_match = self._try_partial_match(raw_input)
+        partial_match = self._try_partial_match(norm_input)
         if partial_match:
             mapping_source = MappingSource.KEYWORD if CONFIDENCE_ENGINE_AVAILABLE else None
             confidence, confidence_explanation = self._calculate_confidence(
@@ -461,7 +859,6 @@ class FinancialMapper:
                 0
             )
             return {
-                "input": raw_input,
                 "found": True,
                 "element_id": partial_match["element_id"],
                 "source": partial_match["source"],
@@ -473,34 +870,32 @@ class FinancialMapper:
             }
 
         # Tier 4: Safe Mode - Walk up hierarchy
-        if self.safe_mode_enabled:
-            # Try to find if the input contains any known element_id
-            for element_id in self.reverse_id_map.keys():
-                # Check if element_id name (after prefix) matches
-                concept_name = element_id.split('_', 1)[-1] if '_' in element_id else element_id
-                if self._normalize(concept_name) in norm_input or norm_input in self._normalize(concept_name):
-                    safe_parent = self._find_safe_parent(element_id)
-                    if safe_parent:
-                        parent_id, depth, path = safe_parent
-                        mapping_source = MappingSource.HIERARCHY if CONFIDENCE_ENGINE_AVAILABLE else None
-                        method = f"Safe Parent Fallback (depth={depth})"
-                        confidence, confidence_explanation = self._calculate_confidence(
-                            method,
-                            mapping_source,
-                            depth
-                        )
-                        return {
-                            "input": raw_input,
-                            "found": True,
-                            "element_id": parent_id,
-                            "source": "US_GAAP",
-                            "concept_id": self.reverse_id_map.get(parent_id),
-                            "method": method,
-                            "mapping_source": mapping_source,
-                            "fallback_path": " -> ".join(path),
-                            "confidence": confidence,
-                            "confidence_explanation": confidence_explanation
-                        }
+        if safe_mode:
+            # Try the concepts whose name (element_id after its prefix) is in
+            # the input or contains it, in reverse_id_map order
+            for rank in self._match_concept_names(norm_input):
+                element_id = self._concept_order[rank]
+                safe_parent = self.safe_parents.get(element_id)
+                if safe_parent:
+                    parent_id, depth, path = safe_parent
+                    mapping_source = MappingSource.HIERARCHY if CONFIDENCE_ENGINE_AVAILABLE else None
+                    method = f"Safe Parent Fallback (depth={depth})"
+                    confidence, confidence_explanation = self._calculate_confidence(
+                        method,
+                        mapping_source,
+                        depth
+                    )
+                    return {
+                        "found": True,
+                        "element_id": parent_id,
+                        "source": "US_GAAP",
+                        "concept_id": self.reverse_id_map.get(parent_id),
+                        "method": method,
+                        "mapping_source": mapping_source,
+                        "fallback_path": " -> ".join(path),
+                        "confidence": confidence,
+                        "confidence_explanation": confidence_explanation
+                    }
 
         # Tier 5: Unmapped
         mapping_source = MappingSource.UNMAPPED if CONFIDENCE_ENGINE_AVAILABLE else None
@@ -510,7 +905,6 @@ class FinancialMapper:
             0
         )
         return {
-            "input": raw_input,
             "found": False,
             "element_id": None,
             "source": None,
@@ -534,46 +928,26 @@ class FinancialMapper:
             Tuple of (confidence_score, explanation)
         """
         if CONFIDENCE_ENGINE_AVAILABLE:
-            return calculate_mapping_confidence(method, mapping_source, depth)
+            return _mapping_confidence(method, mapping_source, depth)
         else:
             # Fallback if confidence engine not available
             return (1.0, "Confidence engine not available")
 
     def get_concept_metadata(self, concept_id: str) -> dict:
-        """Get full metadata for a concept from the database."""
-        if not concept_id or not self.conn:
-            return {"balance": None, "period_type": None, "data_type": None}
-
-        cur = self.conn.cursor()
-        cur.execute("""
-            SELECT balance, period_type, data_type
-            FROM concepts
-            WHERE concept_id = ?
-        """, (concept_id,))
-        row = cur.fetchone()
-
-        if row:
+        """Get full metadata for a concept (loaded at connect time)."""
+        meta = self.concept_metadata.get(concept_id)
+        if meta:
+            balance, period_type, data_type = meta
             return {
-                "balance": row['balance'],
-                "period_type": row['period_type'],
-                "data_type": row['data_type']
+                "balance": balance,
+                "period_type": period_type,
+                "data_type": data_type
             }
         return {"balance": None, "period_type": None, "data_type": None}
 
     def get_standard_label(self, concept_id: str) -> Optional[str]:
-        """Get the standard label for a concept."""
-        if not concept_id or not self.conn:
-            return None
-
-        cur = self.conn.cursor()
-        cur.execute("""
-            SELECT label_text
-            FROM labels
-            WHERE concept_id = ? AND label_role = 'standard'
-            LIMIT 1
-        """, (concept_id,))
-        row = cur.fetchone()
-        return row['label_text'] if row else None
+        """Get the standard label for a concept (loaded at connect time)."""
+        return self.standard_labels.get(concept_id)
 
 
 # -------------------------------------------------
@@ -621,15 +995,15 @@ def main():
     print(f"{'INPUT':<30} | {'STATUS':<10} | {'METHOD':<30} | {'MAPPED ID'}")
     print("-" * 120)
 
-    for txt in test_inputs:
-        res = mapper.map_input(txt)
+    results = mapper.map_inputs(test_inputs)
+    for res in results:
         status = "MATCH" if res["found"] else "MISS"
         mapped_id = res["element_id"] if res["element_id"] else "---"
         method = res["method"][:28] if res["method"] else "---"
         print(f"{res['input']:<30} | {status:<10} | {method:<30} | {mapped_id}")
 
     print("-" * 120)
-    print(f"\nMatched: {sum(1 for t in test_inputs if mapper.map_input(t)['found'])}/{len(test_inputs)}")
+    print(f"\nMatched: {sum(1 for res in results if res['found'])}/{len(test_inputs)}")
 
 if __name__ == "__main__":
     main()
@@ -24,8 +24,13 @@ Philosophy: "Maximize taxonomy utilization - use all 24,388 labels!"
 import sqlite3
 import csv
 import os
+import re
+import string
 import sys
-from typing import Dict, Optional, Tuple, List, Set
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple, List, Set
 from difflib import SequenceMatcher
 
 # Add parent directory to path for imports
@@ -45,8 +50,18 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "output", "taxonomy_2025.db")
 ALIAS_PATH = os.path.join(BASE_DIR, "config", "aliases.csv")
 
+# The mapper only reads the taxonomy: refuse writes, read pages through mmap
+# and keep the working set in a larger page cache. journal_mode is left
+# alone because the taxonomy is built in WAL mode and switching it writes.
+CONNECT_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
 # Safe Parent Concepts
-SAFE_PARENT_CONCEPTS = {
+SAFE_PARENT_CONCEPTS = frozenset({
     "us-gaap_Revenues", "us-gaap_SalesRevenueNet", "ifrs-full_Revenue",
     "us-gaap_CostOfRevenue", "us-gaap_CostOfGoodsAndServicesSold",
     "us-gaap_OperatingExpenses", "us-gaap_SellingGeneralAndAdministrativeExpense",
@@ -63,8 +78,78 @@ SAFE_PARENT_CONCEPTS = {
     "us-gaap_NetIncomeLoss",
     "us-gaap_DepreciationDepletionAndAmortization",
     "us-gaap_InterestExpense", "us-gaap_IncomeTaxExpenseBenefit",
+})
+
+# Tier 2.5 label roles for the prefix, contains and word searches, in the
+# order SQLite's role index returns them (sorted)
+PREFIX_SEARCH_ROLES = ('net', 'standard', 'total')
+CONTAINS_SEARCH_ROLES = ('net', 'standard', 'terse', 'total')
+WORD_SEARCH_ROLES = ('standard', 'terse', 'total')
+
+# Concept metadata for the concept_ids bound to the IN list ({} placeholders)
+CONCEPT_METADATA_QUERY = """
+    SELECT concept_id, balance, period_type, data_type
+    FROM concepts
+    WHERE concept_id IN ({})
+"""
+
+# A concept's first standard label. The unary + keeps SQLite on the
+# concept_id index; left to itself it walks every standard label by role.
+STANDARD_LABEL_QUERY = """
+    SELECT label_text
+    FROM labels
+    WHERE concept_id = ? AND +label_role = 'standard'
+    LIMIT 1
+"""
+
+# Bound parameters per IN query, under SQLite's default limit of 999
+SQLITE_MAX_PARAMS = 900
+
+# Distinct inputs whose Tier 1-5 result is memoized per mapper
+MAP_CACHE_SIZE = 4096
+
+# Tier 3 keyword mappings (much smaller than before), tried in order. With
+# this few keywords, plain substring checks beat a keyword automaton.
+KEYWORD_FALLBACK_MAP = {
+    'revenue': 'us-gaap_Revenues',
+    'sales': 'us-gaap_Revenues',
+    'cost of': 'us-gaap_CostOfRevenue',
+    'cogs': 'us-gaap_CostOfRevenue',
+    'net income': 'us-gaap_NetIncomeLoss',
+    'cash': 'us-gaap_CashAndCashEquivalentsAtCarryingValue',
+    'assets': 'us-gaap_Assets',
+    'liabilities': 'us-gaap_Liabilities',
 }
 
+# Tier 2.5 score boost per label role
+LABEL_ROLE_BOOSTS = {
+    'standard': 10,
+    'total': 8,
+    'net': 7,
+    'terse': 5,
+    'verbose': 3,
+}
+
+# SQLite's LOWER() and LIKE only fold ASCII letters
+_SQL_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Separates the lowered labels joined into one string for substring search
+_LABEL_SEPARATOR = "\0"
+
+
+def _sql_lower(text: str) -> str:
+    """Lowercase text the way SQLite's LOWER() does (ASCII letters only)."""
+    return text.lower() if text.isascii() else text.translate(_SQL_LOWER)
+
+
+def _like_matcher(pattern: str) -> Callable[[str], bool]:
+    """
+    A predicate testing lowered text against a lowered SQL LIKE pattern
+    (% is any run of characters, _ is any one character, no ESCAPE).
+    """
+    regex = "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in pattern)
+    return re.compile(regex, re.DOTALL).fullmatch
+
 
 class EnhancedFinancialMapper:
     """
@@ -83,8 +168,33 @@ class EnhancedFinancialMapper:
         self.lookup_index: Dict[str, dict] = {}
         self.reverse_id_map: Dict[str, str] = {}
         self.presentation_parents: Dict[str, List[str]] = {}
+
+        # Tier 2.5 label index: every label row in table order as
+        # (element_id, concept_id, source, label_text, label_role), its text
+        # lowered like SQLite's LOWER(), and row positions by exact text
+        self._label_rows: List[Tuple[str, str, str, str, str]] = []
+        self._label_keys: List[str] = []
+        self._label_by_key: Dict[str, int] = {}
+        # Per role (None for all roles): the lowered labels joined into one
+        # string, each preceded by _LABEL_SEPARATOR, with the offset of each
+        # separator (plus an end sentinel) and the matching row positions
+        self._label_text_index: Dict[Optional[str], Tuple[str, List[int], List[int]]] = {}
+        # Every 3-character run inside a word of some lowered label
+        self._label_trigrams: frozenset = frozenset()
+
+        # Tier 4 concept-name index (see _build_concept_name_index)
+        self._concept_order: List[str] = []  # element_ids in reverse_id_map order
+        self._concept_names: List[str] = []  # normalized name for each of those
+        self._concept_name_ranks: Dict[str, List[int]] = {}  # name -> positions
+        self._concept_name_starts: List[int] = []  # offset of each name when joined
+        self._concept_names_joined = ""
+        self._concept_name_chars: frozenset = frozenset()
+        self._longest_concept_name = 0
         self.safe_mode_enabled = True
 
+        # Memo of Tier 1-5 results; cleared whenever the indexes are (re)loaded
+        self._resolve_cached = lru_cache(maxsize=MAP_CACHE_SIZE)(self._resolve)
+
         # BYOB Integration
         self.brain_manager = brain_manager
         self.brain_enabled = brain_manager is not None and BRAIN_AVAILABLE
@@ -105,30 +215,32 @@ class EnhancedFinancialMapper:
             raise FileNotFoundError(f"Database not found at {self.db_path}")
         self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
+        for pragma in CONNECT_PRAGMAS:
+            self.conn.execute(pragma)
 
         # Load data immediately upon connection
+        self._resolve_cached.cache_clear()
         self._load_reverse_id_map()
         self._load_db_labels()
         self._load_aliases()
         self._load_presentation_hierarchy()
+        self._load_label_search_index()
+        self._build_concept_name_index()
 
     def _normalize(self, text: str) -> str:
         """Strict normalization: lowercase, stripped."""
         if not text: return ""
         return text.strip().lower()
 
-    def _similarity_score(self, a: str, b: str) -> float:
-        """Calculate string similarity score (0.0 to 1.0)."""
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
     def _load_reverse_id_map(self):
         """Cache element_id -> concept_id for fast alias resolution."""
         print("  Loading Concept ID map...")
         cur = self.conn.cursor()
+        cur.row_factory = None
         cur.execute("SELECT element_id, concept_id FROM concepts WHERE element_id IS NOT NULL")
         count = 0
-        for row in cur.fetchall():
-            self.reverse_id_map[row['element_id']] = row['concept_id']
+        for element_id, concept_id in cur:
+            self.reverse_id_map[element_id] = concept_id
             count += 1
         print(f"    Loaded {count:,} canonical IDs.")
 
@@ -136,6 +248,7 @@ class EnhancedFinancialMapper:
         """Tier 2: Load all standard labels from the database."""
         print("  Indexing Taxonomy Labels (Tier 2)...")
         cur = self.conn.cursor()
+        cur.row_factory = None
 
         query = """
             SELECT l.label_text, c.concept_id, c.element_id, c.source
@@ -145,15 +258,15 @@ class EnhancedFinancialMapper:
         """
         cur.execute(query)
         count = 0
-        for row in cur.fetchall():
-            norm_label = self._normalize(row['label_text'])
+        for label_text, concept_id, element_id, source in cur:
+            norm_label = self._normalize(label_text)
             if norm_label not in self.lookup_index:
                 self.lookup_index[norm_label] = {
-                    "concept_id": row['concept_id'],
-                    "element_id": row['element_id'],
-                    "source": row['source'],
+                    "concept_id": concept_id,
+                    "element_id": element_id,
+                    "source": source,
                     "method": "Standard Label",
-                    "match_text": row['label_text']
+                    "match_text": label_text
                 }
                 count += 1
         print(f"    Indexed {count:,} standard labels.")
@@ -196,6 +309,7 @@ class EnhancedFinancialMapper:
         """Load presentation hierarchy for Safe Mode fallback."""
         print("  Loading Presentation Hierarchy (Tier 4 - Safe Mode)...")
         cur = self.conn.cursor()
+        cur.row_factory = None
 
         query = """
             SELECT
@@ -209,9 +323,7 @@ class EnhancedFinancialMapper:
         """
         cur.execute(query)
         count = 0
-        for row in cur.fetchall():
-            child_id = row['child_id']
-            parent_id = row['parent_id']
+        for child_id, parent_id in cur:
             if child_id not in self.presentation_parents:
                 self.presentation_parents[child_id] = []
             if parent_id not in self.presentation_parents[child_id]:
@@ -223,6 +335,87 @@ class EnhancedFinancialMapper:
     # NEW: TIER 2.5 - FUZZY TAXONOMY LABEL SEARCH
     # =========================================================================
 
+    def _load_label_search_index(self):
+        """Tier 2.5: Load every label once so searches run in memory."""
+        print("  Indexing All Taxonomy Labels (Tier 2.5)...")
+        cur = self.conn.cursor()
+        cur.row_factory = None
+        cur.execute("""
+            SELECT c.element_id, c.concept_id, c.source, l.label_text, l.label_role
+            FROM labels l
+            JOIN concepts c ON l.concept_id = c.concept_id
+            WHERE l.label_text IS NOT NULL
+            ORDER BY l.id
+        """)
+        self._label_rows = []
+        self._label_keys = []
+        self._label_by_key = {}
+        groups: Dict[Optional[str], List[int]] = {}
+        for row in cur:
+            position = len(self._label_rows)
+            key = _sql_lower(row[3])
+            self._label_rows.append(row)
+            self._label_keys.append(key)
+            self._label_by_key.setdefault(key, position)
+            groups.setdefault(row[4], []).append(position)
+
+        groups[None] = list(range(len(self._label_rows)))
+        label_text_index = {}
+        for group, positions in groups.items():
+            starts = []
+            offset = 0
+            for position in positions:
+                starts.append(offset)
+                offset += len(self._label_keys[position]) + 1
+            starts.append(offset)
+            joined = "".join(_LABEL_SEPARATOR + self._label_keys[position] for position in positions)
+            label_text_index[group] = (joined, starts, positions)
+        self._label_text_index = label_text_index
+        self._label_trigrams = frozenset(
+            word[start:start + 3]
+            for word in set(" ".join(self._label_keys).split())
+            for start in range(len(word) - 2)
+        )
+        print(f"    Indexed {len(self._label_rows):,} labels.")
+
+    def _find_labels(self, role: Optional[str], pattern: str, limit: Optional[int] = None) -> List[int]:
+        """
+        Positions, in table order, of the labels with the given role (any
+        role for None) whose lowered text matches a lowered SQL LIKE pattern.
+        With a limit, only the first limit positions.
+        """
+        core = pattern.strip('%')
+        if pattern == f"%{core}%":
+            needle = core
+        elif pattern == f"{core}%":
+            needle = _LABEL_SEPARATOR + core
+        else:
+            needle = None
+        joined, starts, positions = self._label_text_index.get(role, ("", [0], []))
+        if needle is None or '%' in core or '_' in core or _LABEL_SEPARATOR in core:
+            matches = _like_matcher(pattern)
+            keys = self._label_keys
+            return [position for position in positions if matches(keys[position])][:limit]
+
+        # A label containing the needle contains each of its words, so every
+        # 3-character run of those words; one missing from all labels means
+        # no match without scanning
+        trigrams = self._label_trigrams
+        for word in core.split():
+            for start in range(len(word) - 2):
+                if word[start:start + 3] not in trigrams:
+                    return []
+
+        # Substring search over the joined labels, skipping to the next
+        # label after each hit
+        found = []
+        at = joined.find(needle)
+        while at != -1 and len(found) != limit:
+            rank = bisect_right(starts, at) - 1
+            found.append(positions[rank])
+            at = joined.find(needle, starts[rank + 1])
+        return found
+
     def _search_taxonomy_labels(self, raw_input: str) -> Optional[dict]:
         """
         NEW in V4.0: Search all taxonomy labels with fuzzy matching.
@@ -243,130 +436,66 @@ class EnhancedFinancialMapper:
         if len(norm_input) < 3:
             return None
 
-        cur = self.conn.cursor()
-
-        # Search strategy: progressively broader searches with confidence scores
-        search_queries = [
-            # Query 1: Exact match (highest confidence)
-            ("""
-                SELECT
-                    c.element_id,
-                    c.concept_id,
-                    c.source,
-                    l.label_text,
-                    l.label_role,
-                    100 as confidence
-                FROM concepts c
-                JOIN labels l ON c.concept_id = l.concept_id
-                WHERE LOWER(l.label_text) = ?
-                LIMIT 1
-            """, (norm_input,)),
-
-            # Query 2: Starts with (high confidence)
-            ("""
-                SELECT
-                    c.element_id,
-                    c.concept_id,
-                    c.source,
-                    l.label_text,
-                    l.label_role,
-                    90 as confidence
-                FROM concepts c
-                JOIN labels l ON c.concept_id = l.concept_id
-                WHERE LOWER(l.label_text) LIKE ?
-                AND l.label_role IN ('standard', 'total', 'net')
-                ORDER BY LENGTH(l.label_text) ASC
-                LIMIT 5
-            """, (f"{norm_input}%",)),
-
-            # Query 3: Contains (medium confidence)
-            ("""
-                SELECT
-                    c.element_id,
-                    c.concept_id,
-                    c.source,
-                    l.label_text,
-                    l.label_role,
-                    70 as confidence
-                FROM concepts c
-                JOIN labels l ON c.concept_id = l.concept_id
-                WHERE LOWER(l.label_text) LIKE ?
-                AND l.label_role IN ('standard', 'terse', 'total', 'net')
-                ORDER BY LENGTH(l.label_text) ASC
-                LIMIT 10
-            """, (f"%{norm_input}%",)),
-
-            # Query 4: Word-based fuzzy matching (lower confidence)
-            ("""
-                SELECT
-                    c.element_id,
-                    c.concept_id,
-                    c.source,
-                    l.label_text,
-                    l.label_role,
-                    50 as confidence
-                FROM concepts c
-                JOIN labels l ON c.concept_id = l.concept_id
-                WHERE {}
-                AND l.label_role IN ('standard', 'terse', 'total')
-                LIMIT 15
-            """.format(" OR ".join([f"LOWER(l.label_text) LIKE '%{word}%'"
-                                     for word in norm_input.split() if len(word) > 2])),
-             None)
-        ]
-
+        # Search strategy: progressively broader searches with confidence scores,
+        # matching labels as the SQL LOWER()/LIKE searches did
+        rows = self._label_rows
         all_results = []
 
-        for query, params in search_queries:
-            try:
-                if params:
-                    cur.execute(query, params)
-                else:
-                    cur.execute(query)
-
-                results = cur.fetchall()
-                all_results.extend(results)
-
-                # If we have a high-confidence exact match, return immediately
-                if results and results[0][5] == 100:
-                    break
-
-            except Exception as e:
-                continue
+        # Search 1: Exact match on any role (highest confidence)
+        exact = self._label_by_key.get(norm_input)
+        if exact is not None:
+            all_results.append(rows[exact] + (100,))
+        else:
+            # Search 2: Starts with (high confidence), shortest labels first
+            found = [position for role in PREFIX_SEARCH_ROLES
+                     for position in self._find_labels(role, f"{norm_input}%")]
+            found.sort(key=lambda position: len(rows[position][3]))
+            all_results.extend(rows[position] + (90,) for position in found[:5])
+
+            # Search 3: Contains (medium confidence), shortest labels first
+            found = [position for role in CONTAINS_SEARCH_ROLES
+                     for position in self._find_labels(role, f"%{norm_input}%")]
+            found.sort(key=lambda position: len(rows[position][3]))
+            all_results.extend(rows[position] + (70,) for position in found[:10])
+
+            # Search 4: Word-based fuzzy matching (lower confidence) on the
+            # words of 3+ characters. The role filter only ever bound to the
+            # last word's LIKE (AND over OR), so earlier words match labels
+            # of any role. Only the first 15 labels are kept, so no word
+            # needs more than its first 15.
+            words = [word for word in norm_input.split() if len(word) > 2]
+            if len(words) == 1:
+                found = []
+                for role in WORD_SEARCH_ROLES:
+                    found += self._find_labels(role, f"%{words[0]}%", 15 - len(found))
+                all_results.extend(rows[position] + (50,) for position in found)
+            elif words:
+                found = {position for role in WORD_SEARCH_ROLES
+                         for position in self._find_labels(role, f"%{words[-1]}%", 15)}
+                for word in words[:-1]:
+                    found.update(self._find_labels(None, f"%{word}%", 15))
+                all_results.extend(rows[position] + (50,) for position in sorted(found)[:15])
 
         if not all_results:
             return None
 
-        # Calculate additional similarity scores for ranking
-        scored_results = []
-        for row in all_results:
-            element_id = row[0]
-            concept_id = row[1]
-            source = row[2]
-            label_text = row[3]
-            label_role = row[4]
-            base_confidence = row[5]
-
-            # Calculate string similarity
-            similarity = self._similarity_score(raw_input, label_text)
-
-            # Adjust confidence based on label role
-            role_boost = {
-                'standard': 10,
-                'total': 8,
-                'net': 7,
-                'terse': 5,
-                'verbose': 3
-            }.get(label_role, 0)
+        # Rank by base confidence, string similarity and label role; the
+        # first of equally scored rows wins. quick_ratio() bounds ratio()
+        # from above, so rows that cannot beat the best so far skip ratio().
+        query = raw_input.lower()
+        best_match = None
+        for element_id, concept_id, source, label_text, label_role, base_confidence in all_results:
+            role_boost = LABEL_ROLE_BOOSTS.get(label_role, 0)
+            matcher = SequenceMatcher(None, query, label_text.lower())
+            if best_match is not None and (
+                    base_confidence * 0.7 + matcher.real_quick_ratio() * 100 * 0.2 + role_boost <= best_match[5]
+                    or base_confidence * 0.7 + matcher.quick_ratio() * 100 * 0.2 + role_boost <= best_match[5]):
+                continue
 
             # Final score
-            final_score = base_confidence * 0.7 + similarity * 100 * 0.2 + role_boost
-
-            scored_results.append((element_id, concept_id, source, label_text, label_role, final_score))
-
-        # Sort by score and return best match
-        scored_results.sort(key=lambda x: x[5], reverse=True)
-        best_match = scored_results[0]
+            final_score = base_confidence * 0.7 + matcher.ratio() * 100 * 0.2 + role_boost
+            if best_match is None or final_score > best_match[5]:
+                best_match = (element_id, concept_id, source, label_text, label_role, final_score)
 
         return {
             "concept_id": best_match[1],
@@ -381,28 +510,98 @@ class EnhancedFinancialMapper:
     # MAPPING LOGIC
     # =========================================================================
 
+    def _build_concept_name_index(self):
+        """
+        Index the normalized concept names (element_id after its prefix) that
+        Tier 4 compares inputs against.
+
+        Names found inside an input are looked up by the input's substrings;
+        names containing an input are found with str.find over all names
+        joined into one string. Both give positions in reverse_id_map order,
+        which is the order Tier 4 tries candidates in.
+        """
+        self._concept_order = list(self.reverse_id_map)
+        self._concept_names = [self._normalize(element_id.split('_', 1)[-1])
+                               for element_id in self._concept_order]
+        self._concept_name_ranks = {}
+        self._concept_name_starts = []
+        offset = 0
+        for rank, name in enumerate(self._concept_names):
+            self._concept_name_ranks.setdefault(name, []).append(rank)
+            self._concept_name_starts.append(offset)
+            offset += len(name) + 1
+        self._concept_names_joined = "\n".join(self._concept_names)
+        self._concept_name_chars = frozenset(self._concept_names_joined)
+        self._longest_concept_name = max(map(len, self._concept_names), default=0)
+
+    def _match_concept_names(self, norm_input: str) -> List[int]:
+        """
+        Positions (in reverse_id_map order) of the concepts whose normalized
+        name is contained in norm_input or contains it.
+        """
+        names = self._concept_names
+        if not norm_input:
+            return list(range(len(names)))
+        ranks = set()
+
+        # Names inside the input: every substring up to the longest name
+        ranks.update(self._concept_name_ranks.get("", ()))
+        get_ranks = self._concept_name_ranks.get
+        size = len(norm_input)
+        for start in range(size):
+            for end in range(start + 1, min(size, start + self._longest_concept_name) + 1):
+                found = get_ranks(norm_input[start:end])
+                if found:
+                    ranks.update(found)
+
+        # Names containing the input: search the joined names, keeping hits
+        # that lie within a single name
+        joined = self._concept_names_joined
+        starts = self._concept_name_starts
+        pos = joined.find(norm_input) if self._concept_name_chars.issuperset(norm_input) else -1
+        while pos != -1:
+            rank = bisect_right(starts, pos) - 1
+            if pos + size <= starts[rank] + len(names[rank]):
+                ranks.add(rank)
+                if rank + 1 == len(starts):
+                    break
+                pos = joined.find(norm_input, starts[rank + 1])
+            else:
+                pos = joined.find(norm_input, pos + 1)
+
+        return sorted(ranks)
+
     def _find_safe_parent(self, element_id: str, max_depth: int = 5) -> Optional[Tuple[str, int, List[str]]]:
         """Walk up the presentation hierarchy to find a valid safe parent."""
-        visited = set()
-        queue = [(element_id, 0, [element_id])]
+        # A concept is never its own safe parent
+        targets = SAFE_PARENT_CONCEPTS.difference((element_id,))
+        # Visited concepts map to the concept they were reached from, so the
+        # path is rebuilt once a safe parent is found
+        came_from: Dict[str, Optional[str]] = {}
+        queue = deque([(element_id, 0, None)])
 
         while queue:
-            current, depth, path = queue.pop(0)
+            current, depth, child = queue.popleft()
 
             if depth > max_depth:
                 continue
 
-            if current in visited:
+            if current in came_from:
                 continue
-            visited.add(current)
-
-            if current in SAFE_PARENT_CONCEPTS and current != element_id:
+            came_from[current] = child
+
+            if current in targets:
+                path = []
+                node = current
+                while node is not None:
+                    path.append(node)
+                    node = came_from[node]
+                path.reverse()
                 return (current, depth, path)
 
-            parents = self.presentation_parents.get(current, [])
-            for parent in parents:
-                if parent not in visited:
-                    queue.append((parent, depth + 1, path + [parent]))
+            for parent in self.presentation_parents.get(current, ()):
+                if parent not in came_from:
+                    queue.append((parent, depth + 1, current))
 
         return None
 
@@ -413,19 +612,7 @@ class EnhancedFinancialMapper:
         """
         norm_input = self._normalize(raw_input)
 
-        # Simple keyword mappings (much smaller than before)
-        keyword_map = {
-            'revenue': 'us-gaap_Revenues',
-            'sales': 'us-gaap_Revenues',
-            'cost of': 'us-gaap_CostOfRevenue',
-            'cogs': 'us-gaap_CostOfRevenue',
-            'net income': 'us-gaap_NetIncomeLoss',
-            'cash': 'us-gaap_CashAndCashEquivalentsAtCarryingValue',
-            'assets': 'us-gaap_Assets',
-            'liabilities': 'us-gaap_Liabilities',
-        }
-
-        for keyword, element_id in keyword_map.items():
+        for keyword, element_id in KEYWORD_FALLBACK_MAP.items():
             if keyword in norm_input:
                 if element_id in self.reverse_id_map:
                     return {
@@ -458,8 +645,6 @@ class EnhancedFinancialMapper:
         4. Safe Mode Hierarchy
         5. Unmapped
         """
-        norm_input = self._normalize(raw_input)
-
         # Tier 0: Analyst Brain
         if self.brain_enabled and self.brain_manager:
             brain_mapping = self.brain_manager.get_mapping(raw_input)
@@ -474,14 +659,21 @@ class EnhancedFinancialMapper:
                     "method": "Analyst Brain (User Memory)"
                 }
 
+        # Tiers 1-5 depend only on the input text, so they are memoized; the
+        # copy keeps callers from editing the memoized result
+        tier, result = self._resolve_cached(raw_input, self.safe_mode_enabled)
+        self.stats[tier] += 1
+        return dict(result)
+
+    def _resolve(self, raw_input: str, safe_mode: bool) -> Tuple[str, dict]:
+        """Resolve an input through Tiers 1-5, returning its stats key and result."""
+        norm_input = self._normalize(raw_input)
+
         # Tier 1 & 2: Exact Match
         if norm_input in self.lookup_index:
             match = self.lookup_index[norm_input]
-            if match['method'] == 'Explicit Alias':
-                self.stats['tier_1_alias'] += 1
-            else:
-                self.stats['tier_2_exact'] += 1
-            return {
+            tier = 'tier_1_alias' if match['method'] == 'Explicit Alias' else 'tier_2_exact'
+            return tier, {
                 "input": raw_input,
                 "found": True,
                 "element_id": match["element_id"],
@@ -493,8 +685,7 @@ class EnhancedFinancialMapper:
         # Tier 2.5: NEW! FUZZY TAXONOMY LABEL SEARCH
         taxonomy_match = self._search_taxonomy_labels(raw_input)
         if taxonomy_match:
-            self.stats['tier_2_5_fuzzy_taxonomy'] += 1
-            return {
+            return 'tier_2_5_fuzzy_taxonomy', {
                 "input": raw_input,
                 "found": True,
                 "element_id": taxonomy_match["element_id"],
@@ -507,8 +698,7 @@ class EnhancedFinancialMapper:
         # Tier 3: Keyword Fallback
         keyword_match = self._try_keyword_fallback(raw_input)
         if keyword_match:
-            self.stats['tier_3_keyword'] += 1
-            return {
+            return 'tier_3_keyword', {
                 "input": raw_input,
                 "found": True,
                 "element_id": keyword_match["element_id"],
@@ -518,27 +708,26 @@ class EnhancedFinancialMapper:
             }
 
         # Tier 4: Safe Mode Hierarchy
-        if self.safe_mode_enabled:
-            for element_id in self.reverse_id_map.keys():
-                concept_name = element_id.split('_', 1)[-1] if '_' in element_id else element_id
-                if self._normalize(concept_name) in norm_input or norm_input in self._normalize(concept_name):
-                    safe_parent = self._find_safe_parent(element_id)
-                    if safe_parent:
-                        parent_id, depth, path = safe_parent
-                        self.stats['tier_4_hierarchy'] += 1
-                        return {
-                            "input": raw_input,
-                            "found": True,
-                            "element_id": parent_id,
-                            "source": "US_GAAP",
-                            "concept_id": self.reverse_id_map.get(parent_id),
-                            "method": f"Safe Parent Fallback (depth={depth})",
-                            "fallback_path": " -> ".join(path)
-                        }
+        if safe_mode:
+            # Try the concepts whose name (element_id after its prefix) is in
+            # the input or contains it, in reverse_id_map order
+            for rank in self._match_concept_names(norm_input):
+                element_id = self._concept_order[rank]
+                safe_parent = self._find_safe_parent(element_id)
+                if safe_parent:
+                    parent_id, depth, path = safe_parent
+                    return 'tier_4_hierarchy', {
+                        "input": raw_input,
+                        "found": True,
+                        "element_id": parent_id,
+                        "source": "US_GAAP",
+                        "concept_id": self.reverse_id_map.get(parent_id),
+                        "method": f"Safe Parent Fallback (depth={depth})",
+                        "fallback_path": " -> ".join(path)
+                    }
 
         # Tier 5: Unmapped
-        self.stats['tier_5_unmapped'] += 1
-        return {
+        return 'tier_5_unmapped', {
             "input": raw_input,
             "found": False,
             "element_id": None,
@@ -553,11 +742,7 @@ class EnhancedFinancialMapper:
             return {"balance": None, "period_type": None, "data_type": None}
 
         cur = self.conn.cursor()
-        cur.execute("""
-            SELECT balance, period_type, data_type
-            FROM concepts
-            WHERE concept_id = ?
-        """, (concept_id,))
+        cur.execute(CONCEPT_METADATA_QUERY.format("?"), (concept_id,))
         row = cur.fetchone()
 
         if row:
@@ -568,18 +753,41 @@ class EnhancedFinancialMapper:
             }
         return {"balance": None, "period_type": None, "data_type": None}
 
+    def get_concept_metadata_batch(self, concept_ids: List[str]) -> Dict[str, dict]:
+        """
+        Get metadata for many concepts with a few IN queries.
+
+        Args:
+            concept_ids: Concepts to look up (duplicates and blanks are fine)
+
+        Returns:
+            concept_id -> get_concept_metadata(concept_id) for each concept
+        """
+        empty = {"balance": None, "period_type": None, "data_type": None}
+        wanted = [concept_id for concept_id in dict.fromkeys(concept_ids) if concept_id]
+        result = {concept_id: dict(empty) for concept_id in wanted}
+        if not self.conn:
+            return result
+
+        cur = self.conn.cursor()
+        for start in range(0, len(wanted), SQLITE_MAX_PARAMS):
+            chunk = wanted[start:start + SQLITE_MAX_PARAMS]
+            cur.execute(CONCEPT_METADATA_QUERY.format(",".join("?" * len(chunk))), chunk)
+            for row in cur:
+                result[row['concept_id']] = {
+                    "balance": row['balance'],
+                    "period_type": row['period_type'],
+                    "data_type": row['data_type']
+                }
+        return result
+
     def get_standard_label(self, concept_id: str) -> Optional[str]:
         """Get the standard label for a concept."""
         if not concept_id or not self.conn:
             return None
 
         cur = self.conn.cursor()
-        cur.execute("""
-            SELECT label_text
-            FROM labels
-            WHERE concept_id = ? AND label_role = 'standard'
-            LIMIT 1
-        """, (concept_id,))
+        cur.execute(STANDARD_LABEL_QUERY, (concept_id,))
         row = cur.fetchone()
         return row['label_text'] if row else None
 
@@ -47,7 +47,7 @@ THINKING_LOG_PATH = None
 # Import Rules and Taxonomy Engine
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.ib_rules import *
-from config.ib_rules import fuzzy_match_bucket, suggest_mapping, KEYWORD_FALLBACK_MAPPINGS
+from config.ib_rules import fuzzy_match_bucket, suggest_mapping, canonicalize_tag, KEYWORD_FALLBACK_MAPPINGS
 from taxonomy_utils import get_taxonomy_engine, TaxonomyEngine
 
 # Import Confidence Engine
@@ -349,6 +349,9 @@ class FinancialEngine:
 
             if concept == '---':
                 continue
+            if isinstance(concept, str):
+                # Share the bucket sets' string objects so later lookups hit by identity
+                concept = canonicalize_tag(concept)
 
             key = f"{concept}|{period}"
 
@@ -772,7 +775,7 @@ class FinancialEngine:
 
             # Get Total Assets
             assets = 0
-            for concept in TOTAL_ASSETS_IDS:
+            for concept in iter_bucket("TOTAL_ASSETS_IDS"):
                 if concept in amounts and amounts[concept] != 0:
                     assets = amounts[concept]
                     break
@@ -787,7 +790,7 @@ class FinancialEngine:
 
             # Get Total Liabilities
             liabilities = 0
-            for concept in TOTAL_LIABILITIES_IDS:
+            for concept in iter_bucket("TOTAL_LIABILITIES_IDS"):
                 if concept in amounts and amounts[concept] != 0:
                     liabilities = amounts[concept]
                     break
@@ -801,7 +804,7 @@ class FinancialEngine:
 
             # Get Equity
             equity = 0
-            for concept in EQUITY_IDS:
+            for concept in iter_bucket("EQUITY_IDS"):
                 if concept in amounts and amounts[concept] != 0:
                     equity = amounts[concept]
                     break
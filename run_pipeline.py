@@ -69,24 +69,23 @@ def print_banner():
 
 def run_extractor(excel_path: str, output_dir: str) -> str:
     """Run the extractor to convert Excel to CSV."""
-    from extractor.extractor import extract_standardized_excel
-    import pandas as pd
+    from extractor.extractor import extract_standardized_columns, write_extraction_csv
 
     print("\n" + "=" * 70)
     print("STAGE 1: EXTRACTION")
     print("=" * 70)
     print(f"Input: {excel_path}")
 
-    data = extract_standardized_excel(excel_path)
+    columns = extract_standardized_columns(excel_path)
+    row_count = len(columns[0])
 
-    if not data:
+    if not row_count:
         raise ValueError("No data extracted. Check Excel format and tab names.")
 
     output_file = os.path.join(output_dir, "messy_input.csv")
-    df = pd.DataFrame(data)
-    df.to_csv(output_file, index=False)
+    write_extraction_csv(columns, output_file)
 
-    print(f"\nExtracted {len(data)} rows")
+    print(f"\nExtracted {row_count} rows")
     print(f"Output: {output_file}")
 
     return output_file
@@ -123,6 +122,8 @@ def run_normalizer(messy_file: str, output_dir: str, interactive: bool = True,
         db_path = os.path.join(TAXONOMY_DIR, "taxonomy_2025.db")
     alias_path = os.path.join(BASE_DIR, "config", "aliases.csv")
     output_file = os.path.join(output_dir, "normalized_financials.csv")
+    # Taxonomy indexes persisted across mapping iterations and runs
+    index_cache = os.path.join(output_dir, "mapper_index.cache")
 
     # Brain JSON path (persistent across runs)
     brain_path = os.path.join(output_dir, "analyst_brain.json")
@@ -139,7 +140,7 @@ def run_normalizer(messy_file: str, output_dir: str, interactive: bool = True,
 
         # Initialize mapper WITH brain
         print("Loading taxonomy and aliases...")
-        mapper = FinancialMapper(db_path, alias_path, brain_manager=brain)
+        mapper = FinancialMapper(db_path, alias_path, brain_manager=brain, cache_path=index_cache)
         mapper.connect()
 
         # Process input
@@ -162,7 +163,11 @@ def run_normalizer(messy_file: str, output_dir: str, interactive: bool = True,
             row_count = 0
             mapped_count = 0
 
-            for row in reader:
+            # Map all line items in one batch; repeated labels resolve once
+            rows = list(reader)
+            results = mapper.map_inputs([row.get("Line Item", "") for row in rows])
+
+            for row, result in zip(rows, results):
                 raw_label = row.get("Line Item", "")
                 amount = row.get("Amount", "")
                 raw_note = row.get("Note", "--- | ---")
@@ -173,28 +178,26 @@ def run_normalizer(messy_file: str, output_dir: str, interactive: bool = True,
                 else:
                     sheet_name, period_str = raw_note, "Unknown"
 
-                # Map
-                result = mapper.map_input(raw_label)
-                meta = mapper.get_concept_metadata(result.get("concept_id"))
-                std_label = mapper.get_standard_label(result.get("concept_id")) or "---"
+                meta = mapper.get_concept_metadata(result.concept_id)
+                std_label = mapper.get_standard_label(result.concept_id) or "---"
 
                 writer.writerow({
                     "Source_Label": raw_label,
                     "Source_Amount": amount,
                     "Statement_Source": sheet_name.strip(),
                     "Period_Date": period_str.strip(),
-                    "Status": "VALID" if result["found"] else "UNMAPPED",
-                    "Canonical_Concept": result["element_id"] or "---",
-                    "Concept_ID": result["concept_id"] or "---",
+                    "Status": "VALID" if result.found else "UNMAPPED",
+                    "Canonical_Concept": result.element_id or "---",
+                    "Concept_ID": result.concept_id or "---",
                     "Standard_Label": std_label,
                     "Balance": meta.get("balance") or "---",
                     "Period_Type": meta.get("period_type") or "---",
-                    "Map_Method": result["method"],
-                    "Taxonomy": result["source"] or "---"
+                    "Map_Method": result.method,
+                    "Taxonomy": result.source or "---"
                 })
 
                 row_count += 1
-                if result["found"]:
+                if result.found:
                     mapped_count += 1
 
         success_rate = round(mapped_count / row_count * 100, 1) if row_count > 0 else 0
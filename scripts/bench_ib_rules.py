@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+IB Rules Microbenchmark
+=======================
+Measure-first harness for the two hot paths in config/ib_rules.py:
+
+1. Concept classification - "which buckets is this concept in?"
+   (the `concept in BUCKET` tests the modeler runs for every fact)
+2. Keyword fallback - fuzzy_match_bucket / suggest_mapping over labels
+
+The workload replays real element IDs and standard labels from the
+taxonomy database, so the hit/miss mix reflects the taxonomy rather than
+only the concepts the buckets already know about.
+
+Usage:
+  python scripts/bench_ib_rules.py [--db output/taxonomy_2025.db] [--n 50000]
+
+Output: ns/op per strategy, bucket hit rate, and peak RSS.
+"""
+
+import argparse
+import os
+import resource
+import sqlite3
+import sys
+import time
+from itertools import cycle, islice
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ib_rules
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "output", "taxonomy_2025.db")
+
+
+def load_workload(db_path: str, n: int) -> List[Tuple[str, str]]:
+    """Build n (concept_id, label) pairs from the taxonomy's standard labels."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("""
+            SELECT c.element_id, l.label_text
+            FROM labels l
+            JOIN concepts c ON l.concept_id = c.concept_id
+            WHERE l.label_role = 'standard' AND c.element_id IS NOT NULL
+            ORDER BY c.element_id
+        """).fetchall()
+    finally:
+        conn.close()
+    # Make sure every bucketed concept appears so hits are represented
+    rows.extend((cid, cid.split('_', 1)[-1]) for cid in ib_rules.ALL_CONCEPT_IDS)
+    return list(islice(cycle(rows), n))
+
+
+def time_per_op(func: Callable, items: list, repeat: int) -> float:
+    """Best-of-repeat wall time per item, in nanoseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / len(items)
+
+
+def concept_strategies() -> List[Tuple[str, Callable]]:
+    """Classification strategies: each returns the bucket mask for a concept."""
+    bucket_sets = [(ids, ib_rules.BUCKET_BITS[name]) for name, ids in ib_rules.BUCKETS.items()]
+    bucket_frozensets = [(frozenset(ids), bit) for ids, bit in bucket_sets]
+
+    def naive_sets(concept_id):
+        mask = 0
+        for ids, bit in bucket_sets:
+            if concept_id in ids:
+                mask |= bit
+        return mask
+
+    def frozensets(concept_id):
+        mask = 0
+        for ids, bit in bucket_frozensets:
+            if concept_id in ids:
+                mask |= bit
+        return mask
+
+    def prefiltered(concept_id):
+        if not ib_rules.is_candidate_tag(concept_id):
+            return 0
+        return frozensets(concept_id)
+
+    return [
+        ("naive set chain", naive_sets),
+        ("frozenset chain", frozensets),
+        ("prefilter + frozenset chain", prefiltered),
+        ("mask dict (bucket_mask)", ib_rules.bucket_mask),
+        ("generated classify_concept", ib_rules.classify_concept),
+        ("frequency-ordered _classify_fast", ib_rules._classify_fast),
+    ]
+
+
+def label_strategies() -> List[Tuple[str, Callable]]:
+    """Keyword-fallback entry points over source labels."""
+    return [
+        ("fuzzy_match_bucket", ib_rules.fuzzy_match_bucket),
+        ("suggest_mapping", ib_rules.suggest_mapping),
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default=DEFAULT_DB, help="taxonomy SQLite database")
+    parser.add_argument("--n", type=int, default=50000, help="workload size")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats (best is kept)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Error: Database not found at {args.db}")
+        return 1
+
+    workload = load_workload(args.db, args.n)
+    concepts = [cid for cid, _ in workload]
+    labels = [label for _, label in workload]
+
+    hits = sum(1 for cid in concepts if ib_rules.bucket_mask(cid))
+    print("=" * 70)
+    print("IB RULES MICROBENCHMARK")
+    print("=" * 70)
+    print(f"Workload: {len(workload):,} (concept_id, label) pairs from {os.path.basename(args.db)}")
+    print(f"Bucket hit rate: {hits / len(concepts):.1%} "
+          f"({len(concepts) - hits:,} negative lookups)")
+
+    print("\nConcept classification (ns/op):")
+    for name, func in concept_strategies():
+        print(f"  {name:<32} {time_per_op(func, concepts, args.repeat):>10.1f}")
+
+    ib_rules.concept_masks(concepts[:1])  # build the table outside the timing
+    start = time.perf_counter_ns()
+    ib_rules.concept_masks(concepts)
+    print(f"  {'vectorized concept_masks':<32} "
+          f"{(time.perf_counter_ns() - start) / len(concepts):>10.1f}")
+
+    print("\nKeyword fallback over labels (ns/op):")
+    for name, func in label_strategies():
+        print(f"  {name:<32} {time_per_op(func, labels, args.repeat):>10.1f}")
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"\nPeak RSS: {peak_kb / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
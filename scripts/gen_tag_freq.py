@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tag Frequency Table Generator
+=============================
+Writes config/tag_freq.json: bucketed concepts ordered by how often they
+are the target of a mapping. config/ib_rules.py reads it to order the
+equality tests of its generated fast-path classifier.
+
+Counts come from the element_id column of config/aliases.csv, plus the
+Canonical_Concept column of any normalized CSVs passed on the command
+line (real pipeline output is the better sample; pass as many as you have).
+
+Usage:
+  python scripts/gen_tag_freq.py [normalized_financials.csv ...]
+"""
+
+import csv
+import json
+import os
+import sys
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALIAS_PATH = os.path.join(BASE_DIR, "config", "aliases.csv")
+OUTPUT_PATH = os.path.join(BASE_DIR, "config", "tag_freq.json")
+
+sys.path.insert(0, BASE_DIR)
+
+from config.ib_rules import is_candidate_tag
+
+
+def count_column(path: str, column: str, counts: Counter) -> int:
+    """Add the values of one CSV column to counts; returns rows read."""
+    rows = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(line for line in f if not line.startswith("#"))
+        header = next(reader, [])
+        if column not in header:
+            print(f"  Skipping {os.path.basename(path)}: no '{column}' column")
+            return 0
+        idx = header.index(column)
+        for row in reader:
+            if len(row) > idx and row[idx]:
+                counts[row[idx].strip()] += 1
+                rows += 1
+    return rows
+
+
+def main() -> int:
+    counts = Counter()
+    sources = []
+
+    rows = count_column(ALIAS_PATH, "element_id", counts)
+    sources.append(f"config/aliases.csv ({rows} rows)")
+
+    for path in sys.argv[1:]:
+        rows = count_column(path, "Canonical_Concept", counts)
+        if rows:
+            sources.append(f"{os.path.basename(path)} ({rows} rows)")
+
+    tags = [[tag, n] for tag, n in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            if is_candidate_tag(tag)]
+
+    # One tag per line so regenerated tables diff cleanly
+    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        f.write('{\n "sources": %s,\n "tags": [\n' % json.dumps(sources))
+        f.write(",\n".join(f"  {json.dumps(entry)}" for entry in tags))
+        f.write("\n ]\n}\n")
+
+    print(f"Wrote {len(tags)} bucketed tags to {OUTPUT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Tests for the Robust Financial Extractor
+"""
+
+import pandas as pd
+import pytest
+from extractor.extractor import (
+    DATE_PATTERNS,
+    _clean_numeric_str_cached,
+    _letter_count,
+    clean_numeric_value,
+    detect_header_row,
+    detect_label_column,
+    extract_sheet,
+    extract_standardized_excel,
+    extract_standardized_frame,
+    is_date_like,
+    is_extractable_sheet,
+    validate_extraction,
+    write_extraction_csv,
+)
+
+
+@pytest.fixture
+def messy_sheet():
+    """A sheet with junk rows above the header and labels in column B."""
+    rows = [
+        ["Company Confidential", None, None, None],
+        [None, None, None, None],
+        [None, "Line item", "FY2022", "FY2023"],
+    ]
+    for label in ["Revenue", "Cost of sales", "Gross profit", "Operating expenses",
+                  "Operating income", "Net income"]:
+        rows.append([None, label, "1,000", "(200)"])
+    return pd.DataFrame(rows)
+
+
+class TestDateDetection:
+    """Test period header detection."""
+
+    @pytest.mark.parametrize("value", [
+        2023, "2023", " FY23 ", "fy2023", "Q1 23", "q3 2023", "12/31/2023",
+        "Jan 2024", "2023-12-31", "LTM", "ttm Q3", "Year Ended Dec",
+    ])
+    def test_date_like(self, value):
+        """Every documented period format is recognized."""
+        assert is_date_like(value)
+
+    @pytest.mark.parametrize("value", [None, float("nan"), "12345", "Revenue", "", "Q5 23"])
+    def test_not_date_like(self, value):
+        """Labels, blanks and non-period numbers are not periods."""
+        assert not is_date_like(value)
+
+    def test_fused_pattern_matches_each_pattern(self):
+        """The fused regex accepts exactly what the individual patterns accept."""
+        import re
+        samples = ["FY2023", "Q2 2024", "Mar-24", "Year End", "NTM", "2023-1-1", "x2023"]
+        for sample in samples:
+            expected = any(re.match(p, sample, re.IGNORECASE) for p in DATE_PATTERNS)
+            assert is_date_like(sample) == expected
+
+
+class TestCellHelpers:
+    """Test the cached per-cell parsers."""
+
+    @pytest.mark.parametrize("value,expected", [
+        ("1,234", 1234.0), ("(50)", -50.0), ("-", 0.0), ("12%", 0.12),
+        ("—", 0.0), (1234, 1234.0), (2.5, 2.5), (True, None), ("n/a", None),
+        (None, None), (float("nan"), None),
+    ])
+    def test_clean_numeric_value(self, value, expected):
+        """Text and numeric cells parse alike; missing values are None."""
+        assert clean_numeric_value(value) == expected
+
+    @pytest.mark.parametrize("text", ["Revenue", "Q1 2023", "a\tb\x1c", "Cash — restricted", "Résumé", ""])
+    def test_letter_count(self, text):
+        """The ASCII fast path counts what isalpha/isspace would."""
+        assert _letter_count(text) == sum(c.isalpha() or c.isspace() for c in text)
+
+    def test_text_cells_are_cached(self):
+        """A repeated text cell is parsed once."""
+        _clean_numeric_str_cached.cache_clear()
+        for _ in range(3):
+            clean_numeric_value("(1,000)")
+        assert _clean_numeric_str_cached.cache_info().hits == 2
+
+
+class TestStructureDetection:
+    """Test header row and label column detection."""
+
+    def test_detect_header_row(self, messy_sheet):
+        """The first row with two or more periods is the header."""
+        assert detect_header_row(messy_sheet) == 2
+
+    def test_detect_label_column(self, messy_sheet):
+        """The first column with five or more labels is the label column."""
+        assert detect_label_column(messy_sheet) == 1
+
+    def test_defaults(self):
+        """Sheets with no periods or labels fall back to row and column 0."""
+        df = pd.DataFrame([[1, 2], [3, 4]])
+        assert detect_header_row(df) == 0
+        assert detect_label_column(df) == 0
+
+
+class TestExtractSheet:
+    """Test long-format row extraction."""
+
+    def test_rows_are_row_major(self, messy_sheet):
+        """Each line item emits all of its periods before the next line item."""
+        rows = extract_sheet(messy_sheet, "IS")
+        assert [(r["Line Item"], r["Note"]) for r in rows[:4]] == [
+            ("Revenue", "IS | FY2022"), ("Revenue", "IS | FY2023"),
+            ("Cost of sales", "IS | FY2022"), ("Cost of sales", "IS | FY2023"),
+        ]
+
+    def test_input_is_not_modified(self, messy_sheet):
+        """Promoting the header row leaves the caller's frame as it was."""
+        original = messy_sheet.copy()
+        extract_sheet(messy_sheet, "IS")
+        pd.testing.assert_frame_equal(messy_sheet, original)
+
+    def test_number_formats(self, messy_sheet):
+        """Commas, parentheses, dashes and percentages are cleaned per cell."""
+        messy_sheet.iloc[3, 2:] = ["$1,234.5", "12%"]
+        messy_sheet.iloc[4, 2:] = ["-", "n/a"]
+        rows = extract_sheet(messy_sheet, "IS")
+        amounts = [r["Amount"] for r in rows[:5]]
+        assert amounts == [1234.5, 0.12, 0.0, 1000.0, -200.0]
+
+    def test_duplicate_period_is_skipped(self, messy_sheet):
+        """A period label that appears twice is ambiguous and emits nothing."""
+        messy_sheet.iloc[2, 3] = "FY2022"
+        messy_sheet[4] = ["x", None, "FY2024", "5", "5", "5", "5", "5", "5"]
+        rows = extract_sheet(messy_sheet, "IS")
+        assert {r["Note"] for r in rows} == {"IS | FY2024"}
+
+
+class TestValidation:
+    """Test the extraction summary."""
+
+    def test_summary(self):
+        """Counts, periods and expected items come from one pass over the rows."""
+        rows = [
+            {"Line Item": "Net income and cash", "Amount": 5.0, "Note": "IS | FY2022"},
+            {"Line Item": "Net income and cash", "Amount": 0.0, "Note": "IS | FY2023"},
+            {"Line Item": "Total revenue", "Amount": 7.0, "Note": "IS | FY2023"},
+        ]
+        summary = validate_extraction(rows)
+        assert summary["unique_labels"] == 2
+        assert summary["periods_detected"] == 2
+        assert summary["expected_items_found"] == ["revenue", "net income", "cash"]
+        assert summary["non_zero_values"] == 2
+        assert summary["avg_value"] == 6.0
+
+    def test_empty(self):
+        """No rows is an invalid extraction."""
+        assert validate_extraction([])["valid"] is False
+
+
+class TestCsvOutput:
+    """Test the extraction CSV writer."""
+
+    def test_matches_to_csv(self, tmp_path):
+        """The file is byte-for-byte what DataFrame.to_csv writes."""
+        columns = (
+            ['Revenue', 'Line, "quoted"', 'multi\nline', 'Cash', 'Debt', 'Tax'],
+            [1000.0, float('nan'), -0.0, float('inf'), 1e-07, 1e22],
+            ['IS | FY2022'] * 6,
+        )
+        ours, theirs = tmp_path / "ours.csv", tmp_path / "theirs.csv"
+        write_extraction_csv(columns, str(ours))
+        pd.DataFrame(dict(zip(["Line Item", "Amount", "Note"], columns))).to_csv(theirs, index=False)
+        assert ours.read_bytes() == theirs.read_bytes()
+
+    def test_empty(self, tmp_path):
+        """No facts still writes the header."""
+        path = tmp_path / "out.csv"
+        write_extraction_csv(([], [], []), str(path))
+        assert path.read_text() == "Line Item,Amount,Note\n"
+
+
+class TestWorkbook:
+    """Test tab selection when reading a workbook."""
+
+    def test_is_extractable_sheet(self):
+        """Statement tabs always qualify; other tabs only in small workbooks."""
+        assert is_extractable_sheet("Balance Sheet", 10)
+        assert not is_extractable_sheet("Cover", 4)
+        assert is_extractable_sheet("Cover", 3)
+
+    @staticmethod
+    def write_book(path, sheet, names):
+        """Write sheet to every named tab of a new workbook."""
+        with pd.ExcelWriter(path) as writer:
+            for name in names:
+                sheet.to_excel(writer, sheet_name=name, header=False, index=False)
+
+    def test_skipped_tabs_are_not_read(self, tmp_path, messy_sheet, monkeypatch):
+        """Only accepted tabs are parsed, and they are extracted as before."""
+        path = tmp_path / "book.xlsx"
+        self.write_book(path, messy_sheet, ["Cover", "Income Statement", "Notes", "Misc"])
+
+        expected = extract_sheet(pd.read_excel(path, sheet_name="Income Statement", header=None),
+                                 "Income Statement")
+
+        parsed = []
+        parse = pd.ExcelFile.parse
+        monkeypatch.setattr(pd.ExcelFile, "parse",
+                            lambda self, name, **kw: parsed.append(name) or parse(self, name, **kw))
+        rows = extract_standardized_excel(str(path))
+
+        assert parsed == ["Income Statement"]
+        assert rows == expected
+
+    def test_workers_match_sequential(self, tmp_path, messy_sheet, capsys):
+        """Tabs extracted in worker processes give the same rows and log."""
+        path = str(tmp_path / "book.xlsx")
+        self.write_book(path, messy_sheet, ["Income Statement", "Balance Sheet", "Cover", "Cash Flow"])
+
+        sequential = extract_standardized_excel(path)
+        sequential_log = capsys.readouterr().out
+        parallel = extract_standardized_excel(path, workers=2)
+
+        assert parallel == sequential
+        assert capsys.readouterr().out == sequential_log
+
+    def test_frame_matches_rows(self, tmp_path, messy_sheet):
+        """The column-built frame equals one built from the row dicts."""
+        path = str(tmp_path / "book.xlsx")
+        self.write_book(path, messy_sheet, ["Income Statement", "Balance Sheet"])
+
+        frame = extract_standardized_frame(path)
+
+        pd.testing.assert_frame_equal(frame, pd.DataFrame(extract_standardized_excel(path)))
+        assert frame["Amount"].dtype == "float64"
+
+    def test_unreadable_workbook(self, tmp_path):
+        """A file that is not a workbook extracts nothing."""
+        path = tmp_path / "book.xlsx"
+        path.write_text("not a workbook")
+        assert extract_standardized_excel(str(path)) == []
+        assert extract_standardized_frame(str(path)).empty
+
+    def test_excel_engine_is_used(self, tmp_path, messy_sheet, monkeypatch):
+        """Workbooks are opened with the configured engine."""
+        import extractor.extractor as extractor_module
+
+        path = str(tmp_path / "book.xlsx")
+        self.write_book(path, messy_sheet, ["Income Statement"])
+        expected = extract_standardized_excel(path)
+
+        monkeypatch.setattr(extractor_module, "EXCEL_ENGINE", "no-such-engine")
+        assert extract_standardized_excel(path) == []
+
+        monkeypatch.setattr(extractor_module, "EXCEL_ENGINE", "openpyxl")
+        assert extract_standardized_excel(path) == expected
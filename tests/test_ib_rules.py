@@ -0,0 +1,371 @@
+"""
+Tests for IB Rules Concept Index
+"""
+
+import pytest
+from config.ib_rules import (
+    get_all_concept_sets,
+    TAG_ORDER,
+    TagRecord,
+    _KEYWORD_TO_BUCKET,
+    _best_keyword,
+    _keyword_hits,
+    _classify_fast,
+    _compile_fast_classifier,
+    ALL_CONCEPT_IDS,
+    BUCKETS,
+    BUCKET_ARRAYS,
+    BUCKET_GROUPS,
+    BucketFlag,
+    CAPEX_IDS,
+    CONCEPT_ID_TO_INT,
+    CONCEPT_INDUSTRIES,
+    INDUSTRY_ENERGY_UTILITY,
+    KEYWORD_FALLBACK_MAPPINGS,
+    KEYWORD_FALLBACK_MASKS,
+    MASK_CLASSES,
+    TOTAL_ASSETS_IDS,
+    bucket_contains_int,
+    bucket_mask,
+    bucket_mask_by_name,
+    bucket_code_filter,
+    canonicalize_tag,
+    category_mask_table,
+    classify_concept,
+    concept_masks,
+    concepts_with_prefix,
+    fuzzy_match_bucket,
+    industries_of,
+    is_candidate_tag,
+    is_tech,
+    iter_bucket,
+    lower_label,
+    prefix_mask,
+    series_codes,
+    series_masks,
+    split_concept_id,
+    suggest_mapping,
+    tag_dtype,
+    warm_tables,
+)
+
+
+class TestConceptIndex:
+    """Test integer concept IDs and ordered bucket arrays."""
+
+    def test_ids_are_dense(self):
+        """Every concept gets a unique ID in [0, N)."""
+        assert sorted(CONCEPT_ID_TO_INT.values()) == list(range(len(ALL_CONCEPT_IDS)))
+
+    def test_arrays_match_sets(self):
+        """Each bucket array holds exactly the bucket's concepts, sorted."""
+        for name, ids in BUCKETS.items():
+            arr = BUCKET_ARRAYS[name]
+            assert list(arr) == sorted(arr)
+            assert {ALL_CONCEPT_IDS[i] for i in arr} == ids
+
+    def test_iter_bucket_is_stable(self):
+        """Iteration order is sorted, not hash order."""
+        assert list(iter_bucket("TOTAL_ASSETS_IDS")) == sorted(TOTAL_ASSETS_IDS)
+
+    def test_concepts_with_prefix(self):
+        """Prefix queries return exactly the matching concepts."""
+        for prefix in ("us-gaap_CostOf", "ifrs-full_", "us-gaap_Zzz", ""):
+            expected = tuple(c for c in ALL_CONCEPT_IDS if c.startswith(prefix))
+            assert concepts_with_prefix(prefix) == expected
+
+    def test_prefix_mask(self):
+        """A prefix mask covers every matching concept's buckets."""
+        mask = prefix_mask("us-gaap_CapitalExpenditure")
+        assert mask & bucket_mask("us-gaap_CapitalExpenditures")
+        assert prefix_mask("us-gaap_Zzz") == 0
+
+    def test_bucket_contains_int(self):
+        """Integer membership agrees with string membership."""
+        inside = CONCEPT_ID_TO_INT["us-gaap_CapitalExpenditures"]
+        outside = CONCEPT_ID_TO_INT["us-gaap_Revenues"]
+        assert "us-gaap_CapitalExpenditures" in CAPEX_IDS
+        assert bucket_contains_int("CAPEX_IDS", inside)
+        assert not bucket_contains_int("CAPEX_IDS", outside)
+
+
+class TestIndustryTags:
+    """Test industry bitmask tagging."""
+
+    def test_tech_concept(self):
+        """R&D expense is tagged as tech."""
+        assert is_tech("us-gaap_ResearchAndDevelopmentExpense")
+        assert not is_tech("us-gaap_FuelAndPurchasedPower")
+
+    def test_industries_of(self):
+        """industries_of returns the flag mask, 0 for untagged concepts."""
+        assert industries_of("us-gaap_NuclearFuelNet") == INDUSTRY_ENERGY_UTILITY
+        assert industries_of("us-gaap_Revenues") == 0
+
+    def test_tagged_concepts_are_indexed(self):
+        """Industry-only concepts still receive integer IDs."""
+        for concept in CONCEPT_INDUSTRIES:
+            assert concept in CONCEPT_ID_TO_INT
+
+
+class TestBucketMasks:
+    """Test bucket bitmasks and the keyword mask table."""
+
+    def test_keyword_masks_match_sets(self):
+        """A mask test agrees with set membership for every keyword."""
+        for keyword, concept_set in KEYWORD_FALLBACK_MAPPINGS.items():
+            mask = KEYWORD_FALLBACK_MASKS[keyword]
+            for concept in ALL_CONCEPT_IDS:
+                assert bool(bucket_mask(concept) & mask) == (concept in concept_set)
+
+    def test_bucket_flags(self):
+        """BucketFlag members carry the bucket bits and decode a mask."""
+        assert BucketFlag.REVENUE_TOTAL.value == 1
+        assert BucketFlag.NWC_CURRENT_ASSETS_TOTAL.value == 1 << list(BUCKETS).index("NWC_CURRENT_ASSETS_TOTAL")
+        flags = BucketFlag(bucket_mask("us-gaap_CapitalExpenditures"))
+        assert BucketFlag.CAPEX in flags
+        assert BucketFlag.REVENUE_TOTAL not in flags
+
+    def test_candidate_prefilter(self):
+        """The prefilter passes exactly the concepts with a non-zero mask."""
+        for concept in ALL_CONCEPT_IDS:
+            assert is_candidate_tag(concept) == bool(bucket_mask(concept))
+        assert not is_candidate_tag("us-gaap_NotARealConcept")
+
+    def test_unknown_concept_has_no_mask(self):
+        """Concepts outside every bucket have mask 0."""
+        assert bucket_mask("us-gaap_NotARealConcept") == 0
+
+    def test_buckets_are_frozen(self):
+        """Bucket sets, including the derived unions, are immutable."""
+        for ids in BUCKETS.values():
+            assert isinstance(ids, frozenset)
+
+    def test_lower_label(self):
+        """Labels are lowercased and stripped."""
+        assert lower_label("  Net Sales ") == "net sales"
+
+
+class TestGeneratedClassifier:
+    """Test the codegen'd classify_concept against the mask table."""
+
+    def test_matches_mask_table(self):
+        """Generated classifier returns the full mask for every concept."""
+        for concept in ALL_CONCEPT_IDS:
+            assert classify_concept(concept) == bucket_mask(concept)
+
+    def test_unknown_concept(self):
+        """Unknown concepts classify to 0."""
+        assert classify_concept("us-gaap_NotARealConcept") == 0
+
+    def test_fast_classifier(self):
+        """The frequency-ordered chain agrees with the mask table at any length."""
+        assert TAG_ORDER[0] == "us-gaap_Revenues"
+        for classify in (_classify_fast, _compile_fast_classifier(TAG_ORDER, len(TAG_ORDER))):
+            for concept in ALL_CONCEPT_IDS:
+                assert classify(concept) == bucket_mask(concept)
+            assert classify("us-gaap_NotARealConcept") == 0
+
+    def test_bucket_groups(self):
+        """Bucket groups expose name, ids, ints and bit consistently."""
+        for group in BUCKET_GROUPS:
+            assert group.ids is BUCKETS[group.name]
+            assert len(group.ints) == len(group.ids)
+            assert all(bucket_mask(c) & group.bit for c in group.ids)
+
+
+class TestCategoryMaskTable:
+    """Test the uint64 mask table and its vectorized lookup."""
+
+    def test_table_matches_mask_dict(self):
+        """Row i of the table is the mask of ALL_CONCEPT_IDS[i]."""
+        table = category_mask_table()
+        assert len(table) == len(ALL_CONCEPT_IDS) + 1
+        for i, concept in enumerate(ALL_CONCEPT_IDS):
+            assert int(table[i]) == bucket_mask(concept)
+        assert int(table[-1]) == 0
+
+    def test_concept_masks(self):
+        """Vectorized lookup returns 0 for unknown concepts."""
+        masks = concept_masks(["us-gaap_CapitalExpenditures", "us-gaap_NotARealConcept"])
+        assert int(masks[0]) == bucket_mask("us-gaap_CapitalExpenditures")
+        assert int(masks[1]) == 0
+
+    def test_concept_masks_accepts_iterables(self):
+        """Generators and other iterables classify the same as lists."""
+        concepts = ALL_CONCEPT_IDS[:25]
+        assert list(concept_masks(c for c in concepts)) == [bucket_mask(c) for c in concepts]
+
+    def test_buckets_share_canonical_strings(self):
+        """Bucket members are the interned copies handed out by canonicalize_tag."""
+        runtime_id = "".join(["us-gaap_", "Revenues"])
+        canonical = canonicalize_tag(runtime_id)
+        assert next(c for c in BUCKETS["REVENUE_TOTAL_IDS"] if c == runtime_id) is canonical
+
+    def test_series_masks(self):
+        """Categorical codes gather the right masks, unknown concepts get 0."""
+        import pandas as pd
+        concepts = pd.Series(["us-gaap_Revenues", "us-gaap_NotARealConcept", "us-gaap_CapitalExpenditures"])
+        expected = [bucket_mask(c) for c in concepts]
+        assert [int(m) for m in series_masks(concepts)] == expected
+        # Values outside the categories are stored as missing (code -1)
+        known = concepts.where(concepts.isin(ALL_CONCEPT_IDS))
+        categorical = pd.Series(pd.Categorical(known, dtype=tag_dtype()))
+        assert [int(m) for m in series_masks(categorical)] == expected
+
+    def test_series_codes(self):
+        """uint8 class codes decode to the full mask and filter by bucket."""
+        import pandas as pd
+        concepts = pd.Series(list(ALL_CONCEPT_IDS) + ["us-gaap_NotARealConcept"])
+        codes = series_codes(concepts)
+        assert codes.dtype.itemsize == 1
+        assert [MASK_CLASSES[c] for c in codes] == [bucket_mask(c) for c in concepts]
+        in_capex = bucket_code_filter("CAPEX_IDS")[codes]
+        assert list(in_capex) == [c in CAPEX_IDS for c in concepts]
+
+    def test_warm_tables(self):
+        """Warming builds the cached tables that later calls reuse."""
+        warm_tables()
+        assert category_mask_table.cache_info().currsize == 1
+        assert category_mask_table() is category_mask_table()
+
+    def test_pool_is_interned(self):
+        """Index keys are the interned pool strings."""
+        for concept in ALL_CONCEPT_IDS[:10]:
+            assert next(k for k in CONCEPT_ID_TO_INT if k == concept) is concept
+
+
+class TestSuffixMasks:
+    """Test lookup by namespace id and local name."""
+
+    def test_matches_full_id_lookup(self):
+        """Split lookup agrees with bucket_mask for every concept."""
+        for concept in ALL_CONCEPT_IDS:
+            assert bucket_mask_by_name(*split_concept_id(concept)) == bucket_mask(concept)
+
+    def test_namespace_specific_masks(self):
+        """The same local name can carry different masks per namespace."""
+        us = bucket_mask_by_name(*split_concept_id("us-gaap_TradeReceivables"))
+        ifrs = bucket_mask_by_name(*split_concept_id("ifrs-full_TradeReceivables"))
+        assert us == bucket_mask("us-gaap_TradeReceivables")
+        assert ifrs == bucket_mask("ifrs-full_TradeReceivables")
+        assert us != ifrs
+
+    def test_unknown_namespace(self):
+        """Concepts outside the bucketed namespaces have mask 0."""
+        assert split_concept_id("dei_EntityRegistrantName")[0] is None
+        assert bucket_mask_by_name(*split_concept_id("dei_Revenues")) == 0
+
+
+class TestTagRecord:
+    """Test the slotted per-fact record."""
+
+    def test_build_resolves_mask(self):
+        """build() fills in the bucket mask and canonical tag."""
+        record = TagRecord.build("".join(["us-gaap_", "CapitalExpenditures"]), 125.0, "2024-12-31")
+        assert record.category_mask == bucket_mask("us-gaap_CapitalExpenditures")
+        assert record.tag_id is canonicalize_tag("us-gaap_CapitalExpenditures")
+        assert record.in_bucket("CAPEX_IDS")
+        assert not record.in_bucket("REVENUE_TOTAL_IDS")
+
+    def test_frozen_and_slotted(self):
+        """Records are immutable and carry no instance dict."""
+        record = TagRecord.build("us-gaap_Revenues", 1.0, "2024")
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.value = 2.0
+
+
+class TestKeywordAutomaton:
+    """Test the Aho-Corasick keyword matcher behind the fallback helpers."""
+
+    LABELS = [
+        "Total net sales",
+        "Cost of sales - products",
+        "Selling, general and administrative",
+        "Depreciation and amortization of intangible assets",
+        "Long-term debt, net of current portion",
+        "Purchases of property, plant and equipment (capex)",
+        "Nothing to see here",
+        "",
+    ]
+
+    def test_hits_match_substring_scan(self):
+        """Every keyword and keyword word found by `in` is found by the automaton."""
+        for label in self.LABELS:
+            label_lower = label.lower()
+            patterns = {p for k in KEYWORD_FALLBACK_MAPPINGS for p in (k, *k.split())}
+            assert _keyword_hits(label_lower) == {p for p in patterns if p in label_lower}
+
+    def test_overlapping_keywords(self):
+        """Keywords nested inside longer keywords are all reported."""
+        hits = _keyword_hits("cost of sales")
+        assert {"cost of sales", "sales"} <= hits
+
+    def test_best_keyword_matches_scoring(self):
+        """The one-pass scorer agrees with scoring every keyword by string tests."""
+        for label in self.LABELS + ["revenue", "cash and cash equivalents", "net income cash"]:
+            label_lower = label.lower()
+            scored = []
+            for order, keyword in enumerate(KEYWORD_FALLBACK_MAPPINGS):
+                if keyword in label_lower:
+                    score = len(keyword)
+                    score += 10 if label_lower.startswith(keyword) else 0
+                    score += 50 if label_lower == keyword else 0
+                    scored.append((-score, order, keyword))
+            assert _best_keyword(label_lower) == (min(scored)[2] if scored else None)
+
+    def test_fuzzy_match_bucket(self):
+        """Longest/prefix keyword still decides the bucket."""
+        assert fuzzy_match_bucket("Cost of goods sold")[0] == "COGS"
+        assert fuzzy_match_bucket("Research and development")[0] == "R&D"
+        assert fuzzy_match_bucket("Nothing to see here") == (None, None)
+
+    def test_fuzzy_match_bucket_exact_keyword(self):
+        """A label equal to a keyword maps through that keyword."""
+        for label in ["Revenue", " net income ", "CASH"]:
+            keyword = label.strip().lower()
+            assert fuzzy_match_bucket(label) == (_KEYWORD_TO_BUCKET[keyword],
+                                                 KEYWORD_FALLBACK_MAPPINGS[keyword])
+
+    def test_suggest_mapping_matches_scan(self):
+        """Suggestions equal scoring every keyword by substring tests."""
+        for label in self.LABELS + ["Revenue", "cost of revenue and sales"]:
+            label_lower = label.lower().strip()
+            expected = []
+            for keyword, concept_set in KEYWORD_FALLBACK_MAPPINGS.items():
+                if label_lower == keyword:
+                    confidence = 1.0
+                elif label_lower.startswith(keyword):
+                    confidence = 0.9
+                elif keyword in label_lower:
+                    confidence = 0.7 + (len(keyword) / len(label_lower)) * 0.2
+                elif any(word in label_lower for word in keyword.split()):
+                    confidence = 0.5
+                else:
+                    continue
+                expected.append((keyword, confidence, concept_set))
+            expected.sort(key=lambda x: x[1], reverse=True)
+            assert suggest_mapping(label) == expected[:5]
+
+    def test_suggest_mapping_order(self):
+        """Exact keyword match ranks first."""
+        suggestions = suggest_mapping("Revenue")
+        assert suggestions[0][0] == "revenue"
+        assert suggestions[0][1] == 1.0
+
+
+class TestConceptSets:
+    """Test the shared concept-set mapping."""
+
+    def test_shared_and_read_only(self):
+        """Every call returns the same read-only mapping of frozensets."""
+        sets = get_all_concept_sets()
+        assert sets is get_all_concept_sets()
+        assert all(isinstance(ids, frozenset) for ids in sets.values())
+        with pytest.raises(TypeError):
+            sets["Revenue"] = frozenset()
+
+    def test_unions(self):
+        """Combined buckets hold both their total and component concepts."""
+        assert get_all_concept_sets()["Revenue"] == BUCKETS["REVENUE_TOTAL_IDS"] | BUCKETS["REVENUE_COMPONENT_IDS"]
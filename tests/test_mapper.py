@@ -0,0 +1,356 @@
+"""
+Tests for the Deterministic Financial Mapper (Stage 2)
+"""
+
+import sqlite3
+
+import pytest
+from mapper.mapper import FinancialMapper, MapResult
+
+CONCEPTS = [
+    # concept_id, source, element_id
+    ("c1", "US_GAAP", "us-gaap_Revenues"),
+    ("c2", "US_GAAP", "us-gaap_CostOfRevenue"),
+    ("c3", "US_GAAP", "us-gaap_Assets"),
+    ("c4", "US_GAAP", "us-gaap_ProductRevenueWidgets"),
+    ("c5", "IFRS", "ifrs-full_Revenue"),
+    ("c6", "US_GAAP", None),
+]
+
+LABELS = [
+    # concept_id, label_role, label_text
+    ("c4", "standard", "Net Widgets"),
+    ("c1", "standard", "Revenues"),
+    ("c5", "standard", "REVENUES "),
+    ("c2", "standard", "Cost of Revenue"),
+    ("c3", "standard", "\tAssets\n"),
+    ("c3", "terse", "Total assets"),
+    ("c4", "standard", "Widget Revenue"),
+    ("c5", "standard", "Ébitda Revenue"),
+    ("c2", "standard", "net widgets"),
+]
+
+PRESENTATION = [
+    # concept_id, parent_concept_id
+    ("c4", "c1"),
+    ("c2", "c3"),
+]
+
+ALIASES = """source,alias,element_id
+# comment rows are skipped
+MANUAL,Turnover,us-gaap_Revenues
+MANUAL,Revenues,ifrs-full_Revenue
+MANUAL,Ghost,us-gaap_DoesNotExist
+"""
+
+
+@pytest.fixture
+def taxonomy(tmp_path):
+    """A tiny taxonomy database and alias file shaped like the real ones."""
+    db_path = tmp_path / "taxonomy.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE concepts (concept_id TEXT PRIMARY KEY, source TEXT NOT NULL,
+                               element_id TEXT, data_type TEXT, period_type TEXT, balance TEXT);
+        CREATE TABLE labels (id INTEGER PRIMARY KEY AUTOINCREMENT, concept_id TEXT NOT NULL,
+                             label_role TEXT, label_text TEXT);
+        CREATE TABLE presentation_roles (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                         concept_id TEXT NOT NULL, parent_concept_id TEXT);
+        CREATE INDEX idx_labels_role ON labels(label_role);
+    """)
+    conn.executemany("INSERT INTO concepts (concept_id, source, element_id, balance) VALUES (?, ?, ?, 'credit')",
+                     CONCEPTS)
+    conn.executemany("INSERT INTO labels (concept_id, label_role, label_text) VALUES (?, ?, ?)", LABELS)
+    conn.executemany("INSERT INTO presentation_roles (concept_id, parent_concept_id) VALUES (?, ?)",
+                     PRESENTATION)
+    conn.commit()
+    conn.close()
+
+    alias_path = tmp_path / "aliases.csv"
+    alias_path.write_text(ALIASES, encoding="utf-8")
+    return str(db_path), str(alias_path)
+
+
+@pytest.fixture
+def mapper(taxonomy):
+    """A connected mapper over the tiny taxonomy."""
+    mapper = FinancialMapper(*taxonomy)
+    mapper.connect()
+    return mapper
+
+
+class TestLoading:
+    """Test the in-memory indexes built at connect time."""
+
+    def test_first_standard_label_wins(self, mapper):
+        """Labels that normalize alike keep the first concept."""
+        result = mapper.map_input("Widget Revenue")
+        assert result["element_id"] == "us-gaap_ProductRevenueWidgets"
+        assert mapper.map_input("Cost of Revenue")["method"] == "Standard Label"
+        # c2 is loaded before c4, but c4's label comes first in the table
+        assert mapper.map_input("net widgets")["element_id"] == "us-gaap_ProductRevenueWidgets"
+
+    def test_labels_are_normalized_like_inputs(self, mapper):
+        """Whitespace and non-ASCII labels match inputs normalized the same way."""
+        assert mapper.map_input("assets")["element_id"] == "us-gaap_Assets"
+        assert mapper.map_input("  ÉBITDA REVENUE")["element_id"] == "ifrs-full_Revenue"
+
+    def test_only_standard_labels_are_indexed(self, mapper):
+        """Terse labels are not exact-match targets."""
+        assert mapper.map_input("Total assets")["method"] != "Standard Label"
+
+    def test_aliases_override_labels(self, mapper):
+        """An alias replaces the standard label it collides with."""
+        result = mapper.map_input("revenues")
+        assert result["element_id"] == "ifrs-full_Revenue"
+        assert result["method"] == "Explicit Alias"
+        assert mapper.map_input("Turnover")["element_id"] == "us-gaap_Revenues"
+
+    def test_alias_override_reuses_row(self, mapper):
+        """Overriding a label rewrites its row instead of growing the columns."""
+        assert len(mapper.concept_ids) == len(mapper.lookup_index)
+        assert mapper.get_lookup_entry("revenues") == {
+            "concept_id": "c5",
+            "element_id": "ifrs-full_Revenue",
+            "source": "MANUAL",
+            "method": "Explicit Alias",
+        }
+        assert mapper.get_lookup_entry("nothing") is None
+
+    def test_label_rows_share_id_strings(self, mapper):
+        """Label rows point at the ID strings held by reverse_id_map."""
+        row = mapper.lookup_index["cost of revenue"]
+        element_id = next(e for e in mapper.reverse_id_map if e == "us-gaap_CostOfRevenue")
+        assert mapper.element_ids[row] is element_id
+        assert mapper.concept_ids[row] is mapper.reverse_id_map[element_id]
+
+    def test_unknown_alias_targets_are_skipped(self, mapper):
+        """Aliases pointing outside the taxonomy are not indexed."""
+        assert not mapper.map_input("Ghost")["found"]
+
+    def test_reverse_id_map_and_hierarchy(self, mapper):
+        """Concepts without element IDs are left out of the ID map."""
+        assert mapper.reverse_id_map == {c[2]: c[0] for c in CONCEPTS if c[2]}
+        assert mapper.presentation_parents == {
+            "us-gaap_ProductRevenueWidgets": ["us-gaap_Revenues"],
+            "us-gaap_CostOfRevenue": ["us-gaap_Assets"],
+        }
+
+    def test_metadata_and_standard_labels(self, mapper):
+        """Concept metadata and the first standard label are served from memory."""
+        mapper.conn.close()
+        assert mapper.get_concept_metadata("c6") == {"balance": "credit", "period_type": None, "data_type": None}
+        assert mapper.get_concept_metadata("nope") == {"balance": None, "period_type": None, "data_type": None}
+        assert mapper.get_standard_label("c5") == "REVENUES "
+        assert mapper.get_standard_label("c3") == "\tAssets\n"
+        assert mapper.get_standard_label(None) is None
+
+    def test_parallel_load_matches_serial(self, taxonomy, monkeypatch, capsys):
+        """Loading the hierarchy on a worker thread builds the same indexes and log."""
+        import mapper.mapper as mapper_module
+
+        serial = FinancialMapper(*taxonomy)
+        monkeypatch.setattr(mapper_module, "PARALLEL_LOAD", False)
+        serial.connect()
+        serial_log = capsys.readouterr().out
+
+        parallel = FinancialMapper(*taxonomy)
+        monkeypatch.setattr(mapper_module, "PARALLEL_LOAD", True)
+        parallel.connect()
+
+        assert parallel.presentation_parents == serial.presentation_parents
+        assert parallel.lookup_index == serial.lookup_index
+        assert capsys.readouterr().out == serial_log
+
+
+class TestConnection:
+    """Test the read-only connection settings."""
+
+    def test_connection_is_read_only(self, mapper):
+        """The taxonomy cannot be modified through the mapper's connection."""
+        with pytest.raises(sqlite3.OperationalError):
+            mapper.conn.execute("DELETE FROM labels")
+        assert mapper.get_standard_label("c2") == "Cost of Revenue"
+
+    def test_missing_files(self, taxonomy, tmp_path):
+        """A missing database fails; a missing alias file only skips Tier 1."""
+        with pytest.raises(FileNotFoundError):
+            FinancialMapper(str(tmp_path / "missing.db"), taxonomy[1]).connect()
+        assert not (tmp_path / "missing.db").exists()
+
+        mapper = FinancialMapper(taxonomy[0], str(tmp_path / "missing.csv"))
+        mapper.connect()
+        assert mapper.map_input("Revenues")["method"] == "Standard Label"
+
+
+
+class TestIndexCache:
+    """Test persisting the loaded indexes between runs."""
+
+    def test_warm_run_matches_cold_run(self, taxonomy, tmp_path, monkeypatch):
+        """A cached connect restores the same indexes without scanning the tables."""
+        cache_path = str(tmp_path / "mapper_index.cache")
+        cold = FinancialMapper(*taxonomy, cache_path=cache_path)
+        cold.connect()
+
+        monkeypatch.setattr(FinancialMapper, "_load_concepts_and_labels", lambda self: pytest.fail("rescanned"))
+        warm = FinancialMapper(*taxonomy, cache_path=cache_path)
+        warm.connect()
+
+        assert warm.lookup_index == cold.lookup_index
+        assert warm.element_ids == cold.element_ids
+        assert warm.presentation_parents == cold.presentation_parents
+        assert warm.standard_labels == cold.standard_labels
+        assert warm.map_input("Turnover") == cold.map_input("Turnover")
+
+    def test_changed_aliases_rebuild(self, taxonomy, tmp_path):
+        """Editing the alias file invalidates the cache."""
+        db_path, alias_path = taxonomy
+        cache_path = str(tmp_path / "mapper_index.cache")
+        FinancialMapper(db_path, alias_path, cache_path=cache_path).connect()
+
+        with open(alias_path, "a", encoding="utf-8") as f:
+            f.write("MANUAL,Top Line,us-gaap_Revenues\n")
+        mapper = FinancialMapper(db_path, alias_path, cache_path=cache_path)
+        mapper.connect()
+        assert mapper.map_input("top line")["method"] == "Explicit Alias"
+
+
+class TestResultMemo:
+    """Test the memo of Tier 1-5 results."""
+
+    def test_repeated_inputs_resolve_once(self, mapper):
+        """Inputs that normalize alike share one resolution but keep their own text."""
+        mapper._resolve_cached.cache_clear()
+        first = mapper.map_input("Turnover")
+        second = mapper.map_input("  TURNOVER ")
+        assert mapper._resolve_cached.cache_info().hits == 1
+        assert second["input"] == "  TURNOVER "
+        assert first._replace(input=None) == second._replace(input=None)
+
+    def test_results_are_immutable(self, mapper):
+        """A returned result cannot be changed under later calls."""
+        with pytest.raises(TypeError):
+            mapper.map_input("Turnover")["element_id"] = "changed"
+
+    def test_brain_is_consulted_every_call(self, mapper):
+        """Brain mappings added or swapped in later win over memoized results."""
+        import mapper.mapper as mapper_module
+
+        if not mapper_module.BRAIN_AVAILABLE:
+            pytest.skip("brain manager not available")
+        from utils.brain_manager import BrainManager
+
+        assert mapper.map_input("Turnover")["element_id"] == "us-gaap_Revenues"
+        brain = BrainManager()
+        mapper.set_brain_manager(brain)
+        brain.add_mapping("Turnover", "us-gaap_Assets")
+        assert mapper.map_input("Turnover")["element_id"] == "us-gaap_Assets"
+        mapper.set_brain_manager(None)
+        assert mapper.map_input("Turnover")["element_id"] == "us-gaap_Revenues"
+
+    def test_confidence_is_scored_once_per_method(self, mapper):
+        """Results sharing a method reuse one confidence score."""
+        import mapper.mapper as mapper_module
+
+        if not mapper_module.CONFIDENCE_ENGINE_AVAILABLE:
+            pytest.skip("confidence engine not available")
+        mapper_module._mapping_confidence.cache_clear()
+        first, second = mapper.map_inputs(["Turnover", "Revenues"])
+        assert first.confidence == second.confidence == 0.90
+        assert mapper_module._mapping_confidence.cache_info().hits == 1
+
+    def test_safe_mode_is_part_of_the_key(self, mapper):
+        """Turning safe mode off is honored for inputs already seen."""
+        assert mapper.map_input("widgets")["found"]
+        mapper.safe_mode_enabled = False
+        assert not mapper.map_input("widgets")["found"]
+
+
+class TestKeywordMatch:
+    """Test the Tier 3 keyword rules."""
+
+    def test_first_rule_with_a_known_target_wins(self, mapper):
+        """Rules are tried in priority order, skipping targets outside the taxonomy."""
+        # 'payable' outranks 'total assets', but its concept is not in the fixture
+        result = mapper._try_partial_match("Total assets payable")
+        assert result["element_id"] == "us-gaap_Assets"
+        assert result["method"] == "Keyword Match (total assets)"
+
+    def test_revenue_outranks_cost(self, mapper):
+        """A label hitting several groups takes the earliest group."""
+        assert mapper._try_partial_match("Cost of revenue")["method"] == "Keyword Match (Revenue)"
+        assert mapper._try_partial_match("COGS")["method"] == "Keyword Match (COGS)"
+        assert mapper._try_partial_match("Mystery") is None
+
+
+class TestSafeModeMatch:
+    """Test finding the Tier 4 candidate concepts."""
+
+    def test_names_in_and_around_the_input(self, mapper):
+        """Candidates are names inside the input or containing it, in ID-map order."""
+        order = mapper._concept_order
+        assert [order[r] for r in mapper._match_concept_names("revenue")] == [
+            "us-gaap_Revenues", "us-gaap_CostOfRevenue",
+            "us-gaap_ProductRevenueWidgets", "ifrs-full_Revenue",
+        ]
+        assert [order[r] for r in mapper._match_concept_names("total assets, net")] == ["us-gaap_Assets"]
+        assert mapper._match_concept_names("") == list(range(len(order)))
+
+    def test_matches_do_not_span_names(self, mapper):
+        """Text straddling two adjacent names is not a match."""
+        assert mapper._match_concept_names("s\nproduct") == []
+        assert [mapper._concept_order[r] for r in mapper._match_concept_names("assets\nproduct")] == [
+            "us-gaap_Assets",
+        ]
+
+    def test_fallback_walks_up_from_a_partial_name(self, mapper):
+        """An input inside a concept name falls back to that concept's safe parent."""
+        result = mapper.map_input("Widgets")
+        assert result["element_id"] == "us-gaap_Revenues"
+        assert result["fallback_path"] == "us-gaap_ProductRevenueWidgets -> us-gaap_Revenues"
+        assert mapper._find_safe_parent("us-gaap_ProductRevenueWidgets") == (
+            "us-gaap_Revenues", 1, ("us-gaap_ProductRevenueWidgets", "us-gaap_Revenues"))
+        assert mapper._find_safe_parent("us-gaap_Revenues") is None
+
+    def test_safe_parents_are_precomputed(self, mapper):
+        """The table holds exactly the concepts the hierarchy walk finds a parent for."""
+        walked = {e: mapper._find_safe_parent(e) for e in mapper.reverse_id_map}
+        assert mapper.safe_parents == {e: found for e, found in walked.items() if found}
+        assert set(mapper.safe_parents) == {"us-gaap_ProductRevenueWidgets", "us-gaap_CostOfRevenue"}
+
+
+class TestBatchMapping:
+    """Test mapping a batch of inputs."""
+
+    def test_matches_map_input(self, mapper):
+        """Batch results equal per-input results, in input order."""
+        inputs = ["Turnover", "revenues", "Turnover", None, "Mystery", " Turnover"]
+        assert mapper.map_inputs(inputs) == [mapper.map_input(text) for text in inputs]
+
+    def test_repeats_share_a_result(self, mapper):
+        """Repeated inputs are resolved once and share the immutable result."""
+        first, second = mapper.map_inputs(["Turnover", "Turnover"])
+        assert first is second
+
+
+class TestMapResult:
+    """Test the map_input result type."""
+
+    def test_dict_style_access(self, mapper):
+        """Fields read by name, by key and by .get() alike."""
+        result = mapper.map_input("Turnover")
+        assert isinstance(result, MapResult)
+        assert result["element_id"] == result.element_id == result.get("element_id")
+        assert result.get("fallback_path") is None
+        assert result.get("missing", "default") == "default"
+        with pytest.raises(KeyError):
+            result["missing"]
+
+    def test_to_dict(self, mapper):
+        """to_dict keeps the old dict shape, with fallback_path only when set."""
+        exact = mapper.map_input("Turnover").to_dict()
+        assert list(exact) == ["input", "found", "element_id", "source", "concept_id", "method",
+                               "mapping_source", "confidence", "confidence_explanation"]
+        fallback = mapper.map_input("widgets").to_dict()
+        assert fallback["fallback_path"] == "us-gaap_ProductRevenueWidgets -> us-gaap_Revenues"
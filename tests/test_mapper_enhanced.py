@@ -0,0 +1,215 @@
+"""
+Tests for the Enhanced Financial Mapper (Stage 2, V4.0)
+"""
+
+import sqlite3
+
+import pytest
+from mapper.mapper_enhanced import EnhancedFinancialMapper
+
+CONCEPTS = [
+    # concept_id, source, element_id
+    ("c1", "US_GAAP", "us-gaap_Revenues"),
+    ("c2", "US_GAAP", "us-gaap_CostOfRevenue"),
+    ("c3", "US_GAAP", "us-gaap_Assets"),
+    ("c4", "US_GAAP", "us-gaap_DebtCurrent"),
+]
+
+LABELS = [
+    # concept_id, label_role, label_text
+    ("c4", "verbose", "Debt, Current Portion"),
+    ("c1", "standard", "Revenues"),
+    ("c2", "standard", "Cost of Revenue"),
+    ("c3", "standard", "Assets"),
+    ("c3", "terse", "Total assets"),
+    ("c1", "net", "Net Revenue_Total"),
+    ("c4", "standard", "Long-Term DEBT"),
+    ("c2", "verbose", "Assets Sold, Cost"),
+    ("c1", "total", "Ébitda REVENUE"),
+    ("c3", "terse", "Owners' Equity"),
+]
+
+PRESENTATION = [
+    # concept_id, parent_concept_id
+    ("c4", "c3"),
+]
+
+
+@pytest.fixture
+def taxonomy(tmp_path):
+    """A tiny taxonomy database shaped like the real one."""
+    db_path = tmp_path / "taxonomy.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE concepts (concept_id TEXT PRIMARY KEY, source TEXT NOT NULL,
+                               element_id TEXT, data_type TEXT, period_type TEXT, balance TEXT);
+        CREATE TABLE labels (id INTEGER PRIMARY KEY AUTOINCREMENT, concept_id TEXT NOT NULL,
+                             label_role TEXT, label_text TEXT);
+        CREATE TABLE presentation_roles (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                         concept_id TEXT NOT NULL, parent_concept_id TEXT);
+        CREATE INDEX idx_labels_role ON labels(label_role);
+        CREATE INDEX idx_labels_concept ON labels(concept_id);
+    """)
+    conn.executemany("INSERT INTO concepts (concept_id, source, element_id, balance) VALUES (?, ?, ?, 'debit')",
+                     CONCEPTS)
+    conn.executemany("INSERT INTO labels (concept_id, label_role, label_text) VALUES (?, ?, ?)", LABELS)
+    conn.executemany("INSERT INTO presentation_roles (concept_id, parent_concept_id) VALUES (?, ?)",
+                     PRESENTATION)
+    conn.commit()
+    conn.close()
+    return str(db_path), str(tmp_path / "missing_aliases.csv")
+
+
+@pytest.fixture
+def mapper(taxonomy):
+    """A connected mapper over the tiny taxonomy."""
+    mapper = EnhancedFinancialMapper(*taxonomy)
+    mapper.connect()
+    return mapper
+
+
+class TestConnect:
+    """Test the taxonomy connection."""
+
+    def test_connection_is_read_only(self, mapper):
+        """The mapper cannot write to the taxonomy it reads."""
+        with pytest.raises(sqlite3.OperationalError):
+            mapper.conn.execute("DELETE FROM labels")
+
+
+class TestConceptLookups:
+    """Test the per-concept metadata and label lookups."""
+
+    def test_metadata_batch_matches_single_lookups(self, mapper, monkeypatch):
+        """Batches answer like get_concept_metadata, chunked under the parameter limit."""
+        monkeypatch.setattr("mapper.mapper_enhanced.SQLITE_MAX_PARAMS", 2)
+        ids = ["c1", "c4", "nope", "c1", "", "c3", None]
+        batch = mapper.get_concept_metadata_batch(ids)
+        assert list(batch) == ["c1", "c4", "nope", "c3"]
+        assert batch == {concept_id: mapper.get_concept_metadata(concept_id) for concept_id in batch}
+        assert batch["c4"]["balance"] == "debit"
+        assert batch["nope"]["balance"] is None
+
+    def test_first_standard_label(self, mapper):
+        """The first standard label in the table is the concept's label."""
+        assert mapper.get_standard_label("c4") == "Long-Term DEBT"
+        assert mapper.get_standard_label("c1") == "Revenues"
+        assert mapper.get_standard_label(None) is None
+
+
+class TestLabelSearch:
+    """Test the in-memory Tier 2.5 label search against SQLite's LIKE."""
+
+    def test_reconnect_rebuilds_the_index(self, mapper):
+        """Connecting again replaces the label index instead of growing it."""
+        before = mapper._search_taxonomy_labels("portion xyz")
+        mapper.connect()
+        assert len(mapper._label_rows) == len(LABELS)
+        assert mapper._find_labels(None, "%debt%") == [0, 6]
+        assert mapper._search_taxonomy_labels("portion xyz") == before
+
+    @pytest.mark.parametrize("pattern", [
+        "%revenue%", "revenue%", "assets%", "%debt%", "%rev_nue%", "%enue_t%", "%ébitda%", "%a%s%",
+        "%ts sold%", "%s, c%", "%qqq%", "debt,%", "%e%",
+    ])
+    def test_matches_sql_like(self, mapper, pattern):
+        """Every role finds the rows SQLite's LOWER()/LIKE finds, in table order."""
+        for role in (None, "standard", "terse", "total", "net", "verbose", "missing"):
+            expected = [
+                row[0] - 1 for row in mapper.conn.execute(
+                    "SELECT id FROM labels WHERE LOWER(label_text) LIKE ? AND coalesce(?, label_role) = label_role "
+                    "ORDER BY id", (pattern, role))
+            ]
+            assert mapper._find_labels(role, pattern) == expected
+            assert mapper._find_labels(role, pattern, 1) == expected[:1]
+
+    def test_exact_label_wins_outright(self, mapper):
+        """An exact label match on any role is the only candidate."""
+        result = mapper._search_taxonomy_labels("total ASSETS")
+        assert result["element_id"] == "us-gaap_Assets"
+        assert result["method"] == "Fuzzy Taxonomy (terse, conf=95)"
+
+    def test_prefix_and_contains_matches(self, mapper):
+        """Prefix matches outrank contains matches."""
+        result = mapper._search_taxonomy_labels("revenue")
+        assert result["element_id"] == "us-gaap_Revenues"
+        assert result["match_text"] == "Revenues"
+
+    def test_word_search_role_filter_binds_last_word(self, mapper):
+        """Only the last word is limited to the word-search roles."""
+        result = mapper._search_taxonomy_labels("portion xyz")
+        assert result["match_text"] == "Debt, Current Portion"
+        assert mapper._search_taxonomy_labels("xyz portion") is None
+
+    def test_word_search_takes_quotes_as_text(self, mapper):
+        """Words with quotes are searched like any other; short words are skipped."""
+        assert mapper._search_taxonomy_labels("owners' xyz")["match_text"] == "Owners' Equity"
+        assert mapper._search_taxonomy_labels("xyz o'x") is None
+        assert mapper._search_taxonomy_labels("xy") is None
+
+class TestKeywordFallback:
+    """Test the Tier 3 keyword fallback."""
+
+    def test_first_keyword_in_the_taxonomy_wins(self, mapper):
+        """Keywords are tried in order, skipping targets missing from the taxonomy."""
+        result = mapper._try_keyword_fallback("Cash & COGS")
+        assert result["element_id"] == "us-gaap_CostOfRevenue"
+        assert result["method"] == "Keyword Fallback (cogs)"
+        assert mapper._try_keyword_fallback("cash") is None
+
+
+class TestSafeModeMatch:
+    """Test finding the Tier 4 candidate concepts."""
+
+    def test_names_in_and_around_the_input(self, mapper):
+        """Candidates are names inside the input or containing it, in ID-map order."""
+        order = mapper._concept_order
+        assert [order[r] for r in mapper._match_concept_names("revenue")] == [
+            "us-gaap_Revenues", "us-gaap_CostOfRevenue",
+        ]
+        assert [order[r] for r in mapper._match_concept_names("total assets")] == ["us-gaap_Assets"]
+        assert mapper._match_concept_names("ts\ndebt") == []
+
+    def test_fallback_walks_up_from_a_concept_name(self, mapper):
+        """An input naming a concept falls back to that concept's safe parent."""
+        result = mapper.map_input("DebtCurrent")
+        assert result["element_id"] == "us-gaap_Assets"
+        assert result["fallback_path"] == "us-gaap_DebtCurrent -> us-gaap_Assets"
+        assert mapper.stats["tier_4_hierarchy"] == 1
+        assert mapper._find_safe_parent("us-gaap_DebtCurrent") == (
+            "us-gaap_Assets", 1, ["us-gaap_DebtCurrent", "us-gaap_Assets"])
+        assert mapper._find_safe_parent("us-gaap_Assets") is None
+
+
+class TestResultMemo:
+    """Test memoizing Tier 1-5 results."""
+
+    def test_repeats_are_counted_and_copied(self, mapper):
+        """Repeated inputs count in the stats and get their own result dict."""
+        first = mapper.map_input("revenue")
+        first["element_id"] = None
+        second = mapper.map_input("revenue")
+        assert second["element_id"] == "us-gaap_Revenues"
+        assert mapper.stats["tier_2_5_fuzzy_taxonomy"] == 2
+        assert mapper._resolve_cached.cache_info().hits == 1
+
+    def test_safe_mode_is_part_of_the_key(self, mapper):
+        """Turning Safe Mode off is not hidden by an earlier result."""
+        assert mapper.map_input("DebtCurrent")["found"]
+        mapper.safe_mode_enabled = False
+        assert not mapper.map_input("DebtCurrent")["found"]
+
+    def test_brain_is_consulted_every_call(self, mapper):
+        """Brain mappings bypass the memo, so new ones apply at once."""
+        class Brain:
+            mapping = None
+
+            def get_mapping(self, raw_input):
+                return self.mapping
+
+        brain = Brain()
+        mapper.set_brain_manager(brain)
+        mapper.brain_enabled = True
+        assert mapper.map_input("revenue")["element_id"] == "us-gaap_Revenues"
+        brain.mapping = "us-gaap_Assets"
+        assert mapper.map_input("revenue")["method"] == "Analyst Brain (User Memory)"